@@ -0,0 +1,117 @@
+"""
+Precomputed move and attack tables for both GameState backends -- built once at import, so the move generators never
+do bounds arithmetic. Squares are numbered row*8 + col (square 0 is a8, 63 is h1) like gs.board.
+
+chessEngine (list board) uses the square lists:
+    KNIGHT_TARGETS[sq], KING_TARGETS[sq]  -- (row, col) of every square the piece reaches from sq.
+    RAYS[sq][d]                           -- (row, col) of the squares from sq outwards along DIRECTIONS[d].
+    BETWEEN_SQUARES[a][b]                 -- set of the squares strictly between a and b, empty if not on one line.
+bitboardEngine uses the same tables as 64 bit masks (KNIGHT_ATTACKS, RAYS_NORTH ..., BETWEEN).
+
+Building everything takes about 10ms, which is less than unmarshalling it, so the disk cache is off by default.
+Set CHESS_TABLE_CACHE=1 to keep the tables in __pycache__/attackTables.marshal, for tables that cost more to build.
+"""
+import marshal
+import os
+
+TABLES_VERSION = 1
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),"__pycache__","attackTables.marshal")
+
+SQUARE_ROW_COL = tuple(divmod(sq,8) for sq in range(64))
+# up, left, down, right, then the 4 diagonals -- the order checkForPinsAndChecks relies on.
+DIRECTIONS = ((-1,0),(0,-1),(1,0),(0,1),(-1,-1),(-1,1),(1,-1),(1,1))
+ROOK_DIRECTIONS = (0,1,2,3)
+BISHOP_DIRECTIONS = (4,5,6,7)
+KNIGHT_OFFSETS = ((-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1))
+KING_OFFSETS = ((-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1))
+
+def buildTargets(offsets):
+    targets = []
+    for r, c in SQUARE_ROW_COL:
+        targets.append(tuple((r + dr,c + dc) for dr, dc in offsets if 0 <= r + dr < 8 and 0 <= c + dc < 8))
+    return tuple(targets)
+
+def buildRay(sq,dr,dc):
+    r, c = SQUARE_ROW_COL[sq]
+    ray = []
+    r, c = r + dr, c + dc
+    while 0 <= r < 8 and 0 <= c < 8:
+        ray.append((r,c))
+        r, c = r + dr, c + dc
+    return tuple(ray)
+
+def toMask(squares):
+    mask = 0
+    for r, c in squares:
+        mask |= 1 << (r*8 + c)
+    return mask
+
+'''
+Every table, as a dict of name -> nested tuples (the form they are cached in).
+'''
+def buildTables():
+    tables = {'version':TABLES_VERSION}
+    tables['KNIGHT_TARGETS'] = buildTargets(KNIGHT_OFFSETS)
+    tables['KING_TARGETS'] = buildTargets(KING_OFFSETS)
+    tables['RAYS'] = tuple(tuple(buildRay(sq,dr,dc) for dr, dc in DIRECTIONS) for sq in range(64))
+    between = [[frozenset()]*64 for _ in range(64)]
+    for sq in range(64):
+        for ray in tables['RAYS'][sq]:
+            for i, (r, c) in enumerate(ray):
+                between[sq][r*8 + c] = frozenset(r2*8 + c2 for r2, c2 in ray[:i])
+    tables['BETWEEN_SQUARES'] = tuple(tuple(row) for row in between)
+
+    tables['KNIGHT_ATTACKS'] = tuple(toMask(targets) for targets in tables['KNIGHT_TARGETS'])
+    tables['KING_ATTACKS'] = tuple(toMask(targets) for targets in tables['KING_TARGETS'])
+    # squares a pawn of that colour attacks from sq. white pawns move up the board (towards row 0).
+    tables['PAWN_ATTACKS'] = (tuple(toMask(targets) for targets in buildTargets(((-1,-1),(-1,1)))),
+                              tuple(toMask(targets) for targets in buildTargets(((1,-1),(1,1)))))
+    for d, name in enumerate(('RAYS_NORTH','RAYS_WEST','RAYS_SOUTH','RAYS_EAST',
+                              'RAYS_NORTH_WEST','RAYS_NORTH_EAST','RAYS_SOUTH_WEST','RAYS_SOUTH_EAST')):
+        tables[name] = tuple(toMask(rays[d]) for rays in tables['RAYS'])
+    tables['BETWEEN'] = tuple(tuple(sum(1 << sq for sq in squares) for squares in row) for row in between)
+    return tables
+
+def loadTables():
+    useCache = os.environ.get('CHESS_TABLE_CACHE','0') == '1'
+    if useCache:
+        try:
+            with open(CACHE_FILE,'rb') as f:
+                tables = marshal.load(f)
+            if tables.get('version') == TABLES_VERSION:
+                return tables
+        except (OSError,EOFError,ValueError,TypeError):
+            pass # no cache yet, or an unreadable one -- build it again.
+    tables = buildTables()
+    if useCache:
+        try:
+            os.makedirs(os.path.dirname(CACHE_FILE),exist_ok=True)
+            with open(CACHE_FILE + ".tmp",'wb') as f:
+                marshal.dump(tables,f)
+            os.replace(CACHE_FILE + ".tmp",CACHE_FILE) # another process may be reading it.
+        except OSError:
+            pass # read-only install -- the tables just get built every time.
+    return tables
+
+_tables = loadTables()
+KNIGHT_TARGETS = _tables['KNIGHT_TARGETS']
+KING_TARGETS = _tables['KING_TARGETS']
+RAYS = _tables['RAYS']
+BETWEEN_SQUARES = _tables['BETWEEN_SQUARES']
+KNIGHT_ATTACKS = _tables['KNIGHT_ATTACKS']
+KING_ATTACKS = _tables['KING_ATTACKS']
+PAWN_ATTACKS = _tables['PAWN_ATTACKS']
+# rays going towards higher square numbers -- the nearest blocker is the lowest set bit.
+RAYS_SOUTH = _tables['RAYS_SOUTH']
+RAYS_EAST = _tables['RAYS_EAST']
+RAYS_SOUTH_EAST = _tables['RAYS_SOUTH_EAST']
+RAYS_SOUTH_WEST = _tables['RAYS_SOUTH_WEST']
+# rays going towards lower square numbers -- the nearest blocker is the highest set bit.
+RAYS_NORTH = _tables['RAYS_NORTH']
+RAYS_WEST = _tables['RAYS_WEST']
+RAYS_NORTH_WEST = _tables['RAYS_NORTH_WEST']
+RAYS_NORTH_EAST = _tables['RAYS_NORTH_EAST']
+BETWEEN = _tables['BETWEEN']
+ROOK_RAYS = tuple(RAYS_NORTH[sq] | RAYS_SOUTH[sq] | RAYS_EAST[sq] | RAYS_WEST[sq] for sq in range(64))
+BISHOP_RAYS = tuple(RAYS_NORTH_EAST[sq] | RAYS_NORTH_WEST[sq] | RAYS_SOUTH_EAST[sq] | RAYS_SOUTH_WEST[sq] for sq in range(64))
+del _tables
@@ -0,0 +1,249 @@
+"""
+Batch evaluation with NumPy -- many positions encoded into one array and scored together, for analysing game
+collections and building datasets without a Python loop per position. evaluateBatch gives the same numbers as
+evaluation.evaluate.
+
+A batch is an N*64 int8 array of chessEngine.PIECE_CODES (0 empty, 1-6 white p N B R Q K, 7-12 black) with squares
+numbered row*8 + col like gs.board, plus an N bool array of whether white is to move. piecePlanes() turns it into
+N*12*64 one-hot planes.
+
+    squares, whiteToMove = encodePositions(positions) # GameStates, snapshot() bytes or FEN strings.
+    scores = evaluateBatch(squares,whiteToMove)
+    mobility(squares) # N*2 -- white's and black's piece mobility.
+    for scores in evaluateStream(positionGenerator,chunkSize=1024): # one chunk in memory at a time.
+        ...
+
+    python batchEvaluation.py games.pgn|positions.epd [--chunk 1024] [--out scores.npy] [--check]
+"""
+import argparse
+import sys
+import time
+
+import attackTables
+import bitboardEngine
+import chessEngine
+import evaluation
+import pgn
+
+try:
+    import numpy as np
+except ImportError: # no batch evaluation without it.
+    np = None
+
+CHUNK_SIZE = 1024 # positions a chunk -- the attack arrays take about 16KB a position.
+WHITE_PIECES = range(1,7) # PIECE_CODES of white's pieces, black's are 6 higher.
+
+
+def maskMatrix(masks):
+    # 64 bitboard masks as a 64*64 bool matrix -- [s, t] is True when bit t of masks[s] is set.
+    return np.array([[mask >> t & 1 for t in range(64)] for mask in masks],dtype=bool)
+
+'''
+The tables the batch functions index, as numpy arrays -- built once at import when numpy is there.
+'''
+def buildTables():
+    tables = {}
+    pieces = chessEngine.PIECE_CODES
+    tables['MIDDLEGAME'] = np.array([[0]*64] + [evaluation.MIDDLEGAME_SCORES[piece] for piece in pieces[1:]],np.int32)
+    tables['ENDGAME'] = np.array([[0]*64] + [evaluation.ENDGAME_SCORES[piece] for piece in pieces[1:]],np.int32)
+    tables['PHASE'] = np.array([0] + [evaluation.PHASES[piece] for piece in pieces[1:]],np.int32)
+    tables['MATERIAL'] = np.array([0] + [evaluation.pieceScores[piece[1]]*(1 if piece[0] == 'w' else -1)
+                                         for piece in pieces[1:]],np.int32)
+    tables['PAWN_ATTACKS'] = (maskMatrix(attackTables.PAWN_ATTACKS[0]),maskMatrix(attackTables.PAWN_ATTACKS[1]))
+    tables['KNIGHT_ATTACKS'] = maskMatrix(attackTables.KNIGHT_ATTACKS)
+    tables['KING_ATTACKS'] = maskMatrix(attackTables.KING_ATTACKS)
+    tables['ROOK_LINES'] = maskMatrix(attackTables.ROOK_RAYS)
+    tables['BISHOP_LINES'] = maskMatrix(attackTables.BISHOP_RAYS)
+    # [x, s*64 + t] is 1 when x is strictly between s and t -- occupancy times it counts the blockers of every line.
+    between = np.zeros((64,64*64),np.float32)
+    for s in range(64):
+        for t in range(64):
+            for x in attackTables.BETWEEN_SQUARES[s][t]:
+                between[x,s*64 + t] = 1
+    tables['BETWEEN'] = between
+    return tables
+
+TABLES = buildTables() if np is not None else None
+
+def requireNumpy():
+    if np is None:
+        raise RuntimeError("batch evaluation needs the numpy package")
+
+def snapshotOf(position):
+    if isinstance(position,(bytes,bytearray)):
+        return position
+    if isinstance(position,str):
+        return chessEngine.encodeSnapshot(*chessEngine.parseFen(position))
+    return position.snapshot()
+
+'''
+(squares, whiteToMove) of the positions -- GameStates of either backend, snapshot() bytes or FEN strings.
+'''
+def encodePositions(positions):
+    requireNumpy()
+    data = np.frombuffer(b"".join(map(snapshotOf,positions)),dtype=np.uint8).reshape(-1,chessEngine.SNAPSHOT_SIZE)
+    # the low 4 bits of a snapshot byte are the piece, byte 1's high bits the side to move (see encodeSnapshot).
+    return (data & 15).astype(np.int8), (data[:,1] >> 4) == 0
+
+'''
+N*12*64 one-hot piece planes in PIECE_CODES order (wp ... bK).
+'''
+def piecePlanes(squares):
+    return (squares[:,None,:] == np.arange(1,13,dtype=np.int8)[None,:,None]).astype(np.uint8)
+
+'''
+Material balance from white's point of view, in centipawns (middlegame piece values).
+'''
+def material(squares):
+    return TABLES['MATERIAL'][squares].sum(axis=1)
+
+'''
+(middlegame, endgame, phase) arrays -- what evaluation.computeScores gives for each position.
+'''
+def pieceSquareScores(squares):
+    index = squares.astype(np.intp)
+    squareIndex = np.arange(64)
+    return (TABLES['MIDDLEGAME'][index,squareIndex].sum(axis=1),TABLES['ENDGAME'][index,squareIndex].sum(axis=1),
+            TABLES['PHASE'][index].sum(axis=1))
+
+'''
+Scores from the side to move's point of view -- evaluation.evaluate of every position.
+'''
+def evaluateBatch(squares,whiteToMove):
+    mgScore, egScore, phase = pieceSquareScores(squares)
+    phase = np.minimum(phase,evaluation.MAX_PHASE)
+    score = (mgScore*phase + egScore*(evaluation.MAX_PHASE - phase))//evaluation.MAX_PHASE
+    return np.where(whiteToMove,score,-score)
+
+'''
+(white, black) N*64*64 bool arrays -- [n, s, t] is True when the piece on s attacks t in position n. Sliders stop at
+the first piece in the way; attacks on own pieces count (they are defended squares).
+'''
+def attackArrays(squares):
+    occupied = (squares != 0).astype(np.float32)
+    unblocked = (occupied @ TABLES['BETWEEN']).reshape(-1,64,64) == 0
+    rookLines = TABLES['ROOK_LINES'] & unblocked
+    bishopLines = TABLES['BISHOP_LINES'] & unblocked
+    arrays = []
+    for color in (0,1):
+        pawn, knight, bishop, rook, queen, king = ((squares == code + 6*color)[:,:,None] for code in WHITE_PIECES)
+        arrays.append((pawn & TABLES['PAWN_ATTACKS'][color]) | (knight & TABLES['KNIGHT_ATTACKS']) |
+                      (king & TABLES['KING_ATTACKS']) | ((rook | queen) & rookLines) | ((bishop | queen) & bishopLines))
+    return arrays
+
+'''
+N*2*64 -- how many white and black pieces attack each square.
+'''
+def attackCounts(squares):
+    white, black = attackArrays(squares)
+    return np.stack((white.sum(axis=1,dtype=np.int8),black.sum(axis=1,dtype=np.int8)),axis=1)
+
+'''
+N*2 -- the squares white's and black's pieces (not pawns) attack that aren't taken by their own pieces, summed over
+the pieces. Pins and checks aren't looked at.
+'''
+def mobility(squares):
+    counts = []
+    for color, attacks in enumerate(attackArrays(squares)):
+        pieces = (squares != 1 + 6*color)[:,:,None] # pawns don't count.
+        own = (squares >= 1 + 6*color) & (squares <= 6 + 6*color)
+        counts.append((attacks & pieces & ~own[:,None,:]).sum(axis=(1,2)))
+    return np.stack(counts,axis=1)
+
+'''
+Encoded chunks of at most chunkSize positions from any iterable of positions -- only one chunk is held at a time.
+'''
+def iterChunks(positions,chunkSize=CHUNK_SIZE):
+    chunk = []
+    for position in positions:
+        chunk.append(snapshotOf(position))
+        if len(chunk) == chunkSize:
+            yield encodePositions(chunk)
+            chunk = []
+    if chunk:
+        yield encodePositions(chunk)
+
+def evaluateStream(positions,chunkSize=CHUNK_SIZE):
+    for squares, whiteToMove in iterChunks(positions,chunkSize):
+        yield evaluateBatch(squares,whiteToMove)
+
+'''
+Snapshots of every position of the games in a PGN file, the start position included.
+'''
+def pgnPositions(path):
+    for game in pgn.iterGames(path):
+        gs = bitboardEngine.GameState()
+        try:
+            if 'FEN' in game.tags:
+                gs.loadFen(game.tags['FEN'])
+        except ValueError:
+            continue
+        yield gs.snapshot()
+        for san in game.moves:
+            try:
+                move = chessEngine.Move.fromSan(san,gs)
+            except ValueError:
+                break
+            gs.makeMove(move)
+            yield gs.snapshot()
+
+def encodeSquares(squares,whiteToMove):
+    # a batch row back to snapshot bytes, castling and en passant left out -- they don't change the score.
+    data = bytearray(squares.astype(np.uint8).tobytes())
+    data[1] |= (not whiteToMove) << 4
+    return bytes(data)
+
+def fenPositions(path):
+    with open(path) as f:
+        for line in f:
+            fen = line.split(';')[0].strip()
+            if fen and not fen.startswith('#'):
+                yield fen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate every position of a PGN or FEN/EPD file in batches.")
+    parser.add_argument('path')
+    parser.add_argument('--chunk',type=int,default=CHUNK_SIZE)
+    parser.add_argument('--out',help="save the scores (side to move's view) to this .npy file.")
+    parser.add_argument('--check',action='store_true',help="score every position one by one too and compare.")
+    args = parser.parse_args(argv)
+    if np is None:
+        parser.error("batch evaluation needs the numpy package")
+    positions = pgnPositions(args.path) if args.path.lower().endswith('.pgn') else fenPositions(args.path)
+    scores = []
+    count = mismatches = 0
+    mobilityTotal = np.zeros(2,np.int64)
+    batchTime = mobilityTime = singleTime = 0.0
+    for chunk in iterChunks(positions,args.chunk):
+        start = time.perf_counter()
+        chunkScores = evaluateBatch(*chunk)
+        batchTime += time.perf_counter() - start
+        start = time.perf_counter()
+        mobilityTotal += mobility(chunk[0]).sum(axis=0)
+        mobilityTime += time.perf_counter() - start
+        count += len(chunkScores)
+        if args.out:
+            scores.append(chunkScores)
+        if args.check:
+            gs = chessEngine.GameState()
+            for squares, whiteToMove, score in zip(*chunk,chunkScores):
+                gs.restore(encodeSquares(squares,whiteToMove))
+                start = time.perf_counter()
+                expected = evaluation.scoreBoard(gs)
+                singleTime += time.perf_counter() - start
+                mismatches += expected != score
+    print("%d positions evaluated in %.2fs batched -- %.0f positions/s" % (count,batchTime,count/max(batchTime,1e-9)))
+    if count:
+        print("mobility in %.2fs -- %.0f positions/s, average white %.1f, black %.1f" %
+              ((mobilityTime,count/max(mobilityTime,1e-9)) + tuple(mobilityTotal/count)))
+    if args.check:
+        print("one by one (evaluation.scoreBoard): %.2fs -- %.0f positions/s, %d mismatches" %
+              (singleTime,count/max(singleTime,1e-9),mismatches))
+    if args.out:
+        np.save(args.out,np.concatenate(scores) if scores else np.zeros(0,np.int32))
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,530 @@
+"""
+Bitboard backend for the GameState. Same api as chessEngine.GameState (makeMove, undoMove, getValidMoves, board ...)
+but the position is stored as one 64 bit integer per piece and colour, and moves are generated with shifts and
+precomputed attack masks instead of walking the 8*8 list of strings.
+Squares are numbered row*8 + col, so square 0 is a8 and square 63 is h1 -- same orientation as gs.board.
+"""
+from array import array
+
+import evaluation
+import zobrist
+from attackTables import (BETWEEN, BISHOP_RAYS, KING_ATTACKS, KNIGHT_ATTACKS, PAWN_ATTACKS, RAYS_EAST, RAYS_NORTH,
+                          RAYS_NORTH_EAST, RAYS_NORTH_WEST, RAYS_SOUTH, RAYS_SOUTH_EAST, RAYS_SOUTH_WEST, RAYS_WEST,
+                          ROOK_RAYS, SQUARE_ROW_COL)
+from chessEngine import (Move, STARTING_FEN, CAPTURES, KILLERS, QUIETS, LOG_CASTLE_SHIFT, LOG_ENPASSANT,
+                         LOG_ENPASSANT_SHIFT, LOG_PROMOTION, PIECE_CODES, SQUARES, captureOrder, decodeSnapshot,
+                         encodeSnapshot, enpassantSquare, fenCounters, formatFen, kingLocations, parseFen,
+                         undoInfo)
+
+FULL = 0xFFFFFFFFFFFFFFFF
+FILE_A = 0x0101010101010101 # col 0
+FILE_H = 0x8080808080808080 # col 7
+ROW_2 = 0xFF << 16 # black pawns land here after a single push from their start row.
+ROW_5 = 0xFF << 40 # white pawns land here after a single push from their start row.
+LAST_ROWS = 0xFF | (0xFF << 56) # pawns promote on row 0 (white) and row 7 (black).
+
+PIECES = ('wp','wN','wB','wR','wQ','wK','bp','bN','bB','bR','bQ','bK')
+PIECE_INDEX = {piece:i for i, piece in enumerate(PIECES)}
+
+def rookAttacks(sq,occupied):
+    attacks = 0
+    ray = RAYS_SOUTH[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAYS_SOUTH[(blockers & -blockers).bit_length() - 1]
+    attacks |= ray
+    ray = RAYS_EAST[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAYS_EAST[(blockers & -blockers).bit_length() - 1]
+    attacks |= ray
+    ray = RAYS_NORTH[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAYS_NORTH[blockers.bit_length() - 1]
+    attacks |= ray
+    ray = RAYS_WEST[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAYS_WEST[blockers.bit_length() - 1]
+    return attacks | ray
+
+def bishopAttacks(sq,occupied):
+    attacks = 0
+    ray = RAYS_SOUTH_EAST[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAYS_SOUTH_EAST[(blockers & -blockers).bit_length() - 1]
+    attacks |= ray
+    ray = RAYS_SOUTH_WEST[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAYS_SOUTH_WEST[(blockers & -blockers).bit_length() - 1]
+    attacks |= ray
+    ray = RAYS_NORTH_WEST[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAYS_NORTH_WEST[blockers.bit_length() - 1]
+    attacks |= ray
+    ray = RAYS_NORTH_EAST[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= RAYS_NORTH_EAST[blockers.bit_length() - 1]
+    return attacks | ray
+
+
+class BoardView():
+    '''
+    Read-only 8*8 view of the position, indexed exactly like the list board -- board[r][c] gives "wp", "--" etc.
+    '''
+    __slots__ = ('_rows',)
+
+    def __init__(self,rows) -> None:
+        self._rows = rows
+
+    def __getitem__(self,r):
+        return tuple(self._rows[r])
+
+    def __len__(self):
+        return 8
+
+    def __iter__(self):
+        for row in self._rows:
+            yield tuple(row)
+
+
+class GameState():
+    def __init__(self) -> None:
+        # one bitboard per piece in PIECES order, and one occupancy bitboard per colour (0 - white, 1 - black).
+        self.pieceBitboards = [0]*12
+        self.colorBitboards = [0,0]
+        # square contents kept alongside the bitboards so captures and the board view are a single lookup.
+        self.rows = []
+        self.inCheck = False
+        self.loadFen(STARTING_FEN)
+
+    '''
+    Sets up the position from a FEN string -- the move log starts empty from there.
+    '''
+    def loadFen(self,fen):
+        self.setPosition(*parseFen(fen),*fenCounters(fen))
+
+    '''
+    The position (not the move log) as chessEngine.SNAPSHOT_SIZE bytes -- see chessEngine.encodeSnapshot.
+    '''
+    def snapshot(self):
+        return encodeSnapshot(self.rows,self.whitetoMove,self.currentCastlingRight,self.enpassantPossible)
+
+    '''
+    Sets up the position from snapshot() bytes -- the move log starts empty from there, like loadFen.
+    '''
+    def restore(self,data):
+        self.setPosition(*decodeSnapshot(data))
+
+    def setPosition(self,rows,whitetoMove,castleRights,enpassantPossible,halfmoves=0,fullmoves=1):
+        kings = kingLocations(rows) # first -- a position without its kings leaves the game as it was.
+        self.rows = rows
+        self.whitetoMove = whitetoMove
+        self.currentCastlingRight = castleRights
+        self.enpassantPossible = enpassantPossible
+        self.pieceBitboards = [0]*12
+        self.colorBitboards = [0,0]
+        for r in range(8):
+            for c in range(8):
+                piece = self.rows[r][c]
+                if piece != "--":
+                    self.pieceBitboards[PIECE_INDEX[piece]] |= 1 << (r*8 + c)
+                    self.colorBitboards[0 if piece[0] == 'w' else 1] |= 1 << (r*8 + c)
+        self.whiteKingLocation, self.blackKingLocation = kings
+        # move codes and chessEngine.undoInfo entries, keys and scores before each move -- as in chessEngine.
+        self.moveLog = array('H')
+        self.undoLog = array('H')
+        self.startHalfmoves = halfmoves
+        self.startFullmoves = fullmoves
+        self.zobristKeyLog = array('Q')
+        self.scoreLog = array('i')
+        self.zobristKey = zobrist.computeKey(self.rows,self.whitetoMove,self.currentCastlingRight,self.enpassantPossible)
+        # material + piece-square scores and game phase -- updated by makeMove/undoMove like the key.
+        self.mgScore, self.egScore, self.phase = evaluation.computeScores(self.rows)
+
+    '''
+    The position as a FEN string.
+    '''
+    def getFen(self):
+        return formatFen(self.rows,self.whitetoMove,self.currentCastlingRight,self.enpassantPossible,self.undoLog,
+                         self.startHalfmoves,self.startFullmoves)
+
+    '''
+    The last move made, rebuilt from the move log -- None at the start.
+    '''
+    def lastMove(self):
+        if len(self.moveLog) == 0:
+            return None
+        return Move.fromLog(self.moveLog[-1],self.undoLog[-1],self.rows)
+
+    '''
+    Read-only view of the board so drawPieces and other callers of gs.board keep working.
+    '''
+    @property
+    def board(self):
+        return BoardView(self.rows)
+
+    '''
+    Takes a move as parameter -- executes it (including castling, en passant and pawn promotion).
+    '''
+    def makeMove(self,move):
+        castleBefore = self.currentCastlingRight.bits()
+        enpassantBefore = self.enpassantPossible
+        self.moveLog.append(move.moveID)
+        self.undoLog.append(undoInfo(move,castleBefore,enpassantBefore))
+        self.zobristKeyLog.append(self.zobristKey)
+        self.scoreLog.extend((self.mgScore,self.egScore,self.phase))
+        startSq = move.startRow*8 + move.startCol
+        endSq = move.endRow*8 + move.endCol
+        color = 0 if move.pieceMoved[0] == 'w' else 1
+        pieceBitboards = self.pieceBitboards
+        colorBitboards = self.colorBitboards
+        rows = self.rows
+        if move.pieceCaptured != "--":
+            capturedRow = move.startRow if move.isEnpassantMove else move.endRow
+            pieceBitboards[PIECE_INDEX[move.pieceCaptured]] ^= 1 << (capturedRow*8 + move.endCol)
+            colorBitboards[1 - color] ^= 1 << (capturedRow*8 + move.endCol)
+            rows[capturedRow][move.endCol] = "--"
+        pieceEnd = move.pieceMoved[0] + move.promotionChoice if move.isPawnPromotion else move.pieceMoved
+        pieceBitboards[PIECE_INDEX[move.pieceMoved]] ^= 1 << startSq
+        pieceBitboards[PIECE_INDEX[pieceEnd]] ^= 1 << endSq
+        colorBitboards[color] ^= (1 << startSq) | (1 << endSq)
+        rows[move.startRow][move.startCol] = "--"
+        rows[move.endRow][move.endCol] = pieceEnd
+        if move.isCastleMove:
+            self.moveCastleRook(move.endRow,move.startCol,move.endCol,color)
+        self.whitetoMove = not self.whitetoMove
+        if move.pieceMoved == 'wK':
+            self.whiteKingLocation = (move.endRow,move.endCol)
+        elif move.pieceMoved == 'bK':
+            self.blackKingLocation = (move.endRow,move.endCol)
+        if move.pieceMoved[1] == 'p' and abs(move.startRow - move.endRow) == 2:
+            self.enpassantPossible = enpassantSquare(rows,move.endRow,move.endCol)
+        else:
+            self.enpassantPossible = ()
+        self.currentCastlingRight.update(move)
+        self.zobristKey ^= zobrist.moveDelta(move,castleBefore,self.currentCastlingRight.bits(),enpassantBefore,
+                                             self.enpassantPossible)
+        mgDelta, egDelta, phaseDelta = evaluation.moveDelta(move)
+        self.mgScore += mgDelta
+        self.egScore += egDelta
+        self.phase += phaseDelta
+
+    '''
+    Undo the last move made -- from the move log and the board, like chessEngine.
+    '''
+    def undoMove(self):
+        if len(self.moveLog) != 0:
+            code = self.moveLog.pop()
+            info = self.undoLog.pop()
+            startSq = code & 63
+            endSq = code >> 6 & 63
+            startRow, startCol = SQUARES[startSq]
+            endRow, endCol = SQUARES[endSq]
+            pieceBitboards = self.pieceBitboards
+            colorBitboards = self.colorBitboards
+            rows = self.rows
+            pieceEnd = rows[endRow][endCol]
+            pieceMoved = pieceEnd[0] + 'p' if info & LOG_PROMOTION else pieceEnd
+            color = 0 if pieceMoved[0] == 'w' else 1
+            pieceBitboards[PIECE_INDEX[pieceMoved]] ^= 1 << startSq
+            pieceBitboards[PIECE_INDEX[pieceEnd]] ^= 1 << endSq
+            colorBitboards[color] ^= (1 << startSq) | (1 << endSq)
+            rows[startRow][startCol] = pieceMoved
+            rows[endRow][endCol] = "--"
+            if info & 15: # a capture -- the piece goes back.
+                pieceCaptured = PIECE_CODES[info & 15]
+                capturedRow = startRow if info & LOG_ENPASSANT else endRow
+                pieceBitboards[PIECE_INDEX[pieceCaptured]] ^= 1 << (capturedRow*8 + endCol)
+                colorBitboards[1 - color] ^= 1 << (capturedRow*8 + endCol)
+                rows[capturedRow][endCol] = pieceCaptured
+            self.whitetoMove = not self.whitetoMove
+            if pieceMoved[1] == 'K':
+                if color == 0:
+                    self.whiteKingLocation = (startRow,startCol)
+                else:
+                    self.blackKingLocation = (startRow,startCol)
+                if endCol - startCol == 2 or startCol - endCol == 2:
+                    self.moveCastleRook(endRow,startCol,endCol,color)
+            self.currentCastlingRight.setBits(info >> LOG_CASTLE_SHIFT & 15)
+            enpassantCol = info >> LOG_ENPASSANT_SHIFT
+            self.enpassantPossible = (2 if self.whitetoMove else 5,enpassantCol - 1) if enpassantCol else ()
+            self.zobristKey = self.zobristKeyLog.pop()
+            self.phase = self.scoreLog.pop()
+            self.egScore = self.scoreLog.pop()
+            self.mgScore = self.scoreLog.pop()
+
+    '''
+    Moves the castling rook between its corner and the square next to the king -- the same xor does and undoes it.
+    '''
+    def moveCastleRook(self,row,kingStartCol,kingEndCol,color):
+        if kingEndCol - kingStartCol == 2: # king side.
+            rookStart, rookEnd = 7, kingEndCol - 1
+        else: # queen side.
+            rookStart, rookEnd = 0, kingEndCol + 1
+        rook = self.rows[row][rookStart]
+        if rook == "--": # undoing -- the rook is next to the king.
+            rook = self.rows[row][rookEnd]
+            self.rows[row][rookStart] = rook
+            self.rows[row][rookEnd] = "--"
+        else:
+            self.rows[row][rookEnd] = rook
+            self.rows[row][rookStart] = "--"
+        mask = (1 << (row*8 + rookStart)) | (1 << (row*8 + rookEnd))
+        self.pieceBitboards[PIECE_INDEX[rook]] ^= mask
+        self.colorBitboards[color] ^= mask
+
+    '''
+    Bitboard of the pieces of colour `color` that attack sq, with `occupied` as the blockers for sliders.
+    '''
+    def attackersTo(self,sq,color,occupied):
+        bbs = self.pieceBitboards
+        base = 6*color
+        queens = bbs[base + 4]
+        return ((PAWN_ATTACKS[1 - color][sq] & bbs[base]) |
+                (KNIGHT_ATTACKS[sq] & bbs[base + 1]) |
+                (KING_ATTACKS[sq] & bbs[base + 5]) |
+                (bishopAttacks(sq,occupied) & (bbs[base + 2] | queens)) |
+                (rookAttacks(sq,occupied) & (bbs[base + 3] | queens)))
+
+    '''
+    determine if the enemy can attack the square.
+    '''
+    def squareUnderAttack(self,r,c):
+        enemy = 1 if self.whitetoMove else 0
+        return self.attackersTo(r*8 + c,enemy,self.colorBitboards[0] | self.colorBitboards[1]) != 0
+
+    '''
+    All moves considering checks and pins.
+    '''
+    def getValidMoves(self):
+        rows = self.rows
+        return [Move.fromCode(code,rows) for code in self.getValidMoveCodes()]
+
+    '''
+    The valid moves as 16 bit codes (see Move.moveID) -- the generators work on square numbers, so no Move objects
+    are made until somebody asks for them.
+    '''
+    def getValidMoveCodes(self):
+        moves = array('H')
+        self.generateMoveCodes(self.getCheckMasks(),True,True,FULL,moves)
+        return moves
+
+    '''
+    Valid moves one stage at a time, best stages first -- the transposition table move, captures and promotions by
+    most valuable victim / least valuable attacker, the killer moves, then the quiet moves (sorted by quietOrder if
+    given). Nothing past lastStage is generated, and a stage is only generated once the search asks for its first
+    move, so a node that cuts off early never builds its quiet moves. In check every evasion is handed out, whatever
+    lastStage is. gs.inCheck is set when this returns.
+    '''
+    def iterMoves(self,ttMove=0,killers=(),lastStage=QUIETS,quietOrder=None):
+        checkMasks = self.getCheckMasks()
+        return self.stagedMoves(checkMasks,ttMove,killers,QUIETS if self.inCheck else lastStage,quietOrder)
+
+    def stagedMoves(self,checkMasks,ttMove,killers,lastStage,quietOrder):
+        rows = self.rows
+        if ttMove and not self.isValidCode(checkMasks,ttMove,True,lastStage >= KILLERS):
+            ttMove = 0 # from another position with the same table slot.
+        if ttMove:
+            yield Move.fromCode(ttMove,rows)
+        if lastStage < CAPTURES:
+            return
+        codes = array('H')
+        self.generateMoveCodes(checkMasks,True,False,FULL,codes)
+        captures = [Move.fromCode(code,rows) for code in codes if code != ttMove]
+        captures.sort(key=captureOrder,reverse=True)
+        yield from captures
+        if lastStage < KILLERS:
+            return
+        tried = [ttMove]
+        for killer in killers:
+            if killer and killer not in tried and self.isValidCode(checkMasks,killer,False,True):
+                tried.append(killer)
+                yield Move.fromCode(killer,rows)
+        if lastStage < QUIETS:
+            return
+        codes = array('H')
+        self.generateMoveCodes(checkMasks,False,True,FULL,codes)
+        quiets = [Move.fromCode(code,rows) for code in codes if code not in tried]
+        if quietOrder is not None:
+            quiets.sort(key=quietOrder,reverse=True)
+        yield from quiets
+
+    '''
+    Whether a move code is valid here -- only the moves of the piece on its start square are generated.
+    '''
+    def isValidCode(self,checkMasks,code,captures,quiets):
+        moves = array('H')
+        self.generateMoveCodes(checkMasks,captures,quiets,1 << (code & 63),moves)
+        return code in moves
+
+    '''
+    What the move generators need to know about checks -- (us, king square, checking pieces, pinned pieces,
+    {pinned square: squares it may move to}). Also sets inCheck.
+    '''
+    def getCheckMasks(self):
+        us = 0 if self.whitetoMove else 1
+        bbs = self.pieceBitboards
+        ours = self.colorBitboards[us]
+        occupied = ours | self.colorBitboards[1 - us]
+        kingSq = bbs[6*us + 5].bit_length() - 1
+        base = 6*(1 - us)
+
+        # checks from leapers, then walk the enemy sliders that see the king on an empty board -- each one is
+        # either a check (nothing between), a pin (exactly one of our pieces between) or nothing.
+        checkers = (PAWN_ATTACKS[us][kingSq] & bbs[base]) | (KNIGHT_ATTACKS[kingSq] & bbs[base + 1])
+        pinned = 0
+        pinRays = {}
+        snipers = ((ROOK_RAYS[kingSq] & (bbs[base + 3] | bbs[base + 4])) |
+                   (BISHOP_RAYS[kingSq] & (bbs[base + 2] | bbs[base + 4])))
+        while snipers:
+            bit = snipers & -snipers
+            snipers ^= bit
+            sniperSq = bit.bit_length() - 1
+            blockers = BETWEEN[kingSq][sniperSq] & occupied
+            if blockers == 0:
+                checkers |= bit
+            elif blockers & (blockers - 1) == 0 and blockers & ours:
+                pinned |= blockers
+                pinRays[blockers.bit_length() - 1] = BETWEEN[kingSq][sniperSq] | bit
+        self.inCheck = checkers != 0
+        return us, kingSq, checkers, pinned, pinRays
+
+    '''
+    Appends the valid capture (and promotion) and/or quiet move codes of the pieces on fromMask to moves.
+    '''
+    def generateMoveCodes(self,checkMasks,captures,quiets,fromMask,moves):
+        us, kingSq, checkers, pinned, pinRays = checkMasks
+        them = 1 - us
+        theirs = self.colorBitboards[them]
+        occupied = self.colorBitboards[us] | theirs
+        stageMask = (theirs if captures else 0) | (FULL ^ occupied if quiets else 0)
+
+        if fromMask >> kingSq & 1:
+            # king moves -- the king is taken off the board so it can't hide behind itself along a checking ray.
+            occupiedWithoutKing = occupied ^ (1 << kingSq)
+            targets = KING_ATTACKS[kingSq] & stageMask
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                sq = bit.bit_length() - 1
+                if not self.attackersTo(sq,them,occupiedWithoutKing):
+                    moves.append(kingSq | sq << 6)
+            if quiets and not checkers:
+                self.getCastleMoves(us,kingSq,occupied,moves)
+
+        if checkers & (checkers - 1): # double check, king has to move.
+            return
+        if checkers: # only 1 check -- capture the checking piece or block the line.
+            targetMask = checkers | BETWEEN[kingSq][checkers.bit_length() - 1]
+        else:
+            targetMask = FULL
+        # promotions go with the captures, the other pawn pushes are quiet.
+        pushMask = targetMask & ((LAST_ROWS if captures else 0) | (FULL ^ LAST_ROWS if quiets else 0))
+        self.getPawnMoves(us,targetMask & theirs if captures else 0,pushMask,pinned,pinRays,fromMask,moves)
+        if captures:
+            self.getEnpassantMoves(us,kingSq,fromMask,moves)
+        self.getPieceMoves(us,targetMask & stageMask,pinned,pinRays,fromMask,moves)
+
+    '''
+    Pawn pushes and captures for the whole side at once, using shifts of the pawn bitboard.
+    '''
+    def getPawnMoves(self,us,captureMask,pushMask,pinned,pinRays,fromMask,moves):
+        pawns = self.pieceBitboards[6*us] & fromMask
+        empty = FULL ^ (self.colorBitboards[0] | self.colorBitboards[1])
+        if us == 0: # white pawns move towards row 0.
+            single = (pawns >> 8) & empty
+            double = ((single & ROW_5) >> 8) & empty
+            pawnMoves = ((single & pushMask, 8), (double & pushMask, 16),
+                         (((pawns & ~FILE_A) >> 9) & captureMask, 9),
+                         (((pawns & ~FILE_H) >> 7) & captureMask, 7))
+            sign = 1
+        else:
+            single = (pawns << 8) & empty & FULL
+            double = ((single & ROW_2) << 8) & empty & FULL
+            pawnMoves = ((single & pushMask, 8), (double & pushMask, 16),
+                         (((pawns & ~FILE_H) << 9) & captureMask, 9),
+                         (((pawns & ~FILE_A) << 7) & captureMask, 7))
+            sign = -1
+        for targets, offset in pawnMoves:
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                endSq = bit.bit_length() - 1
+                startSq = endSq + sign*offset
+                if pinned >> startSq & 1 and not pinRays[startSq] & bit:
+                    continue
+                code = startSq | endSq << 6
+                if bit & LAST_ROWS: # one move per promotion choice -- Q, R, B, N.
+                    moves.extend((code,code | 1 << 12,code | 2 << 12,code | 3 << 12))
+                else:
+                    moves.append(code)
+
+    '''
+    En passant captures -- tried on the occupancy after the capture, since taking 2 pawns off one row can uncover
+    a check that the pin masks don't see.
+    '''
+    def getEnpassantMoves(self,us,kingSq,fromMask,moves):
+        if self.enpassantPossible == ():
+            return
+        endSq = self.enpassantPossible[0]*8 + self.enpassantPossible[1]
+        capturedSq = endSq + (8 if us == 0 else -8)
+        them = 1 - us
+        pawns = PAWN_ATTACKS[them][endSq] & self.pieceBitboards[6*us] & fromMask
+        while pawns:
+            bit = pawns & -pawns
+            pawns ^= bit
+            occupied = (self.colorBitboards[0] | self.colorBitboards[1]) ^ bit ^ (1 << capturedSq) | (1 << endSq)
+            if self.attackersTo(kingSq,them,occupied) & ~(1 << capturedSq):
+                continue
+            moves.append(bit.bit_length() - 1 | endSq << 6)
+
+    '''
+    Castling -- the king isn't in check here, the squares between king and rook must be empty and the squares the
+    king crosses must not be attacked.
+    '''
+    def getCastleMoves(self,us,kingSq,occupied,moves):
+        them = 1 - us
+        rights = self.currentCastlingRight
+        kingSide, queenSide = (rights.wks, rights.wqs) if us == 0 else (rights.bks, rights.bqs)
+        if kingSide and not occupied & (3 << (kingSq + 1)):
+            if not self.attackersTo(kingSq + 1,them,occupied) and not self.attackersTo(kingSq + 2,them,occupied):
+                moves.append(kingSq | (kingSq + 2) << 6)
+        if queenSide and not occupied & (7 << (kingSq - 3)):
+            if not self.attackersTo(kingSq - 1,them,occupied) and not self.attackersTo(kingSq - 2,them,occupied):
+                moves.append(kingSq | (kingSq - 2) << 6)
+
+    '''
+    Knight, bishop, rook and queen moves from the precomputed masks.
+    '''
+    def getPieceMoves(self,us,targetMask,pinned,pinRays,fromMask,moves):
+        bbs = self.pieceBitboards
+        base = 6*us
+        occupied = self.colorBitboards[0] | self.colorBitboards[1]
+        knights = bbs[base + 1] & ~pinned & fromMask # a pinned knight can never move.
+        while knights:
+            bit = knights & -knights
+            knights ^= bit
+            sq = bit.bit_length() - 1
+            self.addMoves(sq,KNIGHT_ATTACKS[sq] & targetMask,moves)
+        for index, attacks in ((base + 2,bishopAttacks),(base + 3,rookAttacks),(base + 4,bishopAttacks),(base + 4,rookAttacks)):
+            pieces = bbs[index] & fromMask
+            while pieces:
+                bit = pieces & -pieces
+                pieces ^= bit
+                sq = bit.bit_length() - 1
+                targets = attacks(sq,occupied) & targetMask
+                if pinned & bit:
+                    targets &= pinRays[sq]
+                self.addMoves(sq,targets,moves)
+
+    def addMoves(self,startSq,targets,moves):
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            moves.append(startSq | (bit.bit_length() - 1) << 6)
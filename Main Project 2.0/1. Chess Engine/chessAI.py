@@ -0,0 +1,307 @@
+"""
+The computer player. Negamax alpha-beta search over GameState.iterMoves/makeMove/undoMove with iterative deepening,
+a fixed size transposition table, killer + history move ordering and a quiescence search, inside a time/node budget.
+Works with either GameState backend.
+"""
+import time
+
+import evaluation
+from chessEngine import CAPTURES
+
+CHECKMATE = 100000
+STALEMATE = 0
+MATE_BOUND = CHECKMATE - 1000 # scores above this are mates, counted in plies from the root.
+MAX_PLY = 128
+
+# transposition table entry flags.
+EXACT = 0
+LOWER_BOUND = 1 # failed high, the score is at least this.
+UPPER_BOUND = 2 # failed low, the score is at most this.
+SCORE_OFFSET = 1 << 21
+CHECK_INTERVAL = 1024 # nodes between looks at the clock and the stop event -- a node limit is kept exactly.
+
+class TranspositionTable():
+    '''
+    Fixed number of slots indexed by the low bits of the zobrist key. Each slot is two 64 bit ints -- the packed data
+    (move id, score, depth, flag, age) and the key xored with the data, so a slot written halfway never matches.
+    A slot is replaced when it is from an older search, holds the same position or has a shallower depth.
+    '''
+    def __init__(self,sizeMB=16) -> None:
+        size = tableSlots(sizeMB)
+        self.mask = size - 1
+        self.keys = [0]*size
+        self.data = [0]*size
+        self.age = 0
+
+    def newSearch(self):
+        self.age = (self.age + 1) & 63
+
+    def clear(self):
+        self.keys = [0]*len(self.keys) # new lists -- a loop over the slots takes seconds for a big table.
+        self.data = [0]*len(self.data)
+
+    '''
+    Returns (depth, score, flag, moveID) for the position, or None. moveID is 0 if no best move was stored.
+    '''
+    def probe(self,key):
+        index = key & self.mask
+        data = self.data[index]
+        if self.keys[index] ^ data != key or data == 0:
+            return None
+        return (data >> 16 & 0xFF,(data >> 24 & 0x3FFFFF) - SCORE_OFFSET,data >> 46 & 3,data & 0xFFFF)
+
+    def store(self,key,depth,score,flag,moveID):
+        index = key & self.mask
+        old = self.data[index]
+        if old != 0 and self.keys[index] ^ old != key and old >> 48 == self.age and old >> 16 & 0xFF > depth:
+            return # keep the deeper entry from this search.
+        if moveID == 0 and self.keys[index] ^ old == key:
+            moveID = old & 0xFFFF # keep the best move of an earlier search of the same position.
+        data = moveID | max(depth,0) << 16 | (score + SCORE_OFFSET) << 24 | flag << 46 | self.age << 48
+        self.data[index] = data
+        self.keys[index] = key ^ data
+
+
+'''
+Number of slots that fit in sizeMB -- a power of 2 so the key can be masked, 16 bytes a slot.
+'''
+def tableSlots(sizeMB):
+    size = 1
+    while size*2*16 <= sizeMB*1024*1024:
+        size *= 2
+    return size
+
+
+class SearchResult():
+    def __init__(self,bestMove,score,depth,pv,nodes,seconds) -> None:
+        self.bestMove = bestMove
+        self.score = score # centipawns for the side to move, mates are +/-(CHECKMATE - plies).
+        self.depth = depth
+        self.pv = pv # principal variation -- the expected line, starting with bestMove.
+        self.nodes = nodes
+        self.seconds = seconds
+
+    def mateIn(self):
+        # moves (not plies) to mate, negative if we are getting mated, None if the score isn't a mate.
+        if abs(self.score) < MATE_BOUND:
+            return None
+        plies = CHECKMATE - abs(self.score)
+        return (plies + 1)//2 if self.score > 0 else -(plies//2)
+
+
+class SearchStopped(Exception):
+    pass
+
+
+class Searcher():
+    def __init__(self,ttSizeMB=16,evaluate=evaluation.evaluate,tt=None,stopEvent=None) -> None:
+        self.tt = tt if tt is not None else TranspositionTable(ttSizeMB)
+        self.evaluate = evaluate
+        # optional threading/multiprocessing Event -- once set, searches stop. unlike stop() it can be set before the
+        # search starts (search() resets the stopped flag), so other threads and processes use it to cancel.
+        self.stopEvent = stopEvent
+        self.stopped = False
+        self.nodes = 0
+
+    '''
+    Ask a running search to stop -- it returns the best move of the last finished iteration. Safe from another thread.
+    '''
+    def stop(self):
+        self.stopped = True
+
+    '''
+    Iterative deepening from depth 1 until maxDepth, the time limit (seconds) or the node limit runs out. The search
+    never goes past nodeLimit nodes; the time and stop() are looked at every CHECK_INTERVAL nodes. onIteration(result)
+    is called after every finished depth. Returns a SearchResult, bestMove is None if there is no legal move.
+    startDepth > 1 skips the first iterations (helper searches use it to get out of step with each other).
+    '''
+    def search(self,gs,maxDepth=MAX_PLY - 1,timeLimit=None,nodeLimit=None,onIteration=None,startDepth=1):
+        self.startTime = time.perf_counter()
+        self.deadline = self.startTime + timeLimit if timeLimit is not None else None
+        self.nodeLimit = nodeLimit
+        self.stopped = False
+        self.nodes = 0
+        self.nextCheck = min(CHECK_INTERVAL,nodeLimit) if nodeLimit is not None else CHECK_INTERVAL
+        self.killers = [[0,0] for _ in range(MAX_PLY + 1)]
+        self.history = {}
+        self.pvTable = [[] for _ in range(MAX_PLY + 1)]
+        self.tt.newSearch()
+        self.keyCounts = self.gameKeyCounts(gs)
+        rootLength = len(gs.moveLog)
+
+        rootMoves = gs.getValidMoves()
+        result = SearchResult(rootMoves[0] if rootMoves else None,0,0,rootMoves[:1],0,0.0)
+        if len(rootMoves) <= 1: # nothing to think about.
+            return result
+        for depth in range(min(startDepth,maxDepth),maxDepth + 1):
+            self.rootBest = None
+            try:
+                score = self.negamax(gs,depth,-CHECKMATE - 1,CHECKMATE + 1,0)
+            except SearchStopped:
+                while len(gs.moveLog) > rootLength: # unwind the moves the interrupted search had made.
+                    gs.undoMove()
+                # a root move that already beat the previous best in the unfinished iteration is still an improvement.
+                if self.rootBest is not None and self.rootBest[0] != result.bestMove:
+                    result = SearchResult(self.rootBest[0],self.rootBest[1],result.depth,self.rootBest[2],self.nodes,
+                                          time.perf_counter() - self.startTime)
+                break
+            pv = self.pvTable[0][:] or result.pv
+            result = SearchResult(pv[0],score,depth,pv,self.nodes,time.perf_counter() - self.startTime)
+            if onIteration is not None:
+                onIteration(result)
+            if abs(score) >= MATE_BOUND and CHECKMATE - abs(score) <= depth:
+                break # found a forced mate that this depth fully covers.
+            if self.deadline is not None and time.perf_counter() > self.startTime + (self.deadline - self.startTime)/2:
+                break # the next iteration wouldn't finish anyway.
+        result.nodes = self.nodes
+        result.seconds = time.perf_counter() - self.startTime
+        return result
+
+    '''
+    How often each earlier position of the game has occurred, so the search can see repetitions -- the game state
+    logs the key before every move. The root itself is counted when the search enters it.
+    '''
+    def gameKeyCounts(self,gs):
+        counts = {}
+        for key in gs.zobristKeyLog:
+            counts[key] = counts.get(key,0) + 1
+        return counts
+
+    def checkBudget(self):
+        if self.stopEvent is not None and self.stopEvent.is_set():
+            self.stopped = True
+        if self.stopped or (self.deadline is not None and time.perf_counter() > self.deadline) or \
+                (self.nodeLimit is not None and self.nodes >= self.nodeLimit):
+            self.stopped = True
+            raise SearchStopped()
+        self.nextCheck = self.nodes + CHECK_INTERVAL
+        if self.nodeLimit is not None:
+            self.nextCheck = min(self.nextCheck,self.nodeLimit)
+
+    def negamax(self,gs,depth,alpha,beta,ply):
+        self.nodes += 1
+        if self.nodes >= self.nextCheck:
+            self.checkBudget()
+        self.pvTable[ply] = []
+        key = gs.zobristKey
+        if ply > 0 and self.keyCounts.get(key,0) > 0:
+            return STALEMATE # repetition -- treated as a draw.
+
+        ttMove = 0
+        entry = self.tt.probe(key)
+        if entry is not None:
+            ttMove = entry[3]
+            if ply > 0 and entry[0] >= depth:
+                score = self.scoreFromTT(entry[1],ply)
+                if entry[2] == EXACT or (entry[2] == LOWER_BOUND and score >= beta) or (entry[2] == UPPER_BOUND and score <= alpha):
+                    return score
+
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiescence(gs,alpha,beta,ply)
+        # staged -- a cutoff on the tt move or a capture means the quiet moves are never generated.
+        moves = gs.iterMoves(ttMove,self.killers[ply],quietOrder=self.historyScore)
+        inCheck = gs.inCheck
+        if inCheck and ply < MAX_PLY//2:
+            depth += 1 # check extension.
+
+        alphaOriginal = alpha
+        bestScore = -CHECKMATE - 1
+        bestMove = None
+        self.keyCounts[key] = self.keyCounts.get(key,0) + 1
+        for move in moves:
+            gs.makeMove(move)
+            score = -self.negamax(gs,depth - 1,-beta,-alpha,ply + 1)
+            gs.undoMove()
+            if score > bestScore:
+                bestScore = score
+                bestMove = move
+                if score > alpha:
+                    alpha = score
+                    self.pvTable[ply] = [move] + self.pvTable[ply + 1]
+                    if ply == 0:
+                        self.rootBest = (move,score,self.pvTable[0][:])
+                    if alpha >= beta:
+                        if move.pieceCaptured == "--": # quiet move caused a cutoff -- remember it for ordering.
+                            if self.killers[ply][0] != move.moveID:
+                                self.killers[ply][1] = self.killers[ply][0]
+                                self.killers[ply][0] = move.moveID
+                            historyKey = (move.pieceMoved,move.endRow,move.endCol)
+                            self.history[historyKey] = self.history.get(historyKey,0) + depth*depth
+                        break
+        self.keyCounts[key] -= 1
+        if bestMove is None: # no valid move.
+            return -CHECKMATE + ply if inCheck else STALEMATE
+
+        if bestScore <= alphaOriginal:
+            flag = UPPER_BOUND
+        elif bestScore >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.tt.store(key,depth,self.scoreToTT(bestScore,ply),flag,bestMove.moveID)
+        return bestScore
+
+    '''
+    Only captures and promotions until the position is quiet, so the evaluation is never taken in the middle of an
+    exchange. The side to move may stand pat unless it is in check, then every evasion is searched.
+    '''
+    def quiescence(self,gs,alpha,beta,ply):
+        self.nodes += 1
+        if self.nodes >= self.nextCheck:
+            self.checkBudget()
+        moves = gs.iterMoves(lastStage=CAPTURES) # every evasion when in check -- nothing is generated yet.
+        inCheck = gs.inCheck
+        if not inCheck:
+            standPat = self.evaluate(gs)
+            if standPat >= beta or ply >= MAX_PLY:
+                return standPat
+            if standPat > alpha:
+                alpha = standPat
+        searched = False
+        for move in moves:
+            searched = True
+            gs.makeMove(move)
+            score = -self.quiescence(gs,-beta,-alpha,ply + 1)
+            gs.undoMove()
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        if inCheck and not searched:
+            return -CHECKMATE + ply
+        return alpha
+
+    # quiet move order -- how much depth the move has cut off with so far.
+    def historyScore(self,move):
+        return self.history.get((move.pieceMoved,move.endRow,move.endCol),0)
+
+    # mate scores are stored relative to the node so they stay right when the position is reached at another ply.
+    def scoreToTT(self,score,ply):
+        if score >= MATE_BOUND:
+            return score + ply
+        if score <= -MATE_BOUND:
+            return score - ply
+        return score
+
+    def scoreFromTT(self,score,ply):
+        if score >= MATE_BOUND:
+            return score - ply
+        if score <= -MATE_BOUND:
+            return score + ply
+        return score
+
+
+'''
+Time to spend on one move -- an even share of the clock over the moves still to play, plus most of the increment.
+'''
+def allocateTime(timeLeft,increment=0.0,movesToGo=None):
+    share = timeLeft/(movesToGo if movesToGo else 30) + increment*0.8
+    return max(0.01,min(share,timeLeft*0.5))
+
+'''
+Best move for the side to move within the given budget, or None if there is no legal move.
+'''
+def findBestMove(gs,timeLimit=None,maxDepth=MAX_PLY - 1,nodeLimit=None,searcher=None):
+    if searcher is None:
+        searcher = Searcher()
+    return searcher.search(gs,maxDepth,timeLimit,nodeLimit).bestMove
@@ -1,6 +1,21 @@
 """
 This class is responsible for storing all the information of the current state of the chess game . also responsible for determining the valid moves at the current state.It will also keep a move log.
 """
+import re
+from array import array
+
+import evaluation
+import zobrist
+from attackTables import (BETWEEN_SQUARES, BISHOP_DIRECTIONS, DIRECTIONS, KING_TARGETS, KNIGHT_TARGETS, RAYS,
+                          ROOK_DIRECTIONS)
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# stages of GameState.iterMoves, in the order the moves come out.
+TT_MOVE = 0
+CAPTURES = 1 # captures, en passant and promotions.
+KILLERS = 2
+QUIETS = 3
 
 class GameState():
     def __init__(self) -> None:
@@ -16,54 +31,237 @@ class GameState():
             ["--","--","--","--","--","--","--","--"],
             ["wp","wp","wp","wp","wp","wp","wp","wp"],
             ["wR","wN","wB","wQ","wK","wB","wN","wR"]]
-        self.moveFunctions = {'p':self.getPawnMoves,'R':self.getRookMoves,'N':self.getKnightMoves,
-                            'B':self.getBishopMoves,'Q':self.getQueenMoves,'K':self.getKingMoves}
-
-        self.whitetoMove = True
-        self.moveLog = []
-        self.whiteKingLocation = (7,4)
-        self.blackKingLocation = (0,4)
         # self.checkMate = False
         # self.staleMate = False -- naive algorithm
         self.inCheck = False
         self.pins = []
         self.checks = []
+        self.setPosition(self.board,True,CastleRights(True,True,True,True),())
 
+    '''
+    Sets up the position from a FEN string -- the move log starts empty from there.
+    '''
+    def loadFen(self,fen):
+        self.setPosition(*parseFen(fen),*fenCounters(fen))
 
-       
+    '''
+    The position (not the move log) as SNAPSHOT_SIZE bytes -- see encodeSnapshot.
+    '''
+    def snapshot(self):
+        return encodeSnapshot(self.board,self.whitetoMove,self.currentCastlingRight,self.enpassantPossible)
+
+    '''
+    Sets up the position from snapshot() bytes -- the move log starts empty from there, like loadFen.
+    '''
+    def restore(self,data):
+        self.setPosition(*decodeSnapshot(data))
+
+    def setPosition(self,board,whitetoMove,castleRights,enpassantPossible,halfmoves=0,fullmoves=1):
+        kings = kingLocations(board) # first -- a position without its kings leaves the game as it was.
+        self.board = board
+        self.whitetoMove = whitetoMove
+        self.currentCastlingRight = castleRights
+        self.enpassantPossible = enpassantPossible # coordinates of the square where an en passant capture is possible.
+        self.whiteKingLocation, self.blackKingLocation = kings
+        # the move log -- a move code (Move.moveID) per move, and the undoInfo of it. with the board after the move
+        # that is all undoMove needs, so no Move objects are kept.
+        self.moveLog = array('H')
+        self.undoLog = array('H')
+        self.startHalfmoves = halfmoves # the FEN counters of the position the log starts from.
+        self.startFullmoves = fullmoves
+        # key and scores before each move, so undoMove restores them instead of working them out again.
+        self.zobristKeyLog = array('Q') # every earlier position of the game -- repetitions are counted from it.
+        self.scoreLog = array('i') # mgScore, egScore, phase.
+        # 64 bit position key -- xored by makeMove/undoMove, never recomputed from the board.
+        self.zobristKey = zobrist.computeKey(board,whitetoMove,castleRights,enpassantPossible)
+        # material + piece-square scores and game phase -- updated by makeMove/undoMove like the key.
+        self.mgScore, self.egScore, self.phase = evaluation.computeScores(board)
+
+    '''
+    The last move made, rebuilt from the move log -- None at the start.
+    '''
+    def lastMove(self):
+        if len(self.moveLog) == 0:
+            return None
+        return Move.fromLog(self.moveLog[-1],self.undoLog[-1],self.board)
 
+    '''
+    The position as a FEN string.
+    '''
+    def getFen(self):
+        return formatFen(self.board,self.whitetoMove,self.currentCastlingRight,self.enpassantPossible,self.undoLog,
+                         self.startHalfmoves,self.startFullmoves)
 
-    """Takes a move as parameter -- executes it (not for casstiling,en passant and pawn promotion.)
+    """Takes a move as parameter -- executes it (including castling, en passant and pawn promotion.)
     """    
     def makeMove(self,move):
+        # log the move -- to see the history of the game, and the state it changes.
+        castleBefore = self.currentCastlingRight.bits()
+        enpassantBefore = self.enpassantPossible
+        self.moveLog.append(move.moveID)
+        self.undoLog.append(undoInfo(move,castleBefore,enpassantBefore))
+        self.zobristKeyLog.append(self.zobristKey)
+        self.scoreLog.extend((self.mgScore,self.egScore,self.phase))
         self.board[move.startRow][move.startCol] = "--"
         self.board[move.endRow][move.endCol] = move.pieceMoved
-        self.moveLog.append(move) # log the move -- to see the history of the game.
         self.whitetoMove = not self.whitetoMove # swap players.
         # update the kings location.
         if move.pieceMoved == 'wK':
             self.whiteKingLocation = (move.endRow,move.endCol)
         if move.pieceMoved == 'bK':
             self.blackKingLocation = (move.endRow,move.endCol)
+        # pawn promotion -- the pawn is replaced by the chosen piece.
+        if move.isPawnPromotion:
+            self.board[move.endRow][move.endCol] = move.pieceMoved[0] + move.promotionChoice
+        # en passant -- the captured pawn is beside the start square, not on the end square.
+        if move.isEnpassantMove:
+            self.board[move.startRow][move.endCol] = "--"
+        # update enpassantPossible -- only on 2 square pawn advances.
+        if move.pieceMoved[1] == 'p' and abs(move.startRow - move.endRow) == 2:
+            self.enpassantPossible = enpassantSquare(self.board,move.endRow,move.endCol)
+        else:
+            self.enpassantPossible = ()
+        # castle move -- move the rook as well.
+        if move.isCastleMove:
+            if move.endCol - move.startCol == 2: # king side castle.
+                self.board[move.endRow][move.endCol-1] = self.board[move.endRow][7]
+                self.board[move.endRow][7] = "--"
+            else: # queen side castle.
+                self.board[move.endRow][move.endCol+1] = self.board[move.endRow][0]
+                self.board[move.endRow][0] = "--"
+        # update castling rights -- whenever a king or a rook moves or a rook is captured.
+        self.currentCastlingRight.update(move)
+        self.zobristKey ^= zobrist.moveDelta(move,castleBefore,self.currentCastlingRight.bits(),enpassantBefore,
+                                             self.enpassantPossible)
+        mgDelta, egDelta, phaseDelta = evaluation.moveDelta(move)
+        self.mgScore += mgDelta
+        self.egScore += egDelta
+        self.phase += phaseDelta
 
     '''
-    Undo the last move made.
+    Undo the last move made -- from the move code, the undo byte and the board, no Move object needed.
     '''
     def undoMove(self):
         if len(self.moveLog)!=0: # make sure there is a move to undo.
-            move = self.moveLog.pop()
-            self.board[move.startRow][move.startCol] = move.pieceMoved
-            self.board[move.endRow][move.endCol] = move.pieceCaptured
+            code = self.moveLog.pop()
+            info = self.undoLog.pop()
+            startRow, startCol = SQUARES[code & 63]
+            endRow, endCol = SQUARES[code >> 6 & 63]
+            board = self.board
+            pieceMoved = board[endRow][endCol]
+            if info & LOG_PROMOTION: # it was a pawn before it promoted.
+                pieceMoved = pieceMoved[0] + 'p'
+            board[startRow][startCol] = pieceMoved
+            # undo en passant -- the landing square was empty, the captured pawn goes back beside the start square.
+            if info & LOG_ENPASSANT:
+                board[endRow][endCol] = "--"
+                board[startRow][endCol] = PIECE_CODES[info & 15]
+            else:
+                board[endRow][endCol] = PIECE_CODES[info & 15]
             self.whitetoMove = not self.whitetoMove # switch players.  
-            # update the king's position if needed.      
-            if move.pieceMoved == 'wK':
-                self.whiteKingLocation = (move.startRow,move.startCol)
-            if move.pieceMoved == 'bK':
-                self.blackKingLocation = (move.startRow,move.startCol)
+            # update the king's position if needed -- and put the rook back after castling.
+            if pieceMoved[1] == 'K':
+                if pieceMoved == 'wK':
+                    self.whiteKingLocation = (startRow,startCol)
+                else:
+                    self.blackKingLocation = (startRow,startCol)
+                if endCol - startCol == 2: # king side.
+                    board[endRow][7] = board[endRow][endCol-1]
+                    board[endRow][endCol-1] = "--"
+                elif startCol - endCol == 2: # queen side.
+                    board[endRow][0] = board[endRow][endCol+1]
+                    board[endRow][endCol+1] = "--"
+            # the state from before the move.
+            self.currentCastlingRight.setBits(info >> LOG_CASTLE_SHIFT & 15)
+            enpassantCol = info >> LOG_ENPASSANT_SHIFT
+            self.enpassantPossible = (2 if self.whitetoMove else 5,enpassantCol - 1) if enpassantCol else ()
+            self.zobristKey = self.zobristKeyLog.pop()
+            self.phase = self.scoreLog.pop()
+            self.egScore = self.scoreLog.pop()
+            self.mgScore = self.scoreLog.pop()
 
-    def getValidMoves(self):
+    '''
+    The valid moves as 16 bit codes (see Move.moveID) -- cheap to keep, send or count when the Move objects aren't needed.
+    '''
+    def getValidMoveCodes(self):
+        return array('H',[move.moveID for move in self.getValidMoves()])
+
+    '''
+    Valid moves one stage at a time, best stages first -- the transposition table move, captures and promotions by
+    most valuable victim / least valuable attacker, the killer moves, then the quiet moves (sorted by quietOrder if
+    given), up to lastStage. A stage is only generated once the search asks for its first move, and the table move
+    and killers are checked against the moves of their own piece only, so a node that cuts off early never builds its
+    quiet moves. In check every evasion is handed out, whatever lastStage is. gs.inCheck is set when this returns.
+    '''
+    def iterMoves(self,ttMove=0,killers=(),lastStage=QUIETS,quietOrder=None):
+        checkInfo = self.checkForPinsAndChecks()
+        self.inCheck = checkInfo[0]
+        return self.stagedMoves(checkInfo,ttMove,killers,QUIETS if self.inCheck else lastStage,quietOrder)
+
+    def stagedMoves(self,checkInfo,ttMove,killers,lastStage,quietOrder):
+        # the searches below this node set the pins and checks of their own positions -- put ours back every time.
+        self.inCheck,self.pins,self.checks = checkInfo
+        # None if there is none, or it is from another position with the same table slot.
+        ttMove = self.getPieceMove(ttMove,True,lastStage >= KILLERS) if ttMove else None
+        if ttMove is not None:
+            yield ttMove
+        if lastStage < CAPTURES:
+            return
+        self.inCheck,self.pins,self.checks = checkInfo
+        captures = [move for move in self.generateMoves(True,False) if move != ttMove]
+        captures.sort(key=captureOrder,reverse=True)
+        yield from captures
+        if lastStage < KILLERS:
+            return
+        tried = [ttMove.moveID if ttMove is not None else 0]
+        for killer in killers:
+            if killer and killer not in tried:
+                self.inCheck,self.pins,self.checks = checkInfo
+                move = self.getPieceMove(killer,False,True)
+                if move is not None:
+                    tried.append(killer)
+                    yield move
+        if lastStage < QUIETS:
+            return
+        self.inCheck,self.pins,self.checks = checkInfo
+        quiets = [move for move in self.generateMoves(False,True) if move.moveID not in tried]
+        if quietOrder is not None:
+            quiets.sort(key=quietOrder,reverse=True)
+        yield from quiets
+
+    '''
+    The valid move with this code among the captures and/or quiet moves, None if there is none -- only the moves of
+    the piece on its start square are generated. Needs the pins and checks of checkForPinsAndChecks set.
+    '''
+    def getPieceMove(self,code,captures,quiets):
+        r, c = divmod(code & 63,8)
+        piece = self.board[r][c]
+        if piece[0] != ('w' if self.whitetoMove else 'b'):
+            return None
         moves = []
+        if piece[1] == 'K':
+            self.getKingMoves(r,c,moves,captures,quiets)
+            if quiets and not self.inCheck:
+                self.getCastleMoves(r,c,moves)
+        elif len(self.checks) < 2: # in double check only the king moves.
+            self.moveFunctions[piece[1]](self,r,c,moves,captures,quiets)
+            if self.inCheck:
+                kingRow, kingCol = self.whiteKingLocation if self.whitetoMove else self.blackKingLocation
+                moves = self.filterChecks(moves,kingRow,kingCol)
+        for move in moves:
+            if move.moveID == code:
+                return move
+        return None
+
+    def getValidMoves(self):
         self.inCheck,self.pins,self.checks = self.checkForPinsAndChecks()
+        return self.generateMoves(True,True)
+
+    '''
+    The valid captures (and promotions) and/or quiet moves, for the pins and checks of checkForPinsAndChecks.
+    '''
+    def generateMoves(self,captures,quiets):
+        moves = []
         if self.whitetoMove:
             kingRow = self.whiteKingLocation[0]
             kingCol = self.whiteKingLocation[1]
@@ -72,35 +270,32 @@ class GameState():
             kingCol = self.blackKingLocation[1]
         if self.inCheck:
             if len(self.checks)==1: # onlly 1 check , block check or move king.
-                moves = self.getAllPossibleMoves()
-                # to block a check you must move a piece into one of the squares between the enemy pieces and king
-                check = self.check[0] # check information.
-                checkRow = check[0]
-                checkCol = check[1]
-                pieceChecking = self.board[checkRow][checkCol] # enemy piece causing the check.
-                validSquares = [] # squares that pieces can move to.
-                # if knight, must capture knight or move king, other pieces can be blocked.
-                if pieceChecking[1] == 'N':
-                    validSquares = [(checkRow,checkCol)]
-                else:
-                    for i in range(1,8):
-                        validSquare = (kingRow + check[2]*i, kingCol + check[3]*i) # check[2] and check[3] are the check directions.
-                        validSquares.append(validSquare)
-                        if validSquare[0] == checkRow and validSquare[1] == checkCol: # once you get to piece and checks.
-                            break
-
-                # get rid of any moves that don't block check or move king.
-                for i in range(len(moves) -1,-1,-1): # go through backwards when you are removing from a list as iterating.
-                    if moves[i].pieceMoved[1] != 'K': # move doesnt move king to it  -- must block or capture.
-                        if not (moves[i].endRow,moves[i].endCol) in validSquares: # move doesnt block check or capture piece.
-                            moves.remove(moves[i])
+                moves = self.filterChecks(self.getAllPossibleMoves(captures,quiets),kingRow,kingCol)
             else: # double check, king has to move.
-                self.getKingMoves(kingRow,kingCol,moves)
+                self.getKingMoves(kingRow,kingCol,moves,captures,quiets)
         else: # not in check so all moves are fine.
-            moves = self.getAllPossibleMoves()
+            moves = self.getAllPossibleMoves(captures,quiets)
+            if quiets:
+                self.getCastleMoves(kingRow,kingCol,moves)
         
         return moves
 
+    '''
+    The moves that answer a single check -- the king moving, or another piece blocking or capturing the checker.
+    '''
+    def filterChecks(self,moves,kingRow,kingCol):
+        # to block a check you must move a piece into one of the squares between the enemy pieces and king
+        check = self.checks[0] # check information.
+        checkSquare = check[0]*8 + check[1]
+        # squares that pieces can move to -- the checking piece and the squares between it and the king.
+        # a knight or a pawn is never on a line with squares between, so it can only be captured.
+        validSquares = BETWEEN_SQUARES[kingRow*8 + kingCol][checkSquare] | {checkSquare}
+
+        # get rid of any moves that don't block check or move king. (en passant is already checked when generated.)
+        return [move for move in moves if move.pieceMoved[1] == 'K' or move.isEnpassantMove or
+                move.endRow*8 + move.endCol in validSquares]
+
+
 
     '''
     All moves considering checks
@@ -160,16 +355,17 @@ class GameState():
 
 
     '''
-    All moves withoud considering checks.
+    All moves withoud considering checks -- the captures (and promotions) and/or the quiet moves.
     '''
-    def getAllPossibleMoves(self):
+    def getAllPossibleMoves(self,captures=True,quiets=True):
         moves=[]
         for r in range(len(self.board)): # no. of rows
             for c in range(len(self.board[r])): # no . of columns
                  turn = self.board[r][c][0]
                  if (turn == 'w' and self.whitetoMove) or (turn == 'b' and not self.whitetoMove):
                     piece = self.board[r][c][1]
-                    self.moveFunctions[piece](r,c,moves) # calls the appropriate funcrtion based on piece type.
+                    # calls the appropriate funcrtion based on piece type.
+                    self.moveFunctions[piece](self,r,c,moves,captures,quiets)
         
         return moves     
 
@@ -191,167 +387,290 @@ class GameState():
             startRow = self.blackKingLocation[0]
             startCol = self.blackKingLocation[1]
         # check outward from king for pins and checks, keep track of pins.
-        directions = ((-1,0),(0,-1),(1,0),(0,1),(-1,-1),(-1,1),(1,-1),(1,1))
-        for j in range(len(directions)):
-            d = directions[j]
+        rays = RAYS[startRow*8 + startCol]
+        for j in range(8):
+            d = DIRECTIONS[j]
             possiblePin = () # resets possible pins
-            for i in range(1,8):
-                endRow = startRow + d[0]*i
-                endCol = startCol + d[1]*i
-                if 0 <= endRow < 8 and 0 <= endCol < 8:
-                    endPiece = self.board[endRow][endCol]
-                    if endPiece[0] == allyColor:
-                        if possiblePin == (): # 1st allied piece could be pinned.
-                            possiblePin = (endRow,endCol,d[0],d[1])
-                        else: # 2nd allied piece , so no pin or check possible in this direction.
+            i = 0
+            for endRow, endCol in rays[j]: # the precomputed ray stops at the edge of the board.
+                i += 1
+                endPiece = self.board[endRow][endCol]
+                if endPiece[0] == allyColor:
+                    if possiblePin == (): # 1st allied piece could be pinned.
+                        possiblePin = (endRow,endCol,d[0],d[1])
+                    else: # 2nd allied piece , so no pin or check possible in this direction.
+                        break
+                elif endPiece[0] == enemyColor:
+                    type = endPiece[1]
+                    # 5 possiblities here in this complex conditional
+                    # 1) orthogonally away from king and piece is a rook.
+                    # 2) diagonally away from king and piece is a bishop.
+                    # 3) 1 square away diagonally from king and piece is a pawn.
+                    # 4) any direction and piece is a queen.
+                    # 5) any direction 1 square away and piece is a king(this is neccesasry to prevent a kiing move to a square controled by another king.)
+                    if (0 <= j <= 3 and type =="R") or  \
+                            (4 <= j <= 7 and type =='B') or \
+                            (i==1 and type == 'p' and ((enemyColor == 'w' and 6 <= j <= 7) or (enemyColor == 'b' and 4 <= j <= 5))) or \
+                            (type == 'Q') or (i == 1 and type == 'K'):
+                        if possiblePin == (): # no piece blocking , so check.
+                            inCheck = True
+                            checks.append((endRow,endCol,d[0],d[1]))
                             break
-                    elif endPiece[0] == enemyColor:
-                        type = endPiece[1]
-                        # 5 possiblities here in this complex conditional
-                        # 1) orthogonally away from king and piece is a rook.
-                        # 2) diagonally away from king and piece is a bishop.
-                        # 3) 1 square away diagonally from king and piece is a pawn.
-                        # 4) any direction and piece is a queen.
-                        # 5) any direction 1 square away and piece is a king(this is neccesasry to prevent a kiing move to a square controled by another king.)
-                        if (0 <= j <= 7 and type =="R") or  \
-                                (4 <= j <= 7 and type =='B') or \
-                                (i==1 and type == 'p' and ((enemyColor == 'w' and 6 <= j <= 7) or (enemyColor == 'b' and 4 <= j <= 5))) or \
-                                (type == 'Q') or (i == 1 and type == 'K'):
-                            if possiblePin == (): # no piece blocking , so check.
-                                inCheck = True
-                                checks.append((endRow,endCol,d[0],d[1]))
-                                break
-                            else: # piece blocking so pin
-                                pins.append(possiblePin)
-                                break
-                        else: # enemy piece not applying check.
+                        else: # piece blocking so pin
+                            pins.append(possiblePin)
                             break
-                # check for knight checks
-                knightMoves = ((-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1))
-                for m in knightMoves:
-                    endRow = startRow + m[0]
-                    endCol = startCol + m[1]
-                    if 0 <= endRow < 8 and 0 <= endCol < 8:
-                        endPiece = self.board[endRow][endCol]
-                        if endPiece[0] == enemyColor and endPiece[1] =='N': # enemy knight attacking king.
-                            inCheck = True
-                            checks.append((endRow,endCol,m[0],m[1]))
-                return inCheck,pins,checks
+                    else: # enemy piece not applying check.
+                        break
+        # check for knight checks -- once, after all the directions have been walked.
+        for endRow, endCol in KNIGHT_TARGETS[startRow*8 + startCol]:
+            endPiece = self.board[endRow][endCol]
+            if endPiece[0] == enemyColor and endPiece[1] =='N': # enemy knight attacking king.
+                inCheck = True
+                checks.append((endRow,endCol,endRow - startRow,endCol - startCol))
+        return inCheck,pins,checks
+
+    '''
+    determine if the enemy can attack the square -- looks outward from the square as if our king stood on it.
+    '''
+    def squareUnderAttack(self,r,c):
+        if self.whitetoMove:
+            kingLocation = self.whiteKingLocation
+            self.whiteKingLocation = (r,c)
+            inCheck = self.checkForPinsAndChecks()[0]
+            self.whiteKingLocation = kingLocation
+        else:
+            kingLocation = self.blackKingLocation
+            self.blackKingLocation = (r,c)
+            inCheck = self.checkForPinsAndChecks()[0]
+            self.blackKingLocation = kingLocation
+        return inCheck
+
+    '''
+    Returns the direction the piece at row, col is pinned from (king towards the piece), or () if it is not pinned.
+    '''
+    def getPinDirection(self,r,c):
+        for pin in self.pins:
+            if pin[0] == r and pin[1] == c:
+                return (pin[2],pin[3])
+        return ()
 
     '''
     Get all the pawn moves for the pawn located at row, col and add these moves to the list
     '''                
-    def getPawnMoves(self,r,c,moves):
+    def getPawnMoves(self,r,c,moves,captures=True,quiets=True):
+        pinDirection = self.getPinDirection(r,c)
         if self.whitetoMove: # white pawn moves.
-            if self.board[r-1][c] == "--": # 1 pawn square pawn advance.
-                moves.append(Move((r,c),(r-1,c),self.board))
-                if r == 6 and self.board[r-2][c]=="--": # 2 square pawn advancee.
-                    moves.append(Move((r,c),(r-2,c),self.board))
-            if c-1 >= 0: # capture to the left.
-                if self.board[r-1][c-1][0] == 'b': # enemy piece to capture.
-                    moves.append(Move((r,c),(r-1,c-1),self.board))
-            
-            if c+1 <= 7: # captures to the right.
-                if self.board[r-1][c+1][0] == 'b':
-                    moves.append(Move((r,c),(r-1,c+1),self.board))
-
+            moveAmount = -1
+            startRow = 6
+            enemyColor = 'b'
         else: # for black pawn moves.
-            if self.board[r+1][c] == "--": # 1 square moves
-                moves.append(Move((r,c),(r+1,c),self.board))
-                if r==1 and self.board[r+2][c] == "--": # 2 square moves.
-                    moves.append(Move((r,c),(r+2,c),self.board))
-            
-            # captures
-            if c-1>=0: # capture to left
-                if self.board[r+1][c-1][0] == "w":
-                    moves.append(Move((r,c),(r+1,c-1),self.board))
-            if c+1<=7: # capture to right
-                if self.board[r+1][c+1][0] == "w":
-                    moves.append(Move((r,c),(r+1,c+1),self.board))
+            moveAmount = 1
+            startRow = 1
+            enemyColor = 'w'
+
+        promotion = r+moveAmount in (0,7) # a promotion push goes with the captures.
+        if self.board[r+moveAmount][c] == "--" and (captures if promotion else quiets): # 1 square pawn advance.
+            if pinDirection == () or pinDirection == (moveAmount,0) or pinDirection == (-moveAmount,0):
+                self.addPawnMove((r,c),(r+moveAmount,c),moves)
+                if r == startRow and self.board[r+2*moveAmount][c] == "--": # 2 square pawn advance.
+                    moves.append(Move((r,c),(r+2*moveAmount,c),self.board))
+        for d in (-1,1) if captures else (): # captures to the left and to the right.
+            if 0 <= c+d <= 7 and (pinDirection == () or pinDirection == (moveAmount,d)):
+                if self.board[r+moveAmount][c+d][0] == enemyColor: # enemy piece to capture.
+                    self.addPawnMove((r,c),(r+moveAmount,c+d),moves)
+                elif (r+moveAmount,c+d) == self.enpassantPossible:
+                    move = Move((r,c),(r+moveAmount,c+d),self.board)
+                    if not self.enpassantExposesKing(move):
+                        moves.append(move)
 
-            # make pawn promotion later.
+    '''
+    Adds a pawn move -- one move per promotion choice if the pawn reaches the last row.
+    '''
+    def addPawnMove(self,startSq,endSq,moves):
+        if endSq[0] == 0 or endSq[0] == 7:
+            for choice in PROMOTION_CHOICES:
+                moves.append(Move(startSq,endSq,self.board,promotionChoice=choice))
+        else:
+            moves.append(Move(startSq,endSq,self.board))
 
+    '''
+    En passant takes 2 pawns off a row at once, which can uncover a check the pin logic can't see -- so just try it.
+    '''
+    def enpassantExposesKing(self,move):
+        self.makeMove(move)
+        self.whitetoMove = not self.whitetoMove # look from the side that just moved.
+        inCheck = self.checkForPinsAndChecks()[0]
+        self.whitetoMove = not self.whitetoMove
+        self.undoMove()
+        return inCheck
 
     '''
     Get all the rook moves for the rook located at row, col and add these moves to the list
     '''                
-    def getRookMoves(self,r,c,moves):
-        directions = ((-1,0),(0,-1),(1,0),(0,1)) # up, left, down,right
+    def getRookMoves(self,r,c,moves,captures=True,quiets=True):
+        self.getSlidingMoves(r,c,ROOK_DIRECTIONS,moves,captures,quiets) # up, left, down,right
+
+    '''
+    Moves along each direction (indices into DIRECTIONS) until the edge of the board or a piece -- a pinned piece can
+    only slide along its pin.
+    '''
+    def getSlidingMoves(self,r,c,directions,moves,captures=True,quiets=True):
+        pinDirection = self.getPinDirection(r,c)
         enemyColor = "b" if self.whitetoMove else "w"
-        for d in directions:
-            for i in range(1,8):
-                endRow = r + d[0]*i
-                endCol = c + d[1]*i
-                if 0 <= endRow < 8 and 0 <= endCol < 8: # on board
-                    endPiece = self.board[endRow][endCol]
-                    if endPiece == "--": # empty space valid
+        rays = RAYS[r*8 + c]
+        for j in directions:
+            d = DIRECTIONS[j]
+            if pinDirection != () and pinDirection != d and pinDirection != (-d[0],-d[1]):
+                continue
+            for endRow, endCol in rays[j]: # the precomputed ray stops at the edge of the board.
+                endPiece = self.board[endRow][endCol]
+                if endPiece == "--": # empty space valid
+                    if quiets:
                         moves.append(Move((r,c),(endRow,endCol),self.board))
-                    elif endPiece[0] == enemyColor: # enemy piece valid
+                elif endPiece[0] == enemyColor: # enemy piece valid
+                    if captures:
                         moves.append(Move((r,c),(endRow,endCol),self.board))
-                        break
-                    else: # friendly piece invalid
-                        break
-                else: # off board
+                    break
+                else: # friendly piece invalid
                     break
 
     '''
     Get all the Knight moves for the Knight located at row, col and add these moves to the list
     '''                
-    def getKnightMoves(self,r,c,moves):
-        knightMoves = ((-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1))
+    def getKnightMoves(self,r,c,moves,captures=True,quiets=True):
+        if self.getPinDirection(r,c) != (): # a pinned knight can never move.
+            return
         allyColor = "w" if self.whitetoMove else "b"
-        for m in knightMoves:
-            endRow = r + m[0]
-            endCol = c + m[1]
-            if 0 <= endRow < 8 and 0 <= endCol < 8:
-                endPiece = self.board[endRow][endCol]
-                if endPiece[0] != allyColor: # not an ally piece (empty or enemy piece)
-                    moves.append(Move((r,c),(endRow,endCol),self.board))
+        for endRow, endCol in KNIGHT_TARGETS[r*8 + c]:
+            endPiece = self.board[endRow][endCol]
+            # not an ally piece (empty or enemy piece), of the stage asked for.
+            if endPiece[0] != allyColor and (quiets if endPiece == "--" else captures):
+                moves.append(Move((r,c),(endRow,endCol),self.board))
 
     '''
     Get all the bishop moves for the bishop located at row, col and add these moves to the list
     '''                
-    def getBishopMoves(self,r,c,moves):
-        directions = ((-1,-1),(-1,1),(1,-1),(1,1)) # 4 diagonals. 
-        enemyColor = "b" if self.whitetoMove else "w"
-        for d in directions:
-            for i in range(1,8):
-                endRow = r + d[0]*i
-                endCol = c + d[1]*i
-                if 0 <= endRow < 8 and 0 <= endCol <8:
-                    endPiece = self.board[endRow][endCol]
-                    if endPiece == "--": # empty space valid
-                        moves.append(Move((r,c),(endRow,endCol),self.board))
-                    elif endPiece[0] == enemyColor: # enemmy piece valid
-                        moves.append(Move((r,c),(endRow,endCol),self.board))
-                        break
-                    else: # friendly piece invalid
-                        break
-                else: # off board
-                    break
+    def getBishopMoves(self,r,c,moves,captures=True,quiets=True):
+        self.getSlidingMoves(r,c,BISHOP_DIRECTIONS,moves,captures,quiets) # 4 diagonals.
 
     '''
     Get all the queen moves for the queen located at row, col and add these moves to the list
     '''                
-    def getQueenMoves(self,r,c,moves):
-        self.getRookMoves(r,c,moves)
-        self.getBishopMoves(r,c,moves)
+    def getQueenMoves(self,r,c,moves,captures=True,quiets=True):
+        self.getRookMoves(r,c,moves,captures,quiets)
+        self.getBishopMoves(r,c,moves,captures,quiets)
 
     '''
     Get all the king moves for the king located at row, col and add these moves to the list
     '''                
-    def getKingMoves(self,r,c,moves):
-        kingMoves = ((-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1))
+    def getKingMoves(self,r,c,moves,captures=True,quiets=True):
         allyColor = "w" if self.whitetoMove else "b"
-        for i in range(8):
-            endRow = r + kingMoves[i][0]
-            endCol = c + kingMoves[i][1]
-            if 0 <= endRow < 8 and 0 <= endCol < 8:
-                endPiece = self.board[endRow][endCol]
-                if endPiece[0] != allyColor: # not an ally piece(empty or enemy piece)
+        for endRow, endCol in KING_TARGETS[r*8 + c]:
+            endPiece = self.board[endRow][endCol]
+            # not an ally piece(empty or enemy piece), of the stage asked for.
+            if endPiece[0] != allyColor and (quiets if endPiece == "--" else captures):
+                # lift the king off its square so it doesn't shield the end square from a check along the same line.
+                king = self.board[r][c]
+                self.board[r][c] = "--"
+                underAttack = self.squareUnderAttack(endRow,endCol)
+                self.board[r][c] = king
+                if not underAttack:
                     moves.append(Move((r,c),(endRow,endCol),self.board))
 
+    '''
+    Generate all valid castle moves for the king at (r,c) and add them to the list of moves.
+    '''
+    def getCastleMoves(self,r,c,moves):
+        if self.squareUnderAttack(r,c):
+            return # can't castle while we are in check.
+        if (self.whitetoMove and self.currentCastlingRight.wks) or (not self.whitetoMove and self.currentCastlingRight.bks):
+            self.getKingsideCastleMoves(r,c,moves)
+        if (self.whitetoMove and self.currentCastlingRight.wqs) or (not self.whitetoMove and self.currentCastlingRight.bqs):
+            self.getQueensideCastleMoves(r,c,moves)
+
+    def getKingsideCastleMoves(self,r,c,moves):
+        if self.board[r][c+1] == "--" and self.board[r][c+2] == "--":
+            if not self.squareUnderAttack(r,c+1) and not self.squareUnderAttack(r,c+2):
+                moves.append(Move((r,c),(r,c+2),self.board))
+
+    def getQueensideCastleMoves(self,r,c,moves):
+        if self.board[r][c-1] == "--" and self.board[r][c-2] == "--" and self.board[r][c-3] == "--":
+            if not self.squareUnderAttack(r,c-1) and not self.squareUnderAttack(r,c-2):
+                moves.append(Move((r,c),(r,c-2),self.board))
+
+    # piece letter -> its move generator. one dict for the class, not a dict of bound methods in every GameState.
+    moveFunctions = {'p':getPawnMoves,'R':getRookMoves,'N':getKnightMoves,'B':getBishopMoves,'Q':getQueenMoves,
+                     'K':getKingMoves}
+
+
+class CastleRights():
+    def __init__(self,wks,bks,wqs,bqs) -> None:
+        self.wks = wks # white king side.
+        self.bks = bks
+        self.wqs = wqs # white queen side.
+        self.bqs = bqs
+
+    def copy(self):
+        return CastleRights(self.wks,self.bks,self.wqs,self.bqs)
 
+    '''
+    The rights as 4 bits -- wks, wqs, bks, bqs from the lowest bit up, the order zobrist.CASTLE_KEYS is indexed by.
+    '''
+    def bits(self):
+        return self.wks | self.wqs << 1 | self.bks << 2 | self.bqs << 3
+
+    def setBits(self,bits):
+        self.wks = bits & 1 != 0
+        self.wqs = bits & 2 != 0
+        self.bks = bits & 4 != 0
+        self.bqs = bits & 8 != 0
+
+    '''
+    Drop the rights a move takes away -- the king moving, a rook leaving its corner or a rook captured on its corner.
+    '''
+    def update(self,move):
+        if move.pieceMoved == 'wK':
+            self.wks = False
+            self.wqs = False
+        elif move.pieceMoved == 'bK':
+            self.bks = False
+            self.bqs = False
+        elif move.pieceMoved == 'wR' and move.startRow == 7:
+            if move.startCol == 0:
+                self.wqs = False
+            elif move.startCol == 7:
+                self.wks = False
+        elif move.pieceMoved == 'bR' and move.startRow == 0:
+            if move.startCol == 0:
+                self.bqs = False
+            elif move.startCol == 7:
+                self.bks = False
+        if move.pieceCaptured == 'wR' and move.endRow == 7:
+            if move.endCol == 0:
+                self.wqs = False
+            elif move.endCol == 7:
+                self.wks = False
+        elif move.pieceCaptured == 'bR' and move.endRow == 0:
+            if move.endCol == 0:
+                self.bqs = False
+            elif move.endCol == 7:
+                self.bks = False
+
+
+PROMOTION_CHOICES = ('Q','R','B','N')
+SQUARES = tuple(divmod(sq,8) for sq in range(64)) # square number (row*8 + col) -> (row, col)
+# one byte per piece in the move log and in snapshots -- 0 is an empty square.
+PIECE_CODES = ("--",'wp','wN','wB','wR','wQ','wK','bp','bN','bB','bR','bQ','bK')
+PIECE_CODE = {piece:code for code, piece in enumerate(PIECE_CODES)}
+# the rest of an undo log entry, above the captured piece code -- see undoInfo.
+LOG_PAWN_MOVE = 0x10
+LOG_PROMOTION = 0x20
+LOG_ENPASSANT = 0x40
+LOG_CASTLE_SHIFT = 7
+LOG_ENPASSANT_SHIFT = 11
+SNAPSHOT_SIZE = 64
+# a SAN move other than castling -- piece, from file, from rank, capture, end square, promotion.
+SAN_PATTERN = re.compile(r"([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([NBRQ]))?$")
 
 class Move():
     # maps keys to values
@@ -361,14 +680,59 @@ class Move():
     filestoCols = {"a":0,"b":1,"c":2,"d":3,"e":4,"f":5,"g":6,"h":7}
     colsToFiles = {v:k for k, v in filestoCols.items()}
 
-    def __init__(self,startSq,endSq,board) -> None:
-        self.startRow = startSq[0]
-        self.startCol = startSq[1]
-        self.endRow = endSq[0]
-        self.endCol = endSq[1]
-        self.pieceMoved = board[self.startRow][self.startCol]
-        self.pieceCaptured = board[self.endRow][self.endCol]
-        self.moveID = self.startRow *1000 + self.startCol*100 + self.endRow*10 + self.endCol
+    # search creates millions of these -- no per instance dict.
+    __slots__ = ('startRow','startCol','endRow','endCol','pieceMoved','pieceCaptured','isPawnPromotion',
+                 'promotionChoice','isEnpassantMove','isCastleMove','moveID')
+
+    def __init__(self,startSq,endSq,board,promotionChoice='Q') -> None:
+        self.startRow = startRow = startSq[0]
+        self.startCol = startCol = startSq[1]
+        self.endRow = endRow = endSq[0]
+        self.endCol = endCol = endSq[1]
+        self.pieceMoved = pieceMoved = board[startRow][startCol]
+        self.pieceCaptured = board[endRow][endCol]
+        # 16 bit move code -- start square, end square and promotion choice. clicks, voice input, the transposition
+        # table and array('H') move lists all use it. castling and en passant follow from the board, so aren't in it.
+        self.moveID = startRow*8 + startCol | (endRow*8 + endCol) << 6
+        self.promotionChoice = promotionChoice
+        self.isPawnPromotion = self.isEnpassantMove = self.isCastleMove = False
+        if pieceMoved[1] == 'p':
+            # pawn promotion -- each promotion choice is a different move, queen keeps the plain code.
+            if endRow == 0 or endRow == 7:
+                self.isPawnPromotion = True
+                self.moveID |= PROMOTION_CHOICES.index(promotionChoice) << 12
+            # en passant -- a pawn moving diagonally onto an empty square. the captured pawn is beside the start square.
+            elif startCol != endCol and self.pieceCaptured == "--":
+                self.isEnpassantMove = True
+                self.pieceCaptured = 'wp' if pieceMoved == 'bp' else 'bp'
+        # castle move -- the king moving 2 squares.
+        elif pieceMoved[1] == 'K' and (endCol - startCol == 2 or startCol - endCol == 2):
+            self.isCastleMove = True
+
+    '''
+    Rebuilds the move a code stands for in the position on board.
+    '''
+    @staticmethod
+    def fromCode(code,board):
+        return Move(SQUARES[code & 63],SQUARES[code >> 6 & 63],board,PROMOTION_CHOICES[code >> 12])
+
+    '''
+    Rebuilds a move from its move log entry, on the board as it is after the move.
+    '''
+    @staticmethod
+    def fromLog(code,info,board):
+        move = Move.__new__(Move)
+        move.startRow, move.startCol = SQUARES[code & 63]
+        move.endRow, move.endCol = SQUARES[code >> 6 & 63]
+        piece = board[move.endRow][move.endCol]
+        move.isPawnPromotion = info & LOG_PROMOTION != 0
+        move.pieceMoved = piece[0] + 'p' if move.isPawnPromotion else piece
+        move.pieceCaptured = PIECE_CODES[info & 15]
+        move.promotionChoice = PROMOTION_CHOICES[code >> 12]
+        move.isEnpassantMove = info & LOG_ENPASSANT != 0
+        move.isCastleMove = piece[1] == 'K' and abs(move.endCol - move.startCol) == 2
+        move.moveID = code
+        return move
 
     '''
     Overriding the equals method
@@ -378,11 +742,279 @@ class Move():
             return self.moveID ==  other.moveID
         return False
 
+    def __hash__(self):
+        return self.moveID
+
     def getChessNotation(self):
         # not real chess notation rn .... but will update it later.
-        return self.getRankFile(self.startRow,self.startCol) + self.getRankFile(self.endRow,self.endCol)
+        notation = self.getRankFile(self.startRow,self.startCol) + self.getRankFile(self.endRow,self.endCol)
+        if self.isPawnPromotion:
+            notation += self.promotionChoice.lower()
+        return notation
 
     
     def getRankFile(self,r,c):
         return self.colsToFiles[c] + self.rowsToRanks[r]
-    
+
+    '''
+    Standard algebraic notation -- "Nbd2", "exd5", "e8=Q+", "O-O". gs is the position the move is made from and
+    validMoves its valid moves if they are at hand. The move is made and undone on gs to see check and mate.
+    '''
+    def getSan(self,gs,validMoves=None):
+        if self.isCastleMove:
+            san = "O-O" if self.endCol > self.startCol else "O-O-O"
+        else:
+            piece = self.pieceMoved[1]
+            if piece == 'p':
+                san = self.colsToFiles[self.startCol] if self.pieceCaptured != "--" else ""
+            else:
+                san = piece
+                if validMoves is None:
+                    validMoves = gs.getValidMoves()
+                # another piece of the same kind can go there too -- say which one by file, else rank, else both.
+                others = [move for move in validMoves if move.pieceMoved == self.pieceMoved and
+                          move.endRow == self.endRow and move.endCol == self.endCol and move.moveID != self.moveID]
+                if others:
+                    if all(move.startCol != self.startCol for move in others):
+                        san += self.colsToFiles[self.startCol]
+                    elif all(move.startRow != self.startRow for move in others):
+                        san += self.rowsToRanks[self.startRow]
+                    else:
+                        san += self.getRankFile(self.startRow,self.startCol)
+            if self.pieceCaptured != "--":
+                san += "x"
+            san += self.getRankFile(self.endRow,self.endCol)
+            if self.isPawnPromotion:
+                san += "=" + self.promotionChoice
+        inCheck = gs.inCheck
+        gs.makeMove(self)
+        replies = gs.getValidMoveCodes() # sets gs.inCheck for the side that replies.
+        if gs.inCheck:
+            san += "#" if len(replies) == 0 else "+"
+        gs.undoMove()
+        gs.inCheck = inCheck
+        return san
+
+    '''
+    The valid move in gs that SAN text stands for. Check marks and annotations (+ # ! ?) are ignored, castling may be
+    written with zeros and a promotion without "=". Raises ValueError if the move is illegal or ambiguous.
+    '''
+    @staticmethod
+    def fromSan(san,gs,validMoves=None):
+        text = san.rstrip("+#!?")
+        if validMoves is None:
+            validMoves = gs.getValidMoves()
+        if text in ("O-O","0-0","O-O-O","0-0-0"):
+            kingside = len(text) == 3
+            candidates = [move for move in validMoves if move.isCastleMove and (move.endCol > move.startCol) == kingside]
+        else:
+            match = SAN_PATTERN.match(text)
+            if match is None:
+                raise ValueError("not a SAN move: " + san)
+            piece, fromFile, fromRank, capture, end, promotion = match.groups()
+            piece = piece or 'p'
+            endRow, endCol = Move.ranksToRows[end[1]], Move.filestoCols[end[0]]
+            startCol = Move.filestoCols[fromFile] if fromFile else None
+            startRow = Move.ranksToRows[fromRank] if fromRank else None
+            candidates = [move for move in validMoves if move.pieceMoved[1] == piece and move.endRow == endRow and
+                          move.endCol == endCol and startCol in (None,move.startCol) and
+                          startRow in (None,move.startRow) and
+                          (not move.isPawnPromotion or move.promotionChoice == (promotion or 'Q'))]
+        if len(candidates) != 1:
+            raise ValueError("%s move %s" % ("ambiguous" if candidates else "illegal",san))
+        return candidates[0]
+
+
+'''
+Splits a FEN string into an 8*8 board, side to move, castle rights and the en passant square -- shared by the GameState backends.
+'''
+def parseFen(fen):
+    fields = fen.split()
+    if len(fields) < 4:
+        raise ValueError("FEN needs at least 4 fields: " + fen)
+    board = []
+    for rank in fields[0].split('/'):
+        row = []
+        for char in rank:
+            if char.isdigit():
+                row.extend(["--"]*int(char))
+            elif char.lower() in "pnbrqk":
+                color = 'w' if char.isupper() else 'b'
+                row.append(color + ('p' if char.lower() == 'p' else char.upper()))
+            else:
+                raise ValueError("bad piece '" + char + "' in FEN: " + fen)
+        if len(row) != 8:
+            raise ValueError("FEN row doesn't have 8 squares: " + fen)
+        board.append(row)
+    if len(board) != 8 or fields[1] not in ('w','b'):
+        raise ValueError("invalid FEN: " + fen)
+    if fields[2] != '-' and (not fields[2] or any(char not in "KQkq" for char in fields[2])):
+        raise ValueError("bad castling field in FEN: " + fen)
+    castleRights = checkBoard(board,CastleRights('K' in fields[2],'k' in fields[2],'Q' in fields[2],'q' in fields[2]))
+    enpassantPossible = ()
+    if fields[3] != '-':
+        # the square behind a pawn of the side not to move -- rank 6 with white to move, rank 3 with black.
+        if len(fields[3]) != 2 or fields[3][0] not in Move.filestoCols or \
+                fields[3][1] != ('6' if fields[1] == 'w' else '3'):
+            raise ValueError("bad en passant square in FEN: " + fen)
+        r, c = Move.ranksToRows[fields[3][1]], Move.filestoCols[fields[3][0]]
+        pawnRow = r + 1 if fields[1] == 'w' else r - 1 # the pawn that just made the 2 square advance.
+        if board[pawnRow][c] != ('b' if fields[1] == 'w' else 'w') + 'p':
+            raise ValueError("no pawn in front of the en passant square in FEN: " + fen)
+        enpassantPossible = enpassantSquare(board,pawnRow,c)
+    return board, fields[1] == 'w', castleRights, enpassantPossible
+
+'''
+The halfmove clock and fullmove number of a FEN string -- 0 and 1 when it leaves them out.
+'''
+def fenCounters(fen):
+    fields = fen.split()
+    try:
+        halfmoves = int(fields[4]) if len(fields) > 4 else 0
+        fullmoves = int(fields[5]) if len(fields) > 5 else 1
+    except ValueError:
+        raise ValueError("bad move counters in FEN: " + fen)
+    if halfmoves < 0 or fullmoves < 1:
+        raise ValueError("bad move counters in FEN: " + fen)
+    return halfmoves, fullmoves
+
+'''
+The white and black king's (row, col) -- a board without exactly one king of each color raises ValueError.
+'''
+def kingLocations(board):
+    kings = {'wK':[],'bK':[]}
+    for r in range(8):
+        for c in range(8):
+            if board[r][c] in kings:
+                kings[board[r][c]].append((r,c))
+    if len(kings['wK']) != 1 or len(kings['bK']) != 1:
+        raise ValueError("a position needs one king of each color")
+    return kings['wK'][0], kings['bK'][0]
+
+'''
+The castle rights a board allows -- a right whose king or rook isn't on its starting square is dropped, as makeMove
+would have dropped it. A board without its kings or with a pawn on the first or last rank raises ValueError.
+'''
+def checkBoard(board,castleRights):
+    kingLocations(board)
+    if any(piece[1] == 'p' for piece in board[0] + board[7]):
+        raise ValueError("a pawn on the first or last rank")
+    whiteKing, blackKing = board[7][4] == 'wK', board[0][4] == 'bK'
+    return CastleRights(castleRights.wks and whiteKing and board[7][7] == 'wR',
+                        castleRights.bks and blackKing and board[0][7] == 'bR',
+                        castleRights.wqs and whiteKing and board[7][0] == 'wR',
+                        castleRights.bqs and blackKing and board[0][0] == 'bR')
+
+'''
+The FEN string of a position -- the counters are worked out from the undo log, counting on from the counters of the
+position it starts from.
+'''
+def formatFen(board,whitetoMove,castleRights,enpassantPossible,undoLog=(),startHalfmoves=0,startFullmoves=1):
+    rows = []
+    for row in board:
+        text = ""
+        empty = 0
+        for piece in row:
+            if piece == "--":
+                empty += 1
+                continue
+            if empty:
+                text += str(empty)
+                empty = 0
+            letter = 'p' if piece[1] == 'p' else piece[1].lower()
+            text += letter.upper() if piece[0] == 'w' else letter
+        rows.append(text + (str(empty) if empty else ""))
+    castling = ('K' if castleRights.wks else '') + ('Q' if castleRights.wqs else '') + \
+               ('k' if castleRights.bks else '') + ('q' if castleRights.bqs else '')
+    enpassant = Move.colsToFiles[enpassantPossible[1]] + Move.rowsToRanks[enpassantPossible[0]] if enpassantPossible else '-'
+    startedBlack = (len(undoLog) % 2 == 0) != whitetoMove
+    fullmoves = startFullmoves + (len(undoLog) + startedBlack)//2
+    return "%s %s %s %s %d %d" % ("/".join(rows),'w' if whitetoMove else 'b',castling or '-',enpassant,
+                                  halfmoveClock(undoLog,startHalfmoves),fullmoves)
+
+'''
+Plies since the last capture or pawn move of the undo log -- startHalfmoves, the clock of the position the log starts
+from, counts too when there was none.
+'''
+def halfmoveClock(undoLog,startHalfmoves=0):
+    halfmoves = 0
+    for info in reversed(undoLog):
+        if info & (LOG_PAWN_MOVE | 15):
+            return halfmoves
+        halfmoves += 1
+    return halfmoves + startHalfmoves
+
+'''
+A position in SNAPSHOT_SIZE bytes -- one byte per square (row*8 + col) holding the PIECE_CODES code in its low 4 bits.
+The high 4 bits of square 0 hold the castle rights (CastleRights.bits), of square 1 the side to move (1 for black)
+and of square 2 the en passant column + 1 (0 for none).
+'''
+def encodeSnapshot(board,whitetoMove,castleRights,enpassantPossible):
+    data = bytearray(PIECE_CODE[piece] for row in board for piece in row)
+    data[0] |= castleRights.bits() << 4
+    data[1] |= (not whitetoMove) << 4
+    if enpassantPossible:
+        data[2] |= (enpassantPossible[1] + 1) << 4
+    return bytes(data)
+
+'''
+The board, side to move, castle rights and en passant square of encodeSnapshot bytes -- like parseFen.
+'''
+def decodeSnapshot(data):
+    if len(data) != SNAPSHOT_SIZE or any(byte & 15 >= len(PIECE_CODES) for byte in data):
+        raise ValueError("not a position snapshot")
+    board = [[PIECE_CODES[data[r*8 + c] & 15] for c in range(8)] for r in range(8)]
+    castleRights = CastleRights(False,False,False,False)
+    castleRights.setBits(data[0] >> 4)
+    castleRights = checkBoard(board,castleRights)
+    whitetoMove = data[1] >> 4 == 0
+    enpassantPossible = ()
+    if data[2] >> 4:
+        enpassantPossible = (2 if whitetoMove else 5,(data[2] >> 4) - 1) # the square behind the pawn that advanced.
+        if board[3 if whitetoMove else 4][enpassantPossible[1]] != ('b' if whitetoMove else 'w') + 'p':
+            raise ValueError("no pawn in front of the en passant square of the snapshot")
+    return board, whitetoMove, castleRights, enpassantPossible
+
+'''
+The 16 bits undoMove needs beside the move code and the board after the move -- the captured piece's code (bits 0-3),
+the LOG_ flags, and the castle rights (CastleRights.bits) and en passant column + 1 from before the move.
+'''
+def undoInfo(move,castleBefore,enpassantBefore):
+    info = PIECE_CODE[move.pieceCaptured] | castleBefore << LOG_CASTLE_SHIFT
+    if enpassantBefore:
+        info |= (enpassantBefore[1] + 1) << LOG_ENPASSANT_SHIFT
+    if move.pieceMoved[1] == 'p':
+        info |= LOG_PAWN_MOVE
+        if move.isPawnPromotion:
+            info |= LOG_PROMOTION
+        elif move.isEnpassantMove:
+            info |= LOG_ENPASSANT
+    return info
+
+'''
+The square behind a pawn that just advanced 2 squares to r, c -- or () when no enemy pawn stands beside it to take it
+en passant, so positions that only differ by an unusable en passant square get the same zobrist key.
+'''
+def enpassantSquare(board,r,c):
+    pawn = board[r][c]
+    enemyPawn = ('b' if pawn[0] == 'w' else 'w') + 'p'
+    if (c > 0 and board[r][c-1] == enemyPawn) or (c < 7 and board[r][c+1] == enemyPawn):
+        return (r + 1 if pawn[0] == 'w' else r - 1,c)
+    return ()
+
+'''
+Valid moves keyed by move code, so a clicked or spoken move is found with one lookup instead of a scan of the list.
+'''
+def moveLookup(moves):
+    return {move.moveID:move for move in moves}
+
+'''
+Sort key for captures and promotions -- most valuable victim first, then least valuable attacker.
+'''
+def captureOrder(move):
+    score = 0
+    if move.pieceCaptured != "--":
+        score = 10000 + 10*evaluation.pieceScores[move.pieceCaptured[1]] - evaluation.pieceScores[move.pieceMoved[1]]
+    if move.isPawnPromotion:
+        score += evaluation.pieceScores[move.promotionChoice]
+    return score
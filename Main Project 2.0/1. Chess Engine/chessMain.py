@@ -3,93 +3,212 @@ This is our main driver file. It will be responsible for handling user input and
 """
 import chessEngine
 import pygame as p
-from chess import engine
+import engineWorker
+import moveMatcher
+import openingBook
+import pieceImages
+import speechOutput
 import voiceRecognition 
 
 WIDTH = HEIGHT = 512 # 400 IS another option.
 DIMENSION = 8 # dimension of the chess board.
 SQ_SIZE = HEIGHT//DIMENSION
 MAX_FPS = 15 # for animations.
-IMAGES = {}
+AI_THINK_TIME = 2.0 # seconds the computer gets for each of its moves.
+VOICE_MIN_CONFIDENCE = 0.35 # spoken moves the matcher is less sure of are ignored -- say it again.
+IMAGES = pieceImages.PieceImages(SQ_SIZE) # we can access the image by saying IMAGES['wp'] -- loaded on first use.
 
 """
-Initialize a global directory of images. This will be called exactly once in the main.
+Fits the board into a window of the new size. The pieces for the new square size come from the image cache.
 """
-
-def loadImages():
-    pieces = ['wp','wR','wN','wB','wK','wQ','bp','bR','bN','bB','bK','bQ']
-
-    for piece in pieces:
-        IMAGES[piece] = p.transform.scale(p.image.load("images/" + piece +".png"),(SQ_SIZE,SQ_SIZE))
-
-        # we can access the image by saying IMAGES['wp']
+def resizeBoard(width,height):
+    global SQ_SIZE
+    SQ_SIZE = max(1,min(width,height)//DIMENSION)
+    IMAGES.resize(SQ_SIZE)
+    screen = p.display.set_mode((width,height),p.RESIZABLE)
+    screen.fill(p.Color("white"))
+    p.display.flip()
+    return screen
 
 """
 This is the main code. Handles input -- updating graphics.
 """
 def main():
     p.init()
-    screen = p.display.set_mode((WIDTH,HEIGHT))
+    screen = p.display.set_mode((WIDTH,HEIGHT),p.RESIZABLE)
     clock = p.time.Clock()
     screen.fill(p.Color("white"))
     gs = chessEngine.GameState()
-    validMoves = gs.getValidMoves()
-    moveMade = False # flag variable for when a move is made.
-
-    loadImages() # only once -- before the while loop.
+    # move generation and the computer's thinking run on the worker thread -- this loop only polls for results.
+    worker = engineWorker.EngineWorker(book=openingBook.createDefaultBook()) # book moves need no search.
+    validMoveLookup = None # move code -> valid move, so a click is checked in one lookup. None until the worker sends it.
+    matcher = moveMatcher.MoveMatcher() # spoken move -> valid move, for the current position.
+    expectedReply = None # the move the last search expects from the human -- pondered on while the human thinks.
+    moveMade = True # flag variable for when a move is made -- set at the start so the first position is handed out.
+
+    renderer = BoardRenderer(screen) # redraws only the squares a move or undo touched.
     running = True
     sqSelected = () # no square is selected initially - keep tracks of the last click of the user.
     playerClicks = [] # keep tracks of players clicks.
+    playerOne = True # True if a human is playing white, False if the computer is.
+    playerTwo = False # same as above but for black.
+    voice = voiceRecognition.createDefaultInput() # listens on its own threads -- results come in as events.
+    speaker = None # spoken prompts, for games played by voice.
+    if voice is not None:
+        voice.start()
+        speaker = speechOutput.createDefaultSpeaker()
 
     while running:
+        humanTurn = (gs.whitetoMove and playerOne) or (not gs.whitetoMove and playerTwo)
         for e in p.event.get():
             if e.type == p.QUIT:
                 running = False
             # mouse handle
-            elif e.type == p.MOUSEBUTTONDOWN: # checks whether mouse is pressed.
+            # checks whether mouse is pressed -- clicks wait for the valid moves of the position.
+            elif e.type == p.MOUSEBUTTONDOWN and humanTurn and validMoveLookup is not None:
                 location = p.mouse.get_pos() # (x,y) location of mouse.
                 col = location[0]//SQ_SIZE
                 row = location[1]//SQ_SIZE
                 
                 if sqSelected == (row,col): # the user clicked the same sq 0--- twice.
                     sqSelected = () # deselect
-                    playerClicksq = [] # clear player clicks.
+                    playerClicks = [] # clear player clicks.
                 else:    
                     sqSelected = (row,col)
                     playerClicks.append(sqSelected) # apend for both clicks.
                 if len(playerClicks ) == 2:
                     move = chessEngine.Move(playerClicks[0],playerClicks[1],gs.board)
                     print(move.getChessNotation())
-                    if move in validMoves:
-                        gs.makeMove(move) 
+                    validMove = validMoveLookup.get(move.moveID)
+                    if validMove is not None:
+                        gs.makeMove(validMove) # the generated move, with the promotion choice it was made with.
+                        worker.cancel() # at once -- a result for the old position must not reach the new one.
+                        renderer.markMove(validMove)
                         moveMade = True 
                         sqSelected = () # resets the user clicks.
                         playerClicks = []
-                    else:
+                    else: # not a valid move -- keep the last click as the new selection.
                         playerClicks = [sqSelected]
             # key handle
             elif e.type == p.KEYDOWN:
-                    if e.key == p.K_z: # undo when 'z' is pressed.
+                    if e.key == p.K_z and len(gs.moveLog) != 0: # undo when 'z' is pressed.
+                        renderer.markMove(gs.lastMove())
                         gs.undoMove()
+                        # against the computer, its move and the human's before it -- back to the human's turn.
+                        humanTurn = (gs.whitetoMove and playerOne) or (not gs.whitetoMove and playerTwo)
+                        if playerOne != playerTwo and not humanTurn and len(gs.moveLog) != 0:
+                            renderer.markMove(gs.lastMove())
+                            gs.undoMove()
+                        worker.cancel()
                         moveMade = True
+            # voice handle
+            elif e.type == voiceRecognition.SPEECH_STARTED and speaker is not None:
+                speaker.interrupt() # don't talk over the user.
+            elif e.type == voiceRecognition.VOICE_RESULT and humanTurn and validMoveLookup is not None:
+                validMove, confidence = matcher.match(e.hypotheses)
+                if validMove is not None and confidence >= VOICE_MIN_CONFIDENCE:
+                    print(validMove.getChessNotation())
+                    gs.makeMove(validMove)
+                    worker.cancel()
+                    renderer.markMove(validMove)
+                    moveMade = True
+                    sqSelected = ()
+                    playerClicks = []
+                else:
+                    print("Couldn't match a valid move to:",e.hypotheses[0][0])
+                    if speaker is not None:
+                        speaker.say(speechOutput.SAY_AGAIN)
+            elif e.type == p.VIDEOEXPOSE: # the window was covered -- whatever was on screen is gone.
+                renderer.markAll()
+            elif e.type == p.VIDEORESIZE:
+                screen = resizeBoard(e.w,e.h)
+                renderer = BoardRenderer(screen)
+
+        # results from the worker -- only ones for the current position come through.
+        for kind, result in worker.poll():
+            if kind == engineWorker.MOVES:
+                validMoveLookup = chessEngine.moveLookup(result)
+                matcher.update(result)
+            elif kind == engineWorker.BEST_MOVE and result.bestMove is not None: # computer move.
+                if validMoveLookup is None:
+                    validMoveLookup = chessEngine.moveLookup(gs.getValidMoves())
+                if result.bestMove.moveID not in validMoveLookup: # not a move of this position -- never play it.
+                    continue
+                gs.makeMove(result.bestMove)
+                worker.cancel()
+                renderer.markMove(result.bestMove)
+                if speaker is not None:
+                    speaker.sayMove(result.bestMove)
+                expectedReply = result.pv[1] if len(result.pv) > 1 else None
+                moveMade = True
+                break # whatever else came in is for the position before the move.
         
-        if moveMade:
-            validMoves = gs.getValidMoves()
+        if moveMade: # new position -- the work for the old one was cancelled where it changed, hand out the new one.
+            validMoveLookup = None
+            worker.requestMoves(gs)
+            if (gs.whitetoMove and playerOne) or (not gs.whitetoMove and playerTwo):
+                worker.requestPonder(gs,expectedReply)
+                if speaker is not None:
+                    speaker.say(speechOutput.YOUR_MOVE)
+            else:
+                worker.requestSearch(gs,timeLimit=AI_THINK_TIME)
+            expectedReply = None
             moveMade = False
 
-        drawGameState(screen,gs)
-
+        dirtyRects = renderer.draw(gs.board)
+        if dirtyRects: # idle frames draw nothing at all.
+            p.display.update(dirtyRects)
         clock.tick(MAX_FPS)
-        p.display.flip()
-
-"""
-For all the graphics within a current Game state.
-"""
-
-def drawGameState(screen,gs):
-    drawBoard(screen) # draws squares on the board.
-
-    drawPieces(screen,gs.board) # draw pieces on square.
+    worker.close()
+    if voice is not None:
+        voice.stop()
+    if speaker is not None:
+        speaker.close()
+
+class BoardRenderer():
+    '''
+    Draws the game onto the screen square by square, and only the squares marked as changed since the last frame.
+    The empty board is drawn once into a cached surface, a changed square is copied back from it and gets its piece
+    blitted on top. draw returns the rects that changed so only those go to display.update.
+    '''
+    def __init__(self,screen) -> None:
+        self.screen = screen
+        self.boardSurface = p.Surface((DIMENSION*SQ_SIZE,DIMENSION*SQ_SIZE))
+        drawBoard(self.boardSurface)
+        self.dirtySquares = set()
+        self.markAll() # nothing is on screen yet.
+
+    def markAll(self):
+        self.dirtySquares.update((r,c) for r in range(DIMENSION) for c in range(DIMENSION))
+
+    '''
+    Marks the squares a move changes -- call it when the move is made or undone.
+    '''
+    def markMove(self,move):
+        self.dirtySquares.add((move.startRow,move.startCol))
+        self.dirtySquares.add((move.endRow,move.endCol))
+        if move.isEnpassantMove: # the captured pawn is beside the start square.
+            self.dirtySquares.add((move.startRow,move.endCol))
+        if move.isCastleMove: # the rook moves between its corner and the square the king crossed.
+            if move.endCol - move.startCol == 2:
+                self.dirtySquares.update(((move.endRow,7),(move.endRow,move.endCol - 1)))
+            else:
+                self.dirtySquares.update(((move.endRow,0),(move.endRow,move.endCol + 1)))
+
+    '''
+    Redraws the marked squares from board. Returns their rects -- empty if nothing changed.
+    '''
+    def draw(self,board):
+        dirtyRects = []
+        for r, c in self.dirtySquares:
+            rect = p.Rect(c*SQ_SIZE,r*SQ_SIZE,SQ_SIZE,SQ_SIZE)
+            self.screen.blit(self.boardSurface,rect,rect)
+            piece = board[r][c]
+            if piece != "--": # not a empty square.
+                self.screen.blit(IMAGES[piece],rect)
+            dirtyRects.append(rect)
+        self.dirtySquares.clear()
+        return dirtyRects
 
 """
 Draws squares on the board. 
@@ -101,16 +220,6 @@ def drawBoard(screen):
             color = colors[((r+c)%2)]
             p.draw.rect(screen,color,p.Rect(c*SQ_SIZE,r*SQ_SIZE,SQ_SIZE,SQ_SIZE))
 
-"""
-Draw the pieces on the board using current GameState.board
-"""
-def drawPieces(screen,board):
-    for r in range(DIMENSION):
-        for c in range(DIMENSION):
-            piece = board[r][c]
-            if piece != "--": # not a empty square.
-                screen.blit(IMAGES[piece],p.Rect(c*SQ_SIZE,r*SQ_SIZE,SQ_SIZE,SQ_SIZE))
-
 
 
 
@@ -0,0 +1,106 @@
+"""
+Engine work off the pygame thread. The event loop posts jobs (valid moves, a search, pondering) with a copy of the
+position and picks the results up with poll() once per frame, so the window keeps drawing while the engine thinks.
+cancel() drops whatever is queued or running for the old position -- call it whenever the position changes.
+"""
+import pickle
+import queue
+import threading
+
+import chessAI
+import chessEngine
+
+# job kinds -- also the kinds of the results handed out by poll().
+MOVES = 'moves' # payload is the list of valid moves.
+BEST_MOVE = 'bestmove' # payload is the chessAI.SearchResult.
+PONDER = 'ponder' # no result.
+
+
+class EngineWorker():
+    '''
+    One background thread with its own searcher, so the transposition table carries over between moves and pondering
+    fills it for the next search. Jobs run one at a time in the order they were posted. With an opening book, a search
+    in a book position answers with a book move at once.
+    '''
+    def __init__(self,ttSizeMB=16,book=None) -> None:
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.stopEvent = threading.Event()
+        self.searcher = chessAI.Searcher(ttSizeMB,stopEvent=self.stopEvent)
+        self.book = book # an openingBook.OpeningBook, closed with the worker.
+        self.lock = threading.Lock() # generation and stopEvent change together.
+        self.generation = 0 # bumped by cancel() -- jobs and results of an older generation are dropped.
+        self.thread = threading.Thread(target=self.run,daemon=True)
+        self.thread.start()
+
+    def requestMoves(self,gs):
+        self.post(MOVES,gs)
+
+    def requestSearch(self,gs,timeLimit=None,maxDepth=chessAI.MAX_PLY - 1):
+        self.post(BEST_MOVE,gs,timeLimit,maxDepth)
+
+    '''
+    Think on the opponent's time until cancel() -- from the position after expectedMove if there is a guess, so the
+    table holds the answer to it. Gives no result.
+    '''
+    def requestPonder(self,gs,expectedMove=None):
+        self.post(PONDER,gs,expectedMove.moveID if expectedMove is not None else 0)
+
+    def post(self,kind,gs,*args):
+        # the pickled copy is taken now -- the game goes on while the job waits.
+        self.jobs.put((self.generation,kind,pickle.dumps(gs),args))
+
+    '''
+    Stops the running job and drops every job and result posted so far.
+    '''
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+            self.stopEvent.set()
+
+    '''
+    Results that came in since the last call, as (kind, payload) -- never blocks.
+    '''
+    def poll(self):
+        results = []
+        while True:
+            try:
+                generation, kind, payload = self.results.get_nowait()
+            except queue.Empty:
+                return results
+            if generation == self.generation:
+                results.append((kind,payload))
+
+    def close(self):
+        self.cancel()
+        self.jobs.put(None)
+        self.thread.join()
+        if self.book is not None:
+            self.book.close()
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            generation, kind, position, args = job
+            with self.lock:
+                if generation != self.generation:
+                    continue # cancelled before it started.
+                self.stopEvent.clear()
+            gs = pickle.loads(position)
+            if kind == MOVES:
+                self.results.put((generation,MOVES,gs.getValidMoves()))
+            elif kind == BEST_MOVE:
+                timeLimit, maxDepth = args
+                bookMove = self.book.pickMove(gs) if self.book is not None else None
+                if bookMove is not None: # a book position -- no search.
+                    result = chessAI.SearchResult(bookMove,0,0,[bookMove],0,0.0)
+                else:
+                    result = self.searcher.search(gs,maxDepth,timeLimit)
+                self.results.put((generation,BEST_MOVE,result))
+            elif kind == PONDER:
+                expectedMove = chessEngine.moveLookup(gs.getValidMoves()).get(args[0])
+                if expectedMove is not None: # the guess came from an older search -- only play it if it is valid here.
+                    gs.makeMove(expectedMove)
+                self.searcher.search(gs) # runs until cancel() sets the stop event, or a mate is found.
@@ -0,0 +1,158 @@
+"""
+Material + piece-square evaluation kept up to date by makeMove/undoMove. Both GameState backends hold a middlegame
+score, an endgame score (white's point of view) and a game phase, add moveDelta(move) when a move is made and take
+it off again when it is undone -- so evaluating a leaf is a blend of 3 numbers instead of a scan of the board.
+"""
+PIECES = ('wp','wN','wB','wR','wQ','wK','bp','bN','bB','bR','bQ','bK')
+
+pieceScores = {'K':0,'Q':900,'R':500,'B':330,'N':320,'p':100}
+endgamePieceScores = {'K':0,'Q':950,'R':520,'B':320,'N':300,'p':120}
+
+# how much each piece counts towards the middlegame -- the start position is MAX_PHASE, bare kings and pawns are 0.
+phaseWeights = {'K':0,'Q':4,'R':2,'B':1,'N':1,'p':0}
+MAX_PHASE = 24
+
+# piece-square tables from white's side, row 0 is the 8th rank like gs.board. black reads them upside down.
+pawnScores = [[0,0,0,0,0,0,0,0],
+              [50,50,50,50,50,50,50,50],
+              [10,10,20,30,30,20,10,10],
+              [5,5,10,25,25,10,5,5],
+              [0,0,0,20,20,0,0,0],
+              [5,-5,-10,0,0,-10,-5,5],
+              [5,10,10,-20,-20,10,10,5],
+              [0,0,0,0,0,0,0,0]]
+knightScores = [[-50,-40,-30,-30,-30,-30,-40,-50],
+                [-40,-20,0,0,0,0,-20,-40],
+                [-30,0,10,15,15,10,0,-30],
+                [-30,5,15,20,20,15,5,-30],
+                [-30,0,15,20,20,15,0,-30],
+                [-30,5,10,15,15,10,5,-30],
+                [-40,-20,0,5,5,0,-20,-40],
+                [-50,-40,-30,-30,-30,-30,-40,-50]]
+bishopScores = [[-20,-10,-10,-10,-10,-10,-10,-20],
+                [-10,0,0,0,0,0,0,-10],
+                [-10,0,5,10,10,5,0,-10],
+                [-10,5,5,10,10,5,5,-10],
+                [-10,0,10,10,10,10,0,-10],
+                [-10,10,10,10,10,10,10,-10],
+                [-10,5,0,0,0,0,5,-10],
+                [-20,-10,-10,-10,-10,-10,-10,-20]]
+rookScores = [[0,0,0,0,0,0,0,0],
+              [5,10,10,10,10,10,10,5],
+              [-5,0,0,0,0,0,0,-5],
+              [-5,0,0,0,0,0,0,-5],
+              [-5,0,0,0,0,0,0,-5],
+              [-5,0,0,0,0,0,0,-5],
+              [-5,0,0,0,0,0,0,-5],
+              [0,0,0,5,5,0,0,0]]
+queenScores = [[-20,-10,-10,-5,-5,-10,-10,-20],
+               [-10,0,0,0,0,0,0,-10],
+               [-10,0,5,5,5,5,0,-10],
+               [-5,0,5,5,5,5,0,-5],
+               [0,0,5,5,5,5,0,-5],
+               [-10,5,5,5,5,5,0,-10],
+               [-10,0,5,0,0,0,0,-10],
+               [-20,-10,-10,-5,-5,-10,-10,-20]]
+kingScores = [[-30,-40,-40,-50,-50,-40,-40,-30],
+              [-30,-40,-40,-50,-50,-40,-40,-30],
+              [-30,-40,-40,-50,-50,-40,-40,-30],
+              [-30,-40,-40,-50,-50,-40,-40,-30],
+              [-20,-30,-30,-40,-40,-30,-30,-20],
+              [-10,-20,-20,-20,-20,-20,-20,-10],
+              [20,20,0,0,0,0,20,20],
+              [20,30,10,0,0,10,30,20]]
+# endgame -- passed pawns run, the king comes to the centre.
+pawnEndgameScores = [[0,0,0,0,0,0,0,0],
+                     [80,80,80,80,80,80,80,80],
+                     [50,50,50,50,50,50,50,50],
+                     [30,30,30,30,30,30,30,30],
+                     [15,15,15,15,15,15,15,15],
+                     [5,5,5,5,5,5,5,5],
+                     [0,0,0,0,0,0,0,0],
+                     [0,0,0,0,0,0,0,0]]
+kingEndgameScores = [[-50,-40,-30,-20,-20,-30,-40,-50],
+                     [-30,-20,-10,0,0,-10,-20,-30],
+                     [-30,-10,20,30,30,20,-10,-30],
+                     [-30,-10,30,40,40,30,-10,-30],
+                     [-30,-10,30,40,40,30,-10,-30],
+                     [-30,-10,20,30,30,20,-10,-30],
+                     [-30,-30,0,0,0,0,-30,-30],
+                     [-50,-30,-30,-30,-30,-30,-30,-50]]
+piecePositionScores = {'p':pawnScores,'N':knightScores,'B':bishopScores,'R':rookScores,'Q':queenScores,'K':kingScores}
+endgamePositionScores = {'p':pawnEndgameScores,'N':knightScores,'B':bishopScores,'R':rookScores,'Q':queenScores,
+                         'K':kingEndgameScores}
+
+def _squareScores(piece,materialScores,positionScores):
+    table = positionScores[piece[1]]
+    if piece[0] == 'w':
+        return tuple(materialScores[piece[1]] + table[sq // 8][sq % 8] for sq in range(64))
+    return tuple(-materialScores[piece[1]] - table[7 - sq // 8][sq % 8] for sq in range(64))
+
+# material + position of a piece on a square (row*8 + col) from white's side -- black pieces are negative.
+MIDDLEGAME_SCORES = {piece:_squareScores(piece,pieceScores,piecePositionScores) for piece in PIECES}
+ENDGAME_SCORES = {piece:_squareScores(piece,endgamePieceScores,endgamePositionScores) for piece in PIECES}
+PHASES = {piece:phaseWeights[piece[1]] for piece in PIECES}
+
+'''
+(middlegame score, endgame score, phase) of a board from scratch -- used when a position is set up, makeMove/undoMove
+only add the differences.
+'''
+def computeScores(board):
+    mgScore = egScore = phase = 0
+    for r in range(8):
+        for c in range(8):
+            piece = board[r][c]
+            if piece != "--":
+                mgScore += MIDDLEGAME_SCORES[piece][r*8 + c]
+                egScore += ENDGAME_SCORES[piece][r*8 + c]
+                phase += PHASES[piece]
+    return mgScore, egScore, phase
+
+'''
+(middlegame, endgame, phase) change of a move -- the piece leaving its start square, arriving (or promoting) on its
+end square, the captured piece and the castling rook. makeMove adds it, undoMove subtracts it.
+'''
+def moveDelta(move):
+    pieceMoved = move.pieceMoved
+    pieceEnd = pieceMoved[0] + move.promotionChoice if move.isPawnPromotion else pieceMoved
+    startSq = move.startRow*8 + move.startCol
+    endSq = move.endRow*8 + move.endCol
+    mgScore = MIDDLEGAME_SCORES[pieceEnd][endSq] - MIDDLEGAME_SCORES[pieceMoved][startSq]
+    egScore = ENDGAME_SCORES[pieceEnd][endSq] - ENDGAME_SCORES[pieceMoved][startSq]
+    phase = PHASES[pieceEnd] - PHASES[pieceMoved]
+    captured = move.pieceCaptured
+    if captured != "--":
+        capturedSq = move.startRow*8 + move.endCol if move.isEnpassantMove else endSq
+        mgScore -= MIDDLEGAME_SCORES[captured][capturedSq]
+        egScore -= ENDGAME_SCORES[captured][capturedSq]
+        phase -= PHASES[captured]
+    if move.isCastleMove:
+        rook = pieceMoved[0] + 'R'
+        row = move.endRow*8
+        if move.endCol - move.startCol == 2: # king side.
+            rookStart, rookEnd = row + 7, row + move.endCol - 1
+        else: # queen side.
+            rookStart, rookEnd = row, row + move.endCol + 1
+        mgScore += MIDDLEGAME_SCORES[rook][rookEnd] - MIDDLEGAME_SCORES[rook][rookStart]
+        egScore += ENDGAME_SCORES[rook][rookEnd] - ENDGAME_SCORES[rook][rookStart]
+    return mgScore, egScore, phase
+
+'''
+Middlegame and endgame scores mixed by how much material is left, from the side to move's point of view.
+'''
+def blend(mgScore,egScore,phase,whitetoMove):
+    phase = min(phase,MAX_PHASE) # promotions can push it past the start position.
+    score = (mgScore*phase + egScore*(MAX_PHASE - phase)) // MAX_PHASE
+    return score if whitetoMove else -score
+
+'''
+O(1) evaluation from the scores the GameState keeps -- the default evaluation of chessAI.Searcher.
+'''
+def evaluate(gs):
+    return blend(gs.mgScore,gs.egScore,gs.phase,gs.whitetoMove)
+
+'''
+Same score as evaluate but recomputed from the board -- to check the incremental scores against.
+'''
+def scoreBoard(gs):
+    return blend(*computeScores(gs.board),gs.whitetoMove)
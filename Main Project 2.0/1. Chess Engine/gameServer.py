@@ -0,0 +1,196 @@
+"""
+Hosts many games at once over TCP -- one JSON object per line each way, any number of games per connection.
+
+    python gameServer.py [--port 7878] [--backend list|bitboard] [--idle 60]
+
+Requests ("id" is optional and echoed back):
+    {"op":"new"} or {"op":"new","fen":"..."}    -> {"ok":true,"game":7}
+    {"op":"moves","game":7}                    -> {"ok":true,"moves":["e2e4",...]}
+    {"op":"move","game":7,"move":"e2e4"}       -> {"ok":true,"status":"ongoing"|"checkmate"|"stalemate"}
+    {"op":"undo","game":7}                     -> {"ok":true}
+    {"op":"fen","game":7}                      -> {"ok":true,"fen":"..."}
+    {"op":"drop","game":7}                     -> {"ok":true}
+    {"op":"stats"}                             -> {"ok":true,"games":..,"resident":..,"evicted":..}
+Errors come back as {"ok":false,"error":"..."}.
+
+A game nobody touched for --idle seconds is evicted: its GameState is dropped and only the start position and the
+move codes are kept (2 bytes a move), and it is replayed on its next request.
+"""
+import argparse
+import asyncio
+import json
+import time
+from array import array
+
+import bitboardEngine
+import chessEngine
+
+BACKENDS = {'list':chessEngine,'bitboard':bitboardEngine}
+DEFAULT_PORT = 7878
+
+
+class HostedGame():
+    '''
+    One game. gs is None while the game is evicted -- then startFen and moveCodes are all there is of it.
+    '''
+    __slots__ = ('gs','startFen','moveCodes','validMoves','lock','lastUsed')
+
+    def __init__(self,gs,startFen) -> None:
+        self.gs = gs
+        self.startFen = startFen # None for the normal starting position.
+        self.moveCodes = None
+        self.validMoves = None # notation -> valid move, for the current position.
+        self.lock = asyncio.Lock() # requests for the same game run one at a time.
+        self.lastUsed = time.monotonic()
+
+    def evict(self):
+        self.moveCodes = self.gs.moveLog.tobytes()
+        self.gs = None
+        self.validMoves = None
+
+    def restore(self,backend):
+        gs = backend.GameState()
+        if self.startFen is not None:
+            gs.loadFen(self.startFen)
+        codes = array('H')
+        codes.frombytes(self.moveCodes)
+        for code in codes:
+            gs.makeMove(chessEngine.Move.fromCode(code,gs.board))
+        self.gs = gs
+        self.moveCodes = None
+
+    def getValidMoves(self):
+        if self.validMoves is None:
+            self.validMoves = {move.getChessNotation():move for move in self.gs.getValidMoves()}
+        return self.validMoves
+
+
+class GameServer():
+    '''
+    All the games of the process, keyed by game number. idleSeconds is how long a game stays resident untouched.
+    '''
+    def __init__(self,backend='list',idleSeconds=60.0) -> None:
+        self.backend = BACKENDS[backend]
+        self.idleSeconds = idleSeconds
+        self.games = {}
+        self.nextGame = 1
+        self.resident = 0
+
+    async def serve(self,host,port):
+        server = await asyncio.start_server(self.handleConnection,host,port)
+        evictor = asyncio.ensure_future(self.evictIdleGames())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+
+    async def handleConnection(self,reader,writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    response = await self.handle(request)
+                except (ValueError,KeyError,TypeError) as e: # bad JSON, a missing or mistyped field, a bad FEN.
+                    request, response = {}, {'ok':False,'error':"bad request: %s" % e}
+                if isinstance(request,dict) and 'id' in request:
+                    response['id'] = request['id']
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    '''
+    Runs one request and returns the response.
+    '''
+    async def handle(self,request):
+        op = request['op']
+        if op == 'new':
+            gs = self.backend.GameState()
+            fen = request.get('fen')
+            if fen is not None:
+                if not isinstance(fen,str):
+                    raise TypeError("fen must be a string")
+                gs.loadFen(fen) # ValueError for any malformed field.
+            gameId = self.nextGame
+            self.nextGame += 1
+            self.games[gameId] = HostedGame(gs,fen)
+            self.resident += 1
+            return {'ok':True,'game':gameId}
+        if op == 'stats':
+            return {'ok':True,'games':len(self.games),'resident':self.resident,
+                    'evicted':len(self.games) - self.resident}
+        game = self.games.get(request['game'])
+        if game is None:
+            return {'ok':False,'error':"no game %s" % request['game']}
+        async with game.lock:
+            game.lastUsed = time.monotonic()
+            if op == 'drop':
+                del self.games[request['game']]
+                if game.gs is not None:
+                    self.resident -= 1
+                return {'ok':True}
+            if game.gs is None:
+                game.restore(self.backend)
+                self.resident += 1
+            gs = game.gs
+            if op == 'moves':
+                return {'ok':True,'moves':list(game.getValidMoves())}
+            if op == 'move':
+                move = game.getValidMoves().get(request['move'])
+                if move is None:
+                    return {'ok':False,'error':"illegal move %s" % request['move']}
+                gs.makeMove(move)
+                game.validMoves = None
+                status = 'ongoing'
+                if len(game.getValidMoves()) == 0: # the reply list is wanted next anyway.
+                    status = 'checkmate' if gs.inCheck else 'stalemate'
+                return {'ok':True,'status':status}
+            if op == 'undo':
+                if len(gs.moveLog) == 0:
+                    return {'ok':False,'error':"no move to undo"}
+                gs.undoMove()
+                game.validMoves = None
+                return {'ok':True}
+            if op == 'fen':
+                return {'ok':True,'fen':gs.getFen()}
+        return {'ok':False,'error':"unknown op %s" % op}
+
+    async def evictIdleGames(self):
+        while True:
+            await asyncio.sleep(min(self.idleSeconds,10.0))
+            self.evict(time.monotonic() - self.idleSeconds)
+
+    '''
+    Evicts every resident game last used before the cutoff, unless a request holds it.
+    '''
+    def evict(self,cutoff):
+        for game in self.games.values():
+            if game.gs is not None and game.lastUsed < cutoff and not game.lock.locked():
+                game.evict()
+                self.resident -= 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve many chess games over line-delimited JSON.")
+    parser.add_argument('--host',default='127.0.0.1')
+    parser.add_argument('--port',type=int,default=DEFAULT_PORT)
+    parser.add_argument('--backend',choices=sorted(BACKENDS),default='list')
+    parser.add_argument('--idle',type=float,default=60.0,help="seconds before an untouched game is evicted.")
+    args = parser.parse_args(argv)
+    server = GameServer(args.backend,args.idle)
+    print("serving on %s:%d" % (args.host,args.port))
+    try:
+        asyncio.run(server.serve(args.host,args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    main()
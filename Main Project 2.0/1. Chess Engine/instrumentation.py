@@ -0,0 +1,195 @@
+"""
+Opt-in instrumentation of the move generation hot paths. Entering a Profile swaps timing wrappers in for the functions
+in TARGETS (and counts Move allocations), leaving it puts the originals back -- outside a profile the engine runs its
+own functions untouched, so the instrumentation costs nothing when it is off. The wrappers add their own overhead, so
+compare the numbers of one profile with each other rather than with timings taken without it.
+
+    with instrumentation.Profile() as profile: # one search, one game, any block.
+        chessAI.findBestMove(gs,timeLimit=2.0)
+    print(profile.report())
+    profile.writeJson("profile.json")
+    profile.writeCollapsed("profile.folded") # flamegraph.pl, speedscope, inferno ...
+
+    python instrumentation.py [--fen "..."] [--depth 4] [--backend list] [--json out.json] [--collapsed out.folded]
+"""
+import argparse
+import json
+import sys
+import time
+
+import bitboardEngine
+import chessAI
+import chessEngine
+
+BACKENDS = {'list':chessEngine,'bitboard':bitboardEngine}
+# the GameState methods timed for each backend. the list backend's per piece generators are reached through the
+# moveFunctions dict, so the dict entries are wrapped too.
+TARGETS = {
+    chessEngine.GameState:('getValidMoves','getValidMoveCodes','generateMoves','getPieceMove','checkForPinsAndChecks',
+                           'getAllPossibleMoves','filterChecks','getPawnMoves','getRookMoves','getKnightMoves',
+                           'getBishopMoves','getQueenMoves','getKingMoves','getCastleMoves','makeMove','undoMove'),
+    bitboardEngine.GameState:('getValidMoves','getValidMoveCodes','getCheckMasks','generateMoveCodes','isValidCode',
+                              'getPawnMoves','getEnpassantMoves','getCastleMoves','getPieceMoves','makeMove',
+                              'undoMove'),
+}
+OTHER = "(not instrumented)" # the collapsed stack of the time spent outside every instrumented function.
+
+
+class Profile():
+    '''
+    Call counts and times of the instrumented functions while the profile is entered. Times are kept per call stack
+    of instrumented functions, which is what the collapsed stack export needs. Only one profile can be entered at a
+    time.
+    '''
+    active = None
+
+    def __init__(self) -> None:
+        self.calls = {} # function name -> calls.
+        self.totalTime = {} # function name -> seconds, including the instrumented functions it called.
+        self.stackTime = {} # call stack (tuple of names) -> seconds spent in the last function itself.
+        self.moveAllocations = 0
+        self.seconds = 0.0
+        self.stack = []
+        self.childTime = [] # per open call, seconds spent in the instrumented functions it called.
+        self.originals = []
+
+    def __enter__(self):
+        if Profile.active is not None:
+            raise RuntimeError("a profile is already running")
+        Profile.active = self
+        for cls, names in TARGETS.items():
+            for name in names:
+                self.patch(cls.__dict__,name,lambda wrapper,name=name,cls=cls: setattr(cls,name,wrapper))
+        moveFunctions = chessEngine.GameState.moveFunctions
+        for piece in moveFunctions:
+            self.patch(moveFunctions,piece,lambda wrapper,piece=piece: moveFunctions.__setitem__(piece,wrapper),
+                       moveFunctions[piece].__name__)
+        self.countMoves()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self,*exc):
+        self.seconds += time.perf_counter() - self.start
+        for restore in reversed(self.originals):
+            restore()
+        self.originals = []
+        Profile.active = None
+
+    '''
+    Replaces namespace[key] with a timed wrapper through install(wrapper) and remembers how to put it back.
+    '''
+    def patch(self,namespace,key,install,name=None):
+        original = namespace[key]
+        install(self.timed(name or key,original))
+        self.originals.append(lambda: install(original))
+
+    def timed(self,name,function):
+        stack = self.stack
+        childTime = self.childTime
+        perfCounter = time.perf_counter
+        def wrapper(*args,**kwargs):
+            stack.append(name)
+            childTime.append(0.0)
+            start = perfCounter()
+            try:
+                return function(*args,**kwargs)
+            finally:
+                elapsed = perfCounter() - start
+                path = tuple(stack)
+                stack.pop()
+                ownTime = elapsed - childTime.pop()
+                if childTime:
+                    childTime[-1] += elapsed
+                self.calls[name] = self.calls.get(name,0) + 1
+                if name not in stack: # a recursive call is already inside the outer call's time.
+                    self.totalTime[name] = self.totalTime.get(name,0.0) + elapsed
+                self.stackTime[path] = self.stackTime.get(path,0.0) + ownTime
+        wrapper.__name__ = function.__name__
+        wrapper.__wrapped__ = function
+        return wrapper
+
+    def countMoves(self):
+        # a Move is made by the constructor, or by fromLog which skips __init__.
+        init = chessEngine.Move.__init__
+        fromLog = chessEngine.Move.__dict__['fromLog']
+        def countingInit(move,*args,**kwargs):
+            self.moveAllocations += 1
+            init(move,*args,**kwargs)
+        def countingFromLog(*args):
+            self.moveAllocations += 1
+            return fromLog.__func__(*args)
+        chessEngine.Move.__init__ = countingInit
+        chessEngine.Move.fromLog = staticmethod(countingFromLog)
+        self.originals.append(lambda: setattr(chessEngine.Move,'__init__',init))
+        self.originals.append(lambda: setattr(chessEngine.Move,'fromLog',fromLog))
+
+    '''
+    The profile as a dict -- per function calls, total and self seconds and microseconds a call, slowest first.
+    '''
+    def toDict(self):
+        selfTime = {}
+        for path, seconds in self.stackTime.items():
+            selfTime[path[-1]] = selfTime.get(path[-1],0.0) + seconds
+        functions = {}
+        for name in sorted(self.calls,key=lambda name: -self.totalTime.get(name,0.0)):
+            functions[name] = {'calls':self.calls[name],'seconds':round(self.totalTime.get(name,0.0),6),
+                               'selfSeconds':round(selfTime.get(name,0.0),6),
+                               'microsecondsPerCall':round(1e6*self.totalTime.get(name,0.0)/self.calls[name],3)}
+        return {'seconds':round(self.seconds,6),'moveAllocations':self.moveAllocations,'functions':functions}
+
+    def writeJson(self,path):
+        with open(path,'w') as f:
+            json.dump(self.toDict(),f,indent=2)
+
+    '''
+    The profile in the collapsed stack format of flame graph tools -- "a;b;c microseconds" a line, the self time of c
+    when called from b called from a.
+    '''
+    def collapsedLines(self):
+        lines = ["%s %d" % (";".join(path),seconds*1e6) for path, seconds in sorted(self.stackTime.items())
+                 if seconds >= 1e-6]
+        instrumented = sum(self.totalTime.get(name,0.0) for name in {path[0] for path in self.stackTime})
+        if self.seconds > instrumented:
+            lines.append("%s %d" % (OTHER,(self.seconds - instrumented)*1e6))
+        return lines
+
+    def writeCollapsed(self,path):
+        with open(path,'w') as f:
+            f.write("\n".join(self.collapsedLines()) + "\n")
+
+    '''
+    The profile as a text table.
+    '''
+    def report(self):
+        profile = self.toDict()
+        lines = ["%.3fs profiled, %d Move objects allocated" % (profile['seconds'],profile['moveAllocations']),
+                 "%-24s %10s %10s %10s %10s" % ("function","calls","total s","self s","us/call")]
+        for name, stats in profile['functions'].items():
+            lines.append("%-24s %10d %10.3f %10.3f %10.2f" % (name,stats['calls'],stats['seconds'],stats['selfSeconds'],
+                                                             stats['microsecondsPerCall']))
+        return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the move generation of one search.")
+    parser.add_argument('--fen',default=chessEngine.STARTING_FEN)
+    parser.add_argument('--depth',type=int,default=4)
+    parser.add_argument('--backend',choices=sorted(BACKENDS),default='list')
+    parser.add_argument('--json',help="write the profile as JSON to this file.")
+    parser.add_argument('--collapsed',help="write collapsed stacks for a flame graph to this file.")
+    args = parser.parse_args(argv)
+    gs = BACKENDS[args.backend].GameState()
+    gs.loadFen(args.fen)
+    with Profile() as profile:
+        result = chessAI.Searcher().search(gs,maxDepth=args.depth)
+    print("best move %s at depth %d, %d nodes" % (result.bestMove.getChessNotation(),result.depth,result.nodes))
+    print(profile.report())
+    if args.json:
+        profile.writeJson(args.json)
+    if args.collapsed:
+        profile.writeCollapsed(args.collapsed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
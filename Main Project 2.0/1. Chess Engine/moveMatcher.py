@@ -0,0 +1,203 @@
+"""
+Turns what the speech recognizer heard into a valid move. Only the moves that are valid in the position can come out,
+so a transcript that is half wrong ("see four", "night f3") still lands on the move that was meant, and most moves need
+no "did you say ...?" round trip.
+
+Understood: "e2 to e4", "e4", "knight f3", "bishop takes c6", "e takes d5", "castle kingside" / "castles long",
+"e7 e8 queen", plus the usual mishearings of letters, numbers and pieces (see WORDS).
+
+    matcher = MoveMatcher()
+    matcher.update(gs.getValidMoves()) # after every move.
+    move, confidence = matcher.match([("night f3",0.8),("knight f3",0.6)])
+"""
+import difflib
+import re
+
+# spoken word -> (kind, value). kinds: file, rank, piece, capture, to, castle, side, promote.
+WORDS = {}
+for value, words in (('a',"a ay eh"),('b',"b be bee bea"),('c',"c see sea si cee she"),('d',"d dee de"),
+                     ('e',"e ee"),('f',"f ef eff if"),('g',"g gee jee ji"),('h',"h aitch age each")):
+    WORDS.update((word,('file',value)) for word in words.split())
+for value, words in (('1',"1 one won want"),('2',"2 two"),('3',"3 three tree free"),('4',"4 four for fore far"),
+                     ('5',"5 five fife fight"),('6',"6 six sicks sick sex"),('7',"7 seven"),('8',"8 eight ate hate")):
+    WORDS.update((word,('rank',value)) for word in words.split())
+for value, words in (('N',"knight knights night nights nite horse"),('B',"bishop bishops"),
+                     ('R',"rook rooks rock rocks brook ruck"),('Q',"queen queens"),('K',"king kings"),
+                     ('p',"pawn pawns porn pond prawn")):
+    WORDS.update((word,('piece',value)) for word in words.split())
+WORDS.update((word,('capture',True)) for word in "takes take took captures capture x".split())
+WORDS.update((word,('to',None)) for word in "to too".split()) # "too" is also heard for "two".
+WORDS.update((word,('castle',None)) for word in "castle castles castling".split())
+WORDS.update({'kingside':('side','K'),'short':('side','K'),'queenside':('side','Q'),'long':('side','Q'),
+              'side':('side',None)})
+WORDS.update((word,('promote',None)) for word in "promote promotes promotion promoting equals =".split())
+FILLER = frozenset("the my move moves go goes from on and then please um uh".split())
+FUZZY_WORDS = sorted(word for word in WORDS if len(word) > 2) # short words are too easy to confuse.
+
+SUBSTITUTION_PENALTY = 0.9 # an unknown word that was read as a close vocabulary word.
+UNKNOWN_PENALTY = 0.92 # a word that was dropped.
+
+'''
+The transcript as a list of (kind, value) tokens, and how much was guessed to get them (1.0 = every word known).
+'''
+def tokenize(text):
+    text = text.lower().replace("0-0","o-o")
+    text = text.replace("o-o-o"," castle queenside ").replace("o-o"," castle kingside ")
+    tokens = []
+    quality = 1.0
+    for word in re.findall(r"[a-z]+|[0-9]|=",text):
+        if word in WORDS:
+            tokens.append(WORDS[word])
+        elif word in FILLER:
+            continue
+        else:
+            close = difflib.get_close_matches(word,FUZZY_WORDS,n=1,cutoff=0.75)
+            if close:
+                tokens.append(WORDS[close[0]])
+                quality *= SUBSTITUTION_PENALTY
+            else:
+                quality *= UNKNOWN_PENALTY
+    return tokens, quality
+
+'''
+Every way to read the tokens -- "to" after a file letter may be the separator or a misheard "two". Each reading is a
+dict of what was said: squares, piece, fromFile, capture, castle, promotion.
+'''
+def readings(tokens):
+    variants = [[]]
+    for i, (kind, value) in enumerate(tokens):
+        if kind == 'to' and i > 0 and tokens[i - 1][0] == 'file' and len(variants) < 8:
+            variants = [variant + [token] for variant in variants for token in (('to',None),('rank','2'))]
+        else:
+            for variant in variants:
+                variant.append((kind,value))
+    return [parse(variant) for variant in variants]
+
+def parse(tokens):
+    said = {'squares':[],'piece':None,'fromFile':None,'capture':False,'castle':None,'promotion':None}
+    promoteNext = False
+    i = 0
+    while i < len(tokens):
+        kind, value = tokens[i]
+        nextKind, nextValue = tokens[i + 1] if i + 1 < len(tokens) else (None,None)
+        if kind == 'file' and nextKind == 'rank':
+            said['squares'].append(value + nextValue)
+            i += 1
+        elif kind == 'file' and not said['squares'] and nextKind == 'capture':
+            said['fromFile'] = value # "e takes d5".
+        elif kind == 'piece' and nextKind == 'side' and value in ('K','Q'):
+            said['castle'] = value # "king side".
+            i += 1
+        elif kind == 'piece':
+            if promoteNext or said['squares']: # a piece after the squares is what a pawn becomes -- "e7 e8 queen".
+                if value in ('Q','R','B','N'):
+                    said['promotion'] = value
+            elif said['piece'] is None:
+                said['piece'] = value
+        elif kind == 'capture':
+            said['capture'] = True
+        elif kind == 'castle':
+            said['castle'] = said['castle'] or 'any'
+        elif kind == 'side' and value is not None:
+            said['castle'] = value
+        elif kind == 'promote':
+            promoteNext = True
+        i += 1
+    return said
+
+'''
+How well a move fits what was said, 0..1.
+'''
+def scoreMove(said,move):
+    if said['castle'] is not None:
+        if not move.isCastleMove:
+            return 0.0
+        side = 'K' if move.endCol > move.startCol else 'Q'
+        return 1.0 if said['castle'] == side else 0.9 if said['castle'] == 'any' else 0.0
+    squares = said['squares']
+    start = move.getRankFile(move.startRow,move.startCol)
+    end = move.getRankFile(move.endRow,move.endCol)
+    piece = move.pieceMoved[1]
+    if len(squares) >= 2:
+        score = 1.0 if (squares[0],squares[-1]) == (start,end) else 0.5 if squares[-1] == end else \
+                0.3 if squares[0] == start else 0.0
+    elif len(squares) == 1:
+        if squares[0] != end:
+            return 0.0
+        score = 1.0 if said['piece'] is not None or piece == 'p' else 0.8 # a bare square means a pawn move.
+    else:
+        score = 0.3 if said['piece'] == piece else 0.0
+    if said['piece'] is not None and said['piece'] != piece:
+        score *= 0.5 if len(squares) >= 2 else 0.3
+    if said['fromFile'] is not None and said['fromFile'] != start[0]:
+        score *= 0.6
+    capture = move.pieceCaptured != "--"
+    if said['capture'] != capture:
+        score *= 0.7 if said['capture'] else 0.95
+    if move.isPawnPromotion:
+        choice = said['promotion'] or 'Q'
+        if choice != move.promotionChoice:
+            score *= 0.6 if said['promotion'] else 0.7
+    return score
+
+
+class MoveMatcher():
+    '''
+    The valid moves of one position, indexed by end square -- update() after every move. The index is built the first
+    time something is said in the position, so positions nobody speaks in cost nothing.
+    '''
+    def __init__(self) -> None:
+        self.moves = []
+        self.byEnd = None
+
+    def update(self,validMoves):
+        self.moves = list(validMoves)
+        self.byEnd = None
+
+    def buildIndex(self):
+        self.byEnd = {}
+        for move in self.moves:
+            self.byEnd.setdefault(move.getRankFile(move.endRow,move.endCol),[]).append(move)
+
+    '''
+    Candidates worth scoring for a reading -- the moves to the squares said, or all of them.
+    '''
+    def candidates(self,said):
+        if said['castle'] is not None or not said['squares']:
+            return self.moves
+        moves = self.byEnd.get(said['squares'][-1],[])
+        if len(said['squares']) >= 2: # a misheard end square still has the start square to go by.
+            start = said['squares'][0]
+            moves = moves + [move for move in self.moves if move.getRankFile(move.startRow,move.startCol) == start]
+        return moves
+
+    '''
+    The best valid move for an n-best list of (transcript, confidence), as (move, confidence) -- (None, 0.0) if
+    nothing fits. The confidence drops when another move fits about as well, e.g. "knight d2" with two knights.
+    '''
+    def match(self,hypotheses):
+        if self.byEnd is None:
+            self.buildIndex()
+        bestMove, bestConfidence = None, 0.0
+        for text, hypothesisConfidence in hypotheses:
+            tokens, quality = tokenize(text)
+            if not tokens:
+                continue
+            scores = {}
+            for said in readings(tokens):
+                for move in self.candidates(said):
+                    score = scoreMove(said,move)
+                    if score > scores.get(move,0.0):
+                        scores[move] = score
+            if not scores:
+                continue
+            ranked = sorted(scores.items(),key=lambda item: item[1],reverse=True)
+            move, score = ranked[0]
+            runnerUp = ranked[1][1] if len(ranked) > 1 else 0.0
+            if score == 0:
+                continue
+            # a clear winner keeps its score, a tie with another move halves it.
+            confidence = hypothesisConfidence*quality*score*min(1.0,1.5 - runnerUp/score)
+            if confidence > bestConfidence:
+                bestMove, bestConfidence = move, confidence
+        return bestMove, bestConfidence
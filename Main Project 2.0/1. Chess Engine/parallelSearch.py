@@ -0,0 +1,167 @@
+"""
+Multi-core search (lazy SMP). Helper processes search the same root as the main search, all of them reading and writing
+one transposition table in shared memory, so every process profits from the others' work. The main search runs in the
+calling process and its result comes back through the same api as chessAI.Searcher.
+
+    python parallelSearch.py --workers 1,2,4,8 --depth 5
+prints time to depth and speedup against a single worker for a few test positions.
+"""
+import argparse
+import multiprocessing
+import pickle
+import time
+from multiprocessing import shared_memory
+
+import chessAI
+import chessEngine
+import perft
+
+class SharedTranspositionTable(chessAI.TranspositionTable):
+    '''
+    chessAI.TranspositionTable over a shared memory block instead of python lists -- the first half of the block holds
+    the xored keys, the second half the packed data. Pass name to attach to a table another process created.
+    '''
+    def __init__(self,sizeMB=16,name=None) -> None:
+        size = chessAI.tableSlots(sizeMB)
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True,size=size*16)
+            self.memory.buf[:] = bytes(size*16) # fresh blocks aren't zeroed on every platform.
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+        self.sizeMB = sizeMB
+        self.mask = size - 1
+        self.slots = self.memory.buf.cast('Q')
+        self.keys = self.slots[:size]
+        self.data = self.slots[size:]
+        self.age = 0
+
+    def clear(self):
+        self.memory.buf[:] = bytes(len(self.memory.buf))
+
+    '''
+    Detach from the block -- the process that created it also frees it.
+    '''
+    def close(self,unlink=False):
+        self.keys.release()
+        self.data.release()
+        self.slots.release()
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+# state of a helper process, set up once by initHelper.
+helper = {}
+
+def initHelper(ttName,ttSizeMB,stopEvent):
+    tt = SharedTranspositionTable(ttSizeMB,name=ttName)
+    helper['searcher'] = chessAI.Searcher(tt=tt,stopEvent=stopEvent) # stops as soon as the main search is done.
+
+def helperSearch(position,maxDepth,timeLimit,nodeLimit,startDepth):
+    return helper['searcher'].search(pickle.loads(position),maxDepth,timeLimit,nodeLimit,startDepth=startDepth)
+
+
+class ParallelSearcher():
+    '''
+    Drop-in for chessAI.Searcher that searches with `workers` processes -- the calling process plus workers-1 helpers.
+    Keep one for the whole game (the pool and the shared table live as long as it does) and close() it at the end.
+    '''
+    def __init__(self,workers=None,ttSizeMB=64) -> None:
+        self.workers = workers or multiprocessing.cpu_count()
+        self.tt = SharedTranspositionTable(ttSizeMB)
+        self.stopEvent = multiprocessing.Event()
+        self.searcher = chessAI.Searcher(tt=self.tt,stopEvent=self.stopEvent)
+        self.pool = None
+        if self.workers > 1:
+            self.pool = multiprocessing.Pool(self.workers - 1,initializer=initHelper,
+                                             initargs=(self.tt.name,ttSizeMB,self.stopEvent))
+
+    def stop(self):
+        self.stopEvent.set()
+
+    '''
+    Same arguments and SearchResult as chessAI.Searcher.search. nodeLimit is shared out between the processes.
+    '''
+    def search(self,gs,maxDepth=chessAI.MAX_PLY - 1,timeLimit=None,nodeLimit=None,onIteration=None):
+        self.stopEvent.clear()
+        helperNodes = mainNodes = None
+        if nodeLimit is not None:
+            # the remainder goes to the main search -- with fewer nodes than processes the helpers stay idle.
+            helperNodes = nodeLimit//self.workers
+            mainNodes = nodeLimit - helperNodes*(self.workers - 1)
+        pending = []
+        if self.pool is not None and helperNodes != 0:
+            # pickled here -- the pool sends tasks from another thread, by then the main search is moving pieces on gs.
+            position = pickle.dumps(gs)
+            for i in range(1,self.workers):
+                # half of the helpers start one iteration ahead so they aren't all on the same depth.
+                pending.append(self.pool.apply_async(helperSearch,(position,maxDepth,timeLimit,helperNodes,1 + i % 2)))
+        try:
+            result = self.searcher.search(gs,maxDepth,timeLimit,mainNodes,onIteration)
+        finally:
+            self.stopEvent.set() # the main search is done -- the helpers stop at their next budget check.
+            helperResults = [p.get() for p in pending]
+        for helperResult in helperResults:
+            result.nodes += helperResult.nodes
+            if helperResult.depth > result.depth and helperResult.bestMove is not None:
+                # a helper got deeper -- take its move, mapped onto this process's own move objects.
+                rootMoves = chessEngine.moveLookup(gs.getValidMoves())
+                result.bestMove = rootMoves[helperResult.bestMove.moveID]
+                result.score = helperResult.score
+                result.depth = helperResult.depth
+                result.pv = [result.bestMove] + helperResult.pv[1:]
+        return result
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        self.tt.close(unlink=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+
+BENCH_POSITIONS = (
+    chessEngine.STARTING_FEN,
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+)
+
+'''
+Time to depth over the bench positions for each worker count, and the speedup against the first count.
+'''
+def scalingBenchmark(workerCounts,depth,backend='list',positions=BENCH_POSITIONS):
+    baseline = None
+    for workers in workerCounts:
+        with ParallelSearcher(workers) as searcher:
+            seconds = 0.0
+            nodes = 0
+            for fen in positions:
+                gs = perft.newGameState(fen,backend)
+                start = time.perf_counter()
+                result = searcher.search(gs,maxDepth=depth)
+                seconds += time.perf_counter() - start
+                nodes += result.nodes
+        if baseline is None:
+            baseline = seconds
+        print("workers %2d  depth %d  %7.2fs  %8d nodes  %7d nps  speedup %.2fx" %
+              (workers,depth,seconds,nodes,nodes/seconds,baseline/seconds))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lazy SMP scaling benchmark -- time to a fixed depth per worker count.")
+    parser.add_argument('--workers',default="1,2,4",help="comma separated worker counts, the first is the baseline.")
+    parser.add_argument('--depth',type=int,default=5)
+    parser.add_argument('--backend',choices=('list','bitboard'),default='bitboard')
+    args = parser.parse_args(argv)
+    scalingBenchmark([int(w) for w in args.workers.split(',')],args.depth,args.backend)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Perft -- counts the leaf nodes of the move tree to a given depth. Used to check getValidMoves/makeMove/undoMove against
+known node counts (perftsuite.epd) and to put a nodes/sec number on move generation.
+
+    python perft.py --depth 4
+    python perft.py --fen "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1" --depth 2 --divide
+    python perft.py --suite --max-nodes 500000 --backend bitboard
+"""
+import argparse
+import os
+import sys
+import time
+
+import bitboardEngine
+import chessEngine
+
+BACKENDS = {'list':chessEngine,'bitboard':bitboardEngine}
+SUITE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),"perftsuite.epd")
+
+'''
+New GameState of the given backend set up from a FEN.
+'''
+def newGameState(fen=chessEngine.STARTING_FEN,backend='list'):
+    gs = BACKENDS[backend].GameState()
+    gs.loadFen(fen)
+    return gs
+
+'''
+Number of leaf nodes depth plies below the current position -- the last ply is counted, not played.
+'''
+def perft(gs,depth):
+    if depth == 0:
+        return 1
+    if depth == 1:
+        return len(gs.getValidMoveCodes()) # the last ply only needs counting, not Move objects.
+    moves = gs.getValidMoves()
+    nodes = 0
+    for move in moves:
+        gs.makeMove(move)
+        nodes += perft(gs,depth-1)
+        gs.undoMove()
+    return nodes
+
+'''
+Perft split by root move -- {notation: nodes}. Diffing this against another engine finds the move that is wrong.
+'''
+def divide(gs,depth):
+    counts = {}
+    for move in gs.getValidMoves():
+        gs.makeMove(move)
+        counts[move.getChessNotation()] = perft(gs,depth-1)
+        gs.undoMove()
+    return counts
+
+'''
+Reads an EPD perft file -- one position per line as "fen ;D1 20 ;D2 400 ...". Blank lines and # comments are skipped.
+Returns a list of (fen, {depth: nodes}).
+'''
+def loadSuite(path=SUITE_FILE):
+    positions = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line == "" or line.startswith('#'):
+                continue
+            fields = line.split(';')
+            counts = {}
+            for field in fields[1:]:
+                depth, nodes = field.split()
+                counts[int(depth[1:])] = int(nodes)
+            positions.append((fields[0].strip(),counts))
+    return positions
+
+'''
+Runs every position of the suite up to maxDepth, skipping depths whose known count is above maxNodes.
+Returns a list of (fen, depth, expected, nodes, seconds).
+'''
+def runSuite(backend='list',maxDepth=6,maxNodes=1000000,path=SUITE_FILE,out=sys.stdout):
+    results = []
+    for fen, counts in loadSuite(path):
+        gs = newGameState(fen,backend)
+        for depth in sorted(counts):
+            expected = counts[depth]
+            if depth > maxDepth or expected > maxNodes:
+                break
+            start = time.perf_counter()
+            nodes = perft(gs,depth)
+            seconds = time.perf_counter() - start
+            results.append((fen,depth,expected,nodes,seconds))
+            status = "ok  " if nodes == expected else "FAIL"
+            print(status,"D%d" % depth,"%10d" % nodes,"(expected %d)" % expected if nodes != expected else "",
+                  formatRate(nodes,seconds),fen,file=out)
+    return results
+
+def formatRate(nodes,seconds):
+    return "%.2fs %d nps" % (seconds,nodes/seconds if seconds > 0 else 0)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count move generation leaf nodes (perft) for a position or the perft suite.")
+    parser.add_argument('--fen',default=chessEngine.STARTING_FEN,help="position to search, start position by default.")
+    parser.add_argument('--depth',type=int,default=3)
+    parser.add_argument('--divide',action='store_true',help="print the node count under every root move.")
+    parser.add_argument('--backend',choices=sorted(BACKENDS),default='list')
+    parser.add_argument('--suite',nargs='?',const=SUITE_FILE,help="run an EPD perft suite (perftsuite.epd by default).")
+    parser.add_argument('--max-depth',type=int,default=6,help="suite only -- deepest depth to run.")
+    parser.add_argument('--max-nodes',type=int,default=1000000,help="suite only -- skip depths with more nodes than this.")
+    args = parser.parse_args(argv)
+
+    if args.suite:
+        start = time.perf_counter()
+        results = runSuite(args.backend,args.max_depth,args.max_nodes,args.suite)
+        failures = [r for r in results if r[2] != r[3]]
+        totalNodes = sum(r[3] for r in results)
+        print("%d/%d passed, %d nodes," % (len(results) - len(failures),len(results),totalNodes),
+              formatRate(totalNodes,time.perf_counter() - start))
+        return 1 if failures else 0
+
+    gs = newGameState(args.fen,args.backend)
+    start = time.perf_counter()
+    if args.divide:
+        counts = divide(gs,args.depth)
+        for notation in sorted(counts):
+            print(notation + ":",counts[notation])
+        nodes = sum(counts.values())
+        print("moves:",len(counts))
+    else:
+        nodes = perft(gs,args.depth)
+    print("nodes:",nodes,formatRate(nodes,time.perf_counter() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+PGN files -- games are streamed out of a memory mapped file one at a time, so a file of millions of games is read
+without loading it, and a replay splits the file into byte ranges that worker processes read on their own.
+
+    python pgn.py games.pgn [--workers 4] [--backend bitboard] [--index games.tsv]
+
+The replay plays every move through getValidMoves/makeMove and reports the games that have an illegal or ambiguous
+move, then games/sec. --index writes a line per game: byte offset, plies, result and the final FEN.
+
+Games are found by their [Event tag, the first tag of every exported PGN game.
+"""
+import argparse
+import mmap
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+import bitboardEngine
+import chessEngine
+
+BACKENDS = {'list':chessEngine,'bitboard':bitboardEngine}
+GAME_START = b"[Event "
+RESULTS = ("1-0","0-1","1/2-1/2","*")
+TAG_PATTERN = re.compile(r'^\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]',re.MULTILINE)
+COMMENT_PATTERN = re.compile(r"\{[^}]*\}|;[^\n]*")
+VARIATION_PATTERN = re.compile(r"\([^()]*\)") # innermost variation -- applied until none are left.
+MOVE_NUMBER_PATTERN = re.compile(r"^\d+\.+")
+RANGE_SIZE = 1 << 20 # the least a worker is handed at a time.
+
+
+class PgnGame():
+    '''
+    One game as read -- tags (dict), moves (SAN of the main line), result ("1-0", "0-1", "1/2-1/2" or "*") and the
+    byte offset of the game in the file.
+    '''
+    __slots__ = ('tags','moves','result','offset')
+
+    def __init__(self,tags,moves,result,offset=0) -> None:
+        self.tags = tags
+        self.moves = moves
+        self.result = result
+        self.offset = offset
+
+'''
+One game's text as a PgnGame -- comments, variations, NAGs and move numbers are dropped.
+'''
+def parseGame(text,offset=0):
+    tags = {name:value.replace('\\"','"').replace('\\\\','\\') for name, value in TAG_PATTERN.findall(text)}
+    movetext = "\n".join(line for line in text.splitlines() if not line.startswith(('[','%')))
+    movetext = COMMENT_PATTERN.sub(" ",movetext)
+    count = 1
+    while count:
+        movetext, count = VARIATION_PATTERN.subn(" ",movetext)
+    moves = []
+    result = tags.get('Result','*')
+    for token in movetext.split():
+        if token in RESULTS:
+            result = token
+            continue
+        token = MOVE_NUMBER_PATTERN.sub("",token) # "12." "12..." and "12.e4".
+        if token and not token.startswith('$'):
+            moves.append(token)
+    return PgnGame(tags,moves,result,offset)
+
+'''
+Offset of the first game that starts at or after pos, -1 if there is none.
+'''
+def nextGameStart(data,pos):
+    while True:
+        found = data.find(GAME_START,pos)
+        # a tag at the start of a line, or right after a UTF-8 byte order mark.
+        if found <= 0 or data[found - 1] in b"\r\n" or (found == 3 and data[:3] == b"\xef\xbb\xbf"):
+            return found
+        pos = found + 1
+
+'''
+The games of a PGN file that start within [start, end) -- a game that starts in the range is read to its end even past
+it, so ranges that split a file between them see each game exactly once.
+'''
+def iterGames(path,start=0,end=None):
+    with open(path,'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ) as data:
+            end = len(data) if end is None else end
+            gameStart = nextGameStart(data,start)
+            while gameStart != -1 and gameStart < end:
+                gameEnd = nextGameStart(data,gameStart + 1)
+                text = data[gameStart:gameEnd if gameEnd != -1 else len(data)]
+                yield parseGame(text.decode('utf-8','replace'),gameStart)
+                gameStart = gameEnd
+
+'''
+The file split into about count byte ranges of at least RANGE_SIZE bytes.
+'''
+def splitFile(path,count):
+    size = os.path.getsize(path)
+    step = max(RANGE_SIZE,-(-size//max(1,count)))
+    return [(start,min(size,start + step)) for start in range(0,size,step)]
+
+'''
+Plays a game's moves on a new GameState. Returns the GameState and an error message, None if every move was valid.
+'''
+def replayGame(game,backend='list'):
+    gs = BACKENDS[backend].GameState()
+    if 'FEN' in game.tags:
+        try:
+            gs.loadFen(game.tags['FEN'])
+        except ValueError as e:
+            return gs, "bad FEN tag: %s" % e
+    for ply, san in enumerate(game.moves):
+        try:
+            move = chessEngine.Move.fromSan(san,gs)
+        except ValueError as e:
+            return gs, "ply %d: %s" % (ply + 1,e)
+        gs.makeMove(move)
+    return gs, None
+
+'''
+Replays the games of one byte range -- the work of one pool task. Returns (games, plies, errors, index lines).
+'''
+def replayRange(task):
+    path, start, end, backend, index = task
+    games = plies = 0
+    errors = []
+    lines = []
+    for game in iterGames(path,start,end):
+        gs, error = replayGame(game,backend)
+        games += 1
+        plies += len(gs.moveLog)
+        if error is not None:
+            errors.append((game.offset,error))
+        if index:
+            lines.append("%d\t%d\t%s\t%s" % (game.offset,len(gs.moveLog),game.result,gs.getFen()))
+    return games, plies, errors, lines
+
+'''
+Replays every game of the file on workers processes and prints the totals. Returns the number of bad games.
+'''
+def replayFile(path,workers=1,backend='list',indexPath=None):
+    ranges = splitFile(path,workers*8) # several ranges a worker, so a slow range doesn't leave the others idle.
+    tasks = [(path,start,end,backend,indexPath is not None) for start, end in ranges]
+    start = time.perf_counter()
+    games = plies = 0
+    errors = []
+    index = open(indexPath,'w') if indexPath is not None else None
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        # in file order, so the index is too.
+        for rangeGames, rangePlies, rangeErrors, lines in (pool.imap(replayRange,tasks) if pool else
+                                                            map(replayRange,tasks)):
+            games += rangeGames
+            plies += rangePlies
+            errors += rangeErrors
+            if index is not None and lines:
+                index.write("\n".join(lines) + "\n")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if index is not None:
+            index.close()
+    elapsed = time.perf_counter() - start
+    for offset, error in errors[:20]:
+        print("game at byte %d: %s" % (offset,error))
+    if len(errors) > 20:
+        print("... and %d more" % (len(errors) - 20))
+    print("%d games, %d moves, %d bad in %.2fs -- %.0f games/s, %.0f moves/s (%d workers, %s)" %
+          (games,plies,len(errors),elapsed,games/max(elapsed,1e-9),plies/max(elapsed,1e-9),workers,backend))
+    return len(errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the games of a PGN file and check every move.")
+    parser.add_argument('path')
+    parser.add_argument('--workers',type=int,default=os.cpu_count() or 1)
+    parser.add_argument('--backend',choices=sorted(BACKENDS),default='bitboard')
+    parser.add_argument('--index',help="write offset, plies, result and final FEN of every game to this file.")
+    args = parser.parse_args(argv)
+    return 1 if replayFile(args.path,args.workers,args.backend,args.index) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Piece images from one sprite atlas (images/pieces.png -- the 12 pieces side by side in PIECES order). The atlas is
+scaled once per square size and the result kept in __pycache__ as raw pixels, so a start at a size seen before is
+one file read and no scaling. A cache file starts with the modification time and size of the atlas it was scaled from,
+so a changed atlas is scaled again. Nothing is loaded until the first piece is drawn.
+
+    python pieceImages.py --build-atlas
+rebuilds images/pieces.png from the single piece PNGs in images/.
+"""
+import argparse
+import os
+
+import pygame as p
+
+PIECES = ('wp','wN','wB','wR','wQ','wK','bp','bN','bB','bR','bQ','bK')
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),"images")
+ATLAS_FILE = os.path.join(IMAGE_DIR,"pieces.png")
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),"__pycache__")
+
+class PieceImages():
+    '''
+    images[piece] gives the piece scaled to the square size, e.g. images['wp']. resize() switches to another square
+    size -- it is loaded the next time a piece is asked for.
+    '''
+    def __init__(self,squareSize) -> None:
+        self.squareSize = squareSize
+        self.images = None
+
+    def resize(self,squareSize):
+        if squareSize != self.squareSize:
+            self.squareSize = squareSize
+            self.images = None
+
+    def __getitem__(self,piece):
+        if self.images is None:
+            self.images = self.load()
+        return self.images[piece]
+
+    def load(self):
+        atlas = loadScaledAtlas(self.squareSize)
+        if p.display.get_surface() is not None: # same pixel format as the window, so blits don't convert.
+            atlas = atlas.convert_alpha()
+        size = self.squareSize
+        return {piece:atlas.subsurface(p.Rect(i*size,0,size,size)) for i, piece in enumerate(PIECES)}
+
+
+def cacheFile(squareSize):
+    return os.path.join(CACHE_DIR,"pieces%d.rgba" % squareSize)
+
+def atlasStamp():
+    # the header line of a cache file -- which atlas the pixels were scaled from.
+    stat = os.stat(ATLAS_FILE)
+    return b"%d %d\n" % (stat.st_mtime_ns,stat.st_size)
+
+'''
+The atlas scaled to squareSize squares -- from the cache if this size was scaled before, else scaled now and cached.
+'''
+def loadScaledAtlas(squareSize):
+    size = (len(PIECES)*squareSize,squareSize)
+    path = cacheFile(squareSize)
+    stamp = atlasStamp()
+    try:
+        with open(path,'rb') as f:
+            header = f.readline()
+            pixels = f.read()
+        if header == stamp and len(pixels) == size[0]*size[1]*4:
+            return p.image.fromstring(pixels,size,'RGBA')
+    except OSError:
+        pass # not scaled to this size yet.
+    atlas = p.transform.scale(p.image.load(ATLAS_FILE),size)
+    try:
+        os.makedirs(CACHE_DIR,exist_ok=True)
+        with open(path + ".tmp",'wb') as f:
+            f.write(stamp)
+            f.write(p.image.tostring(atlas,'RGBA'))
+        os.replace(path + ".tmp",path)
+    except OSError:
+        pass # read-only install -- scale again next time.
+    return atlas
+
+'''
+Packs images/<piece>.png into the atlas, in PIECES order. All pieces must have the same size.
+'''
+def buildAtlas(path=ATLAS_FILE):
+    images = [p.image.load(os.path.join(IMAGE_DIR,piece + ".png")) for piece in PIECES]
+    width, height = images[0].get_size()
+    atlas = p.Surface((width*len(images),height),p.SRCALPHA)
+    for i, image in enumerate(images):
+        atlas.blit(image,(i*width,0))
+    p.image.save(atlas,path)
+    for name in os.listdir(CACHE_DIR) if os.path.isdir(CACHE_DIR) else ():
+        if name.startswith("pieces") and name.endswith(".rgba"): # scaled from the old atlas.
+            os.remove(os.path.join(CACHE_DIR,name))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Piece sprite atlas tools.")
+    parser.add_argument('--build-atlas',action='store_true',help="rebuild images/pieces.png from the piece PNGs.")
+    args = parser.parse_args(argv)
+    if args.build_atlas:
+        buildAtlas()
+        print("wrote",ATLAS_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Headless self-play -- two engine configurations play each other on a process pool, without pygame. Every opening of
+the position file is played twice, once with each engine as white. Games that are clearly won or drawn are
+adjudicated early, every finished game goes to the log as it comes in, and a sequential probability ratio test (SPRT)
+stops the match as soon as the result is significant either way.
+
+    python selfPlay.py --engine-a nodes=20000 --engine-b nodes=20000,eval=myEval.evaluate
+                       [--openings openings.epd] [--games 2000] [--workers 4] [--log match.tsv]
+                       [--elo0 0 --elo1 10 --alpha 0.05 --beta 0.05]
+
+An engine is a comma separated list of depth=N, nodes=N, movetime=SECONDS, hash=MB and eval=module.function.
+A log line is: game, opening, white engine (A or B), result, reason, plies, the move codes (Move.moveID) in hex.
+"""
+import argparse
+import importlib
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import bitboardEngine
+import chessAI
+import chessEngine
+import evaluation
+
+BACKENDS = {'list':chessEngine,'bitboard':bitboardEngine}
+OPENINGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),"openings.epd")
+DEFAULT_NODES = 10000 # an engine given no limit searches this many nodes a move.
+MAX_PLIES = 400 # a game this long is a draw.
+FIFTY_MOVES = 100 # plies without a capture or a pawn move.
+RESIGN_SCORE = 800 # both engines scoring a side this far ahead (centipawns) for RESIGN_PLIES plies -- it wins.
+RESIGN_PLIES = 8
+DRAW_SCORE = 10 # both engines scoring within this of 0 for DRAW_PLIES plies, from ply DRAW_START on -- a draw.
+DRAW_PLIES = 12
+DRAW_START = 80
+
+
+class EngineConfig():
+    '''
+    How one side searches, parsed from a spec like "nodes=20000,hash=16".
+    '''
+    def __init__(self,spec="") -> None:
+        self.spec = spec
+        self.depth = chessAI.MAX_PLY - 1
+        self.nodes = None
+        self.movetime = None
+        self.hashMB = 16
+        self.evaluate = evaluation.evaluate
+        for item in filter(None,spec.split(',')):
+            name, _, value = item.partition('=')
+            if name == 'depth':
+                self.depth = int(value)
+            elif name == 'nodes':
+                self.nodes = int(value)
+            elif name == 'movetime':
+                self.movetime = float(value)
+            elif name == 'hash':
+                self.hashMB = int(value)
+            elif name == 'eval':
+                moduleName, _, functionName = value.rpartition('.')
+                self.evaluate = getattr(importlib.import_module(moduleName),functionName)
+            else:
+                raise ValueError("unknown engine setting %s" % name)
+        if self.nodes is None and self.movetime is None and self.depth == chessAI.MAX_PLY - 1:
+            self.nodes = DEFAULT_NODES
+
+    def newSearcher(self):
+        return chessAI.Searcher(self.hashMB,self.evaluate)
+
+    def search(self,searcher,gs):
+        return searcher.search(gs,self.depth,self.movetime,self.nodes)
+
+'''
+The FENs of a position file -- one per line, anything after ";" is ignored, FENs without move counters are fine.
+A position that isn't valid raises ValueError here, not in every worker.
+'''
+def readOpenings(path):
+    openings = []
+    with open(path) as f:
+        for number, line in enumerate(f,1):
+            fen = line.split(';')[0].strip()
+            if fen and not fen.startswith('#'):
+                fen = fen if len(fen.split()) > 4 else fen + " 0 1"
+                try:
+                    chessEngine.parseFen(fen)
+                    chessEngine.fenCounters(fen)
+                except ValueError as e:
+                    raise ValueError("%s line %d: %s" % (path,number,e))
+                openings.append(fen)
+    return openings
+
+def expectedScore(elo):
+    return 1/(1 + 10**(-elo/400))
+
+'''
+Log likelihood ratio of elo1 against elo0 for a win/draw/loss record -- the normal approximation of the trinomial
+GSPRT, in logistic Elo.
+'''
+def sprtLLR(wins,draws,losses,elo0,elo1):
+    if wins + draws + losses == 0:
+        return 0.0
+    if 0 in (wins,draws,losses): # an outcome not seen yet counts half a game, so a clean sweep has a variance.
+        wins, draws, losses = wins + 0.5, draws + 0.5, losses + 0.5
+    games = wins + draws + losses
+    score = (wins + draws/2)/games
+    variance = (wins + draws/4)/games - score*score
+    s0, s1 = expectedScore(elo0), expectedScore(elo1)
+    return (s1 - s0)*(2*score - s0 - s1)/(2*variance/games)
+
+'''
+Elo difference for a record and its 95% error margin.
+'''
+def eloEstimate(wins,draws,losses):
+    games = wins + draws + losses
+    score = (wins + draws/2)/games
+    margin = 1.96*math.sqrt(max(0.0,(wins + draws/4)/games - score*score)/games)
+    def elo(x):
+        x = min(max(x,1e-6),1 - 1e-6)
+        return -400*math.log10(1/x - 1)
+    return elo(score), (elo(score + margin) - elo(score - margin))/2
+
+'''
+(result, reason) if the game is over by the rules, None if it goes on.
+'''
+def gameOver(gs):
+    if len(gs.getValidMoveCodes()) == 0: # sets gs.inCheck.
+        if gs.inCheck:
+            return ("0-1" if gs.whitetoMove else "1-0"), "checkmate"
+        return "1/2-1/2", "stalemate"
+    if gs.zobristKeyLog.count(gs.zobristKey) >= 2:
+        return "1/2-1/2", "repetition"
+    if chessEngine.halfmoveClock(gs.undoLog,gs.startHalfmoves) >= FIFTY_MOVES:
+        return "1/2-1/2", "fifty moves"
+    pieces = [piece for row in gs.board for piece in row if piece != "--" and piece[1] != 'K']
+    if len(pieces) == 0 or (len(pieces) == 1 and pieces[0][1] in 'NB'):
+        return "1/2-1/2", "insufficient material"
+    if len(gs.moveLog) >= MAX_PLIES:
+        return "1/2-1/2", "max plies"
+    return None
+
+
+# state of a worker process, set up once by initWorker.
+worker = {}
+
+def initWorker(specA,specB,backend):
+    worker['backend'] = BACKENDS[backend]
+    worker['engines'] = [(config,config.newSearcher()) for config in (EngineConfig(specA),EngineConfig(specB))]
+
+'''
+Plays one game -- task is (game number, opening number, FEN, whether engine A is white). Returns the task with the
+result, the reason and the move codes of the game appended.
+'''
+def playGame(task):
+    gameNumber, opening, fen, whiteIsA = task
+    gs = worker['backend'].GameState()
+    gs.loadFen(fen)
+    engineA, engineB = worker['engines']
+    sides = (engineA,engineB) if whiteIsA else (engineB,engineA) # white, black.
+    for _, searcher in sides:
+        searcher.tt.clear() # games don't see each other.
+    scores = [] # white's point of view, one per ply.
+    while True:
+        over = gameOver(gs)
+        if over is not None:
+            result, reason = over
+            break
+        config, searcher = sides[0 if gs.whitetoMove else 1]
+        found = config.search(searcher,gs)
+        if found.depth > 0: # a forced move comes back unsearched, without a score.
+            scores.append(found.score if gs.whitetoMove else -found.score)
+        gs.makeMove(found.bestMove)
+        recent = scores[-RESIGN_PLIES:]
+        if len(recent) == RESIGN_PLIES and (min(recent) >= RESIGN_SCORE or max(recent) <= -RESIGN_SCORE):
+            result, reason = ("1-0" if recent[0] > 0 else "0-1"), "adjudicated win"
+            break
+        recent = scores[-DRAW_PLIES:]
+        if len(gs.moveLog) >= DRAW_START and len(recent) == DRAW_PLIES and \
+                max(abs(score) for score in recent) <= DRAW_SCORE:
+            result, reason = "1/2-1/2", "adjudicated draw"
+            break
+    return gameNumber, opening, whiteIsA, result, reason, "".join("%04x" % code for code in gs.moveLog)
+
+'''
+Plays up to games games between the two engines and stops early once the SPRT accepts elo0 (A is not elo1 stronger)
+or elo1 (A is not elo0 or weaker). Returns (wins, draws, losses) of engine A.
+'''
+def runMatch(openings,specA,specB,games=1000,workers=1,backend='bitboard',logPath=None,elo0=0.0,elo1=10.0,
+             alpha=0.05,beta=0.05):
+    lower, upper = math.log(beta/(1 - alpha)), math.log((1 - beta)/alpha)
+    tasks = ((n,n//2 % len(openings),openings[n//2 % len(openings)],n % 2 == 0) for n in range(games))
+    wins = draws = losses = 0
+    log = open(logPath,'a') if logPath is not None else None
+    start = time.perf_counter()
+    if workers > 1:
+        pool = multiprocessing.Pool(workers,initializer=initWorker,initargs=(specA,specB,backend))
+        finished = pool.imap_unordered(playGame,tasks) # as they finish, so the SPRT sees every game at once.
+    else:
+        pool = None
+        initWorker(specA,specB,backend)
+        finished = map(playGame,tasks)
+    try:
+        for done, (gameNumber, opening, whiteIsA, result, reason, moves) in enumerate(finished,1):
+            if result == "1/2-1/2":
+                draws += 1
+            elif (result == "1-0") == whiteIsA:
+                wins += 1
+            else:
+                losses += 1
+            if log is not None:
+                log.write("%d\t%d\t%s\t%s\t%s\t%d\t%s\n" % (gameNumber,opening,"A" if whiteIsA else "B",result,reason,
+                                                            len(moves)//4,moves))
+                log.flush()
+            llr = sprtLLR(wins,draws,losses,elo0,elo1)
+            verdict = "H1 accepted" if llr >= upper else "H0 accepted" if llr <= lower else None
+            if done % 10 == 0 or verdict is not None or done == games:
+                elo, margin = eloEstimate(wins,draws,losses)
+                print("%5d games  +%d =%d -%d  elo %+.1f +/- %.1f  LLR %.2f (%.2f, %.2f)  %.1f games/s" %
+                      (done,wins,draws,losses,elo,margin,llr,lower,upper,done/(time.perf_counter() - start)))
+            if verdict is not None:
+                print("%s -- A is %s than B by elo bounds [%g, %g]" %
+                      (verdict,"stronger" if llr >= upper else "not stronger",elo0,elo1))
+                break
+    finally:
+        if pool is not None:
+            pool.terminate() # games still being played don't count any more.
+            pool.join()
+        if log is not None:
+            log.close()
+    return wins, draws, losses
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play two engine configurations against each other until an SPRT "
+                                                 "decides which is stronger.")
+    parser.add_argument('--engine-a',default="",help="engine under test, e.g. nodes=20000,eval=module.function")
+    parser.add_argument('--engine-b',default="",help="the baseline engine, same settings as --engine-a.")
+    parser.add_argument('--openings',default=OPENINGS_FILE,help="file of opening FENs, one per line.")
+    parser.add_argument('--shuffle',type=int,metavar='SEED',help="play the openings in a random order.")
+    parser.add_argument('--games',type=int,default=1000,help="most games to play -- an even number plays pairs.")
+    parser.add_argument('--workers',type=int,default=os.cpu_count() or 1)
+    parser.add_argument('--backend',choices=sorted(BACKENDS),default='bitboard')
+    parser.add_argument('--log',help="append a line per finished game to this file.")
+    parser.add_argument('--elo0',type=float,default=0.0)
+    parser.add_argument('--elo1',type=float,default=10.0)
+    parser.add_argument('--alpha',type=float,default=0.05)
+    parser.add_argument('--beta',type=float,default=0.05)
+    args = parser.parse_args(argv)
+    EngineConfig(args.engine_a), EngineConfig(args.engine_b) # bad settings fail here, not in every worker.
+    try:
+        openings = readOpenings(args.openings)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.shuffle is not None:
+        random.Random(args.shuffle).shuffle(openings)
+    runMatch(openings,args.engine_a,args.engine_b,args.games,args.workers,args.backend,args.log,args.elo0,args.elo1,
+             args.alpha,args.beta)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
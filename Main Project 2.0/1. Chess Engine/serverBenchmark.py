@@ -0,0 +1,83 @@
+"""
+Load test for gameServer -- opens N connections, each playing random games as fast as the server answers, and
+reports moves per second and the request latency percentiles.
+
+    python serverBenchmark.py [--connections 100] [--seconds 10] [--games-per-connection 1] [--port 7878]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from gameServer import DEFAULT_PORT
+
+
+class Connection():
+    '''
+    One client connection -- request() sends a line and waits for the answer, timing it.
+    '''
+    def __init__(self,reader,writer,latencies) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.latencies = latencies
+
+    async def request(self,**request):
+        start = time.perf_counter()
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        response = json.loads(await self.reader.readline())
+        self.latencies.append(time.perf_counter() - start)
+        return response
+
+'''
+Plays random moves in its games until the deadline, starting a new game whenever one ends. Returns the moves made.
+'''
+async def play(host,port,games,deadline,latencies,rng):
+    reader, writer = await asyncio.open_connection(host,port)
+    connection = Connection(reader,writer,latencies)
+    moves = 0
+    gameIds = [(await connection.request(op='new'))['game'] for _ in range(games)]
+    while time.perf_counter() < deadline:
+        for i, gameId in enumerate(gameIds):
+            validMoves = (await connection.request(op='moves',game=gameId))['moves']
+            result = await connection.request(op='move',game=gameId,move=rng.choice(validMoves))
+            moves += 1
+            if result['status'] != 'ongoing' or moves % 200 == 0: # over, or long enough -- a fresh game.
+                await connection.request(op='drop',game=gameId)
+                gameIds[i] = (await connection.request(op='new'))['game']
+    writer.close()
+    return moves
+
+def percentile(values,fraction):
+    return values[min(len(values) - 1,int(len(values)*fraction))]
+
+async def run(host,port,connections,seconds,games,seed):
+    latencies = []
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    deadline = start + seconds
+    moves = sum(await asyncio.gather(*[play(host,port,games,deadline,latencies,random.Random(rng.random()))
+                                       for _ in range(connections)]))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print("%d connections, %d moves in %.1fs -- %.0f moves/s, %.0f requests/s" %
+          (connections,moves,elapsed,moves/elapsed,len(latencies)/elapsed))
+    print("latency p50 %.2fms  p90 %.2fms  p99 %.2fms  max %.2fms" %
+          tuple(1000*x for x in (percentile(latencies,0.5),percentile(latencies,0.9),percentile(latencies,0.99),
+                                 latencies[-1])))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark a running gameServer.")
+    parser.add_argument('--host',default='127.0.0.1')
+    parser.add_argument('--port',type=int,default=DEFAULT_PORT)
+    parser.add_argument('--connections',type=int,default=100)
+    parser.add_argument('--seconds',type=float,default=10.0)
+    parser.add_argument('--games-per-connection',type=int,default=1)
+    parser.add_argument('--seed',type=int,default=1)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.host,args.port,args.connections,args.seconds,args.games_per_connection,args.seed))
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Spoken prompts. One speaker thread owns the text to speech engine for the whole game -- starting pyttsx3 costs
+hundreds of milliseconds, so it is done once instead of per sentence. Each piece of text is synthesized to a WAV file
+in __pycache__/speech once per voice and played from there with pygame.mixer, so a prompt heard before plays at once.
+Moves are spoken from cached fragments ("knight", "takes", "f3"), which the thread synthesizes while it has nothing
+to say.
+
+    speaker = createDefaultSpeaker() # None without pyttsx3.
+    speaker.say("Please say your move")
+    speaker.sayMove(move)
+    speaker.interrupt() # the user started talking.
+"""
+import hashlib
+import os
+import queue
+import threading
+
+import pygame as p
+
+try:
+    import pyttsx3
+except ImportError: # no spoken prompts without it.
+    pyttsx3 = None
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),"__pycache__","speech")
+PIECE_NAMES = {'p':"pawn",'N':"knight",'B':"bishop",'R':"rook",'Q':"queen",'K':"king"}
+SQUARE_NAMES = [f + r for r in "87654321" for f in "abcdefgh"]
+YOUR_MOVE = "Please say your move"
+SAY_AGAIN = "Sorry, please say your move again"
+# the fixed prompts and everything sayMove uses -- cached ahead of time.
+FRAGMENTS = [YOUR_MOVE,SAY_AGAIN] + list(PIECE_NAMES.values()) + SQUARE_NAMES + \
+            ["to","takes","promotes to","castles kingside","castles queenside"]
+
+
+class Speaker():
+    '''
+    say() and sayMove() queue text and return at once. interrupt() stops what is playing and drops what is queued.
+    voice is a pyttsx3 voice id, rate in words per minute -- both part of the cache key.
+    '''
+    def __init__(self,voice=None,rate=None,cacheDir=CACHE_DIR) -> None:
+        if pyttsx3 is None:
+            raise RuntimeError("spoken prompts need the pyttsx3 package")
+        self.voice = voice
+        self.rate = rate
+        self.cacheDir = cacheDir
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.generation = 0 # bumped by interrupt() -- queued text of an older generation isn't spoken.
+        self.sounds = {} # text -> pygame Sound, for the text played or prepared this game.
+        self.warmUp = FRAGMENTS[::-1] # popped from the end -- the prompts first.
+        self.engine = None
+        self.speaking = None # generation of the text the engine is speaking directly, without the mixer.
+        self.mixer = None # True / False once the mixer was tried.
+        self.thread = threading.Thread(target=self.run,daemon=True)
+        self.thread.start()
+
+    '''
+    Queues text -- a sentence, or a list of fragments played back to back.
+    '''
+    def say(self,text):
+        self.jobs.put((self.generation,[text] if isinstance(text,str) else list(text)))
+
+    def sayMove(self,move):
+        if move.isCastleMove:
+            fragments = ["castles kingside" if move.endCol > move.startCol else "castles queenside"]
+        else:
+            fragments = [PIECE_NAMES[move.pieceMoved[1]],"takes" if move.pieceCaptured != "--" else "to",
+                         move.getRankFile(move.endRow,move.endCol)]
+            if move.isPawnPromotion:
+                fragments += ["promotes to",PIECE_NAMES[move.promotionChoice]]
+        self.say(fragments)
+
+    def interrupt(self):
+        with self.lock:
+            self.generation += 1
+            if self.mixer:
+                p.mixer.stop()
+
+    def close(self):
+        self.interrupt()
+        self.jobs.put(None)
+        self.thread.join()
+
+    def run(self):
+        try:
+            self.engine = pyttsx3.init() # on this thread -- some drivers only work on the thread that made them.
+        except (OSError,RuntimeError) as e: # no speech driver installed.
+            print("spoken prompts off:",e)
+        if self.engine is not None:
+            if self.voice is not None:
+                self.engine.setProperty('voice',self.voice)
+            if self.rate is not None:
+                self.engine.setProperty('rate',self.rate)
+            self.voiceKey = "%s/%s" % (self.engine.getProperty('voice'),self.engine.getProperty('rate'))
+            self.engine.connect('started-word',self.onWord)
+        canCache = self.engine is not None and self.mixerReady()
+        while True:
+            try:
+                # with nothing to say, synthesize the next prompt or fragment so it plays instantly later.
+                job = self.jobs.get(timeout=0.05 if self.warmUp and canCache else None)
+            except queue.Empty:
+                self.sound(self.warmUp.pop())
+                continue
+            if job is None:
+                return
+            generation, fragments = job
+            for text in fragments:
+                if generation != self.generation:
+                    break # interrupted.
+                self.play(text,generation)
+
+    def play(self,text,generation):
+        sound = self.sound(text)
+        if sound is None: # no mixer or no engine -- speak directly, or just print.
+            if self.engine is not None:
+                self.speaking = generation
+                self.engine.say(text)
+                self.engine.runAndWait() # onWord stops it if interrupt() comes in meanwhile.
+                self.speaking = None
+            else:
+                print(text)
+            return
+        with self.lock:
+            if generation != self.generation:
+                return
+            channel = sound.play()
+        while channel is not None and channel.get_busy() and generation == self.generation:
+            p.time.wait(10)
+
+    '''
+    Called by the engine, on this thread, before each word it speaks directly -- stop() is only safe from in here, so
+    an interrupt takes effect at the next word (drivers that don't report words finish the sentence).
+    '''
+    def onWord(self,name,location,length):
+        if self.speaking is not None and self.speaking != self.generation:
+            self.engine.stop()
+
+    def mixerReady(self):
+        if self.mixer is None:
+            try:
+                if p.mixer.get_init() is None:
+                    p.mixer.init()
+                self.mixer = True
+            except p.error: # no audio device -- the engine speaks directly.
+                self.mixer = False
+        return self.mixer
+
+    '''
+    The synthesized text as a pygame Sound -- from memory, from the disk cache, or synthesized now and cached.
+    '''
+    def sound(self,text):
+        if text in self.sounds:
+            return self.sounds[text]
+        if self.engine is None or not self.mixerReady():
+            return None
+        path = self.cacheFile(text)
+        if not os.path.exists(path):
+            os.makedirs(self.cacheDir,exist_ok=True)
+            self.engine.save_to_file(text,path + ".tmp.wav")
+            self.engine.runAndWait()
+            try:
+                os.replace(path + ".tmp.wav",path) # another game may be reading it.
+            except OSError: # the driver wrote nothing.
+                return None
+        try:
+            self.sounds[text] = p.mixer.Sound(path)
+        except p.error: # a format the mixer can't read -- speak it directly.
+            return None
+        return self.sounds[text]
+
+    def cacheFile(self,text):
+        key = hashlib.sha1((self.voiceKey + "\n" + text).encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.cacheDir,key + ".wav")
+
+'''
+The speaker, or None if pyttsx3 isn't installed.
+'''
+def createDefaultSpeaker():
+    if pyttsx3 is None:
+        return None
+    return Speaker()
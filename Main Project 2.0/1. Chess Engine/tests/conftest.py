@@ -0,0 +1,7 @@
+"""
+The engine modules import each other by plain name -- put the engine folder on the path for the tests.
+"""
+import os
+import sys
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,73 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import batchEvaluation
+import bitboardEngine
+import chessEngine
+import evaluation
+
+FENS = [
+    chessEngine.STARTING_FEN,
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 b - - 0 1",
+]
+
+
+LINES = {'R':((1,0),(-1,0),(0,1),(0,-1)),'B':((1,1),(1,-1),(-1,1),(-1,-1))}
+LINES['Q'] = LINES['R'] + LINES['B']
+STEPS = {'N':((1,2),(2,1),(2,-1),(1,-2),(-1,-2),(-2,-1),(-2,1),(-1,2)),'K':LINES['Q']}
+
+
+def referenceMobility(board,color):
+    # the squares each non-pawn piece of color attacks that aren't taken by its own pieces, square by square.
+    total = 0
+    for r in range(8):
+        for c in range(8):
+            piece = board[r][c]
+            if piece[0] != color or piece[1] == 'p':
+                continue
+            targets = []
+            for dr, dc in STEPS.get(piece[1]) or LINES[piece[1]]:
+                tr, tc = r + dr, c + dc
+                while 0 <= tr < 8 and 0 <= tc < 8:
+                    targets.append((tr,tc))
+                    if piece[1] in STEPS or board[tr][tc] != "--":
+                        break
+                    tr, tc = tr + dr, tc + dc
+            total += sum(1 for tr, tc in targets if board[tr][tc][0] != color)
+    return total
+
+def testEvaluateBatchMatchesScoreBoard():
+    squares, whiteToMove = batchEvaluation.encodePositions(FENS)
+    scores = batchEvaluation.evaluateBatch(squares,whiteToMove)
+    gs = chessEngine.GameState()
+    for fen, score in zip(FENS,scores):
+        gs.loadFen(fen)
+        assert score == evaluation.scoreBoard(gs), fen
+
+def testEncodingTakesEveryKindOfPosition():
+    states = []
+    for fen in FENS:
+        gs = bitboardEngine.GameState()
+        gs.loadFen(fen)
+        states.append(gs)
+    fromFens = batchEvaluation.encodePositions(FENS)
+    for positions in (states,[gs.snapshot() for gs in states]):
+        squares, whiteToMove = batchEvaluation.encodePositions(positions)
+        assert (squares == fromFens[0]).all() and (whiteToMove == fromFens[1]).all()
+    assert batchEvaluation.piecePlanes(fromFens[0]).shape == (len(FENS),12,64)
+
+def testMobilityMatchesOnePositionAtATime():
+    squares, _ = batchEvaluation.encodePositions(FENS)
+    mobility = batchEvaluation.mobility(squares)
+    for fen, (white, black) in zip(FENS,mobility):
+        board = chessEngine.parseFen(fen)[0]
+        assert (white,black) == (referenceMobility(board,'w'),referenceMobility(board,'b')), fen
+
+def testEvaluateStreamChunks():
+    scores = np.concatenate(list(batchEvaluation.evaluateStream(iter(FENS*3),chunkSize=4)))
+    assert (scores == np.tile(batchEvaluation.evaluateBatch(*batchEvaluation.encodePositions(FENS)),3)).all()
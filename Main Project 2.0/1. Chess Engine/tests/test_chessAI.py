@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+import bitboardEngine
+import chessAI
+import chessEngine
+
+BACKENDS = [chessEngine,bitboardEngine]
+
+
+def loaded(backend,fen):
+    gs = backend.GameState()
+    gs.loadFen(fen)
+    return gs
+
+@pytest.mark.parametrize('backend',BACKENDS)
+@pytest.mark.parametrize('fen,bestMove,mateIn',[
+    ("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1","a1a8",1), # back rank.
+    ("rnbqkbnr/pppp1ppp/8/4p3/6P1/5P2/PPPPP2P/RNBQKBNR b KQkq - 0 2","d8h4",1), # fool's mate.
+    ("k7/8/2K5/8/8/8/8/7R w - - 0 1",None,2), # Kb6 Kb8 Rh8# or Kc7 Ka7 Ra1#.
+    ("r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4","h5f7",1), # scholar's mate.
+])
+def testFindsTheMate(backend,fen,bestMove,mateIn):
+    gs = loaded(backend,fen)
+    result = chessAI.Searcher(1).search(gs,maxDepth=5)
+    assert result.mateIn() == mateIn and result.score >= chessAI.MATE_BOUND
+    if bestMove is not None:
+        assert result.bestMove.getChessNotation() == bestMove
+    assert gs.getFen() == fen # every move of the search undone.
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testMateInTwoLine(backend):
+    gs = loaded(backend,"k7/8/2K5/8/8/8/8/7R w - - 0 1")
+    result = chessAI.Searcher(1).search(gs,maxDepth=5)
+    assert result.mateIn() == 2 and len(result.pv) == 3
+    for move in result.pv:
+        gs.makeMove(move)
+    assert gs.getValidMoves() == [] and gs.inCheck
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testTableHitGivesTheSameMove(backend):
+    gs = loaded(backend,"r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+    searcher = chessAI.Searcher(1)
+    first = searcher.search(gs,maxDepth=4)
+    again = searcher.search(gs,maxDepth=4) # the table has every node of the first search.
+    assert again.bestMove == first.bestMove and again.score == first.score
+    assert again.nodes < first.nodes
+    entry = searcher.tt.probe(gs.zobristKey)
+    assert entry is not None and entry[3] == first.bestMove.moveID
+
+@pytest.mark.parametrize('backend',BACKENDS)
+@pytest.mark.parametrize('nodeLimit',[1,300,2500,5000])
+def testNodeLimit(backend,nodeLimit):
+    gs = loaded(backend,chessEngine.STARTING_FEN)
+    result = chessAI.Searcher(1).search(gs,nodeLimit=nodeLimit)
+    assert result.nodes <= nodeLimit and result.nodes >= min(nodeLimit,1000)
+    assert result.bestMove is not None and gs.getFen() == chessEngine.STARTING_FEN
+
+def testStopEvent():
+    stopEvent = threading.Event()
+    stopEvent.set() # set before the search starts -- it stops within CHECK_INTERVAL nodes.
+    result = chessAI.Searcher(1,stopEvent=stopEvent).search(chessEngine.GameState())
+    assert result.nodes <= chessAI.CHECK_INTERVAL and result.bestMove is not None
+
+def testNoMoves():
+    gs = loaded(chessEngine,"7k/5Q2/6K1/8/8/8/8/8 b - - 0 1") # stalemate.
+    assert chessAI.Searcher(1).search(gs).bestMove is None
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+import chessEngine
+import engineWorker
+
+
+@pytest.fixture
+def worker():
+    worker = engineWorker.EngineWorker(1)
+    yield worker
+    worker.close()
+
+def waitForResults(worker,count=1,timeout=10.0):
+    # poll() never blocks -- call it the way the pygame loop does until count results are in.
+    results = []
+    deadline = time.perf_counter() + timeout
+    while len(results) < count and time.perf_counter() < deadline:
+        results += worker.poll()
+        time.sleep(0.005)
+    return results
+
+def testMovesAndSearch(worker):
+    gs = chessEngine.GameState()
+    worker.requestMoves(gs)
+    gs.makeMove(chessEngine.Move.fromSan("e4",gs)) # the job has its own copy.
+    (kind, moves), = waitForResults(worker)
+    assert kind == engineWorker.MOVES and len(moves) == 20
+    worker.requestSearch(gs,maxDepth=2)
+    (kind, result), = waitForResults(worker)
+    assert kind == engineWorker.BEST_MOVE and result.depth == 2
+    assert result.bestMove.moveID in chessEngine.moveLookup(gs.getValidMoves())
+
+def testFinishedResultOfACancelledGenerationIsDropped(worker):
+    worker.requestMoves(chessEngine.GameState())
+    deadline = time.perf_counter() + 10.0
+    while worker.results.empty() and time.perf_counter() < deadline:
+        time.sleep(0.005) # done, but not polled yet.
+    worker.cancel()
+    assert worker.poll() == []
+
+def testNewRequestSupersedesTheOldOne(worker):
+    gs = chessEngine.GameState()
+    worker.requestSearch(gs) # no limits -- runs until cancelled.
+    time.sleep(0.05)
+    worker.cancel()
+    gs.makeMove(chessEngine.Move.fromSan("e4",gs))
+    worker.requestSearch(gs,maxDepth=1)
+    worker.requestMoves(gs)
+    results = waitForResults(worker,2)
+    assert [kind for kind, _ in results] == [engineWorker.BEST_MOVE,engineWorker.MOVES]
+    assert results[0][1].depth == 1 # the search for the new position, not the stopped one.
+    assert results[0][1].bestMove.moveID in chessEngine.moveLookup(results[1][1])
+    time.sleep(0.05)
+    assert worker.poll() == []
+
+def testQueuedJobsAreDroppedToo(worker):
+    gs = chessEngine.GameState()
+    worker.requestPonder(gs) # keeps the thread busy, so the jobs after it wait in the queue.
+    worker.requestMoves(gs)
+    worker.requestSearch(gs,maxDepth=1)
+    time.sleep(0.05)
+    worker.cancel()
+    worker.requestMoves(gs)
+    results = waitForResults(worker,1)
+    time.sleep(0.05)
+    assert [kind for kind, _ in results + worker.poll()] == [engineWorker.MOVES]
@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+import bitboardEngine
+import chessEngine
+import evaluation
+
+BACKENDS = [chessEngine,bitboardEngine]
+# castling, en passant and promotions -- every kind of move delta -- come up within a few moves of these.
+FENS = [chessEngine.STARTING_FEN,
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3"]
+
+
+def pickMove(rng,moves):
+    special = [move for move in moves if move.isCastleMove or move.isEnpassantMove or move.isPawnPromotion]
+    return rng.choice(special if special and rng.random() < 0.5 else moves)
+
+@pytest.mark.parametrize('backend',BACKENDS)
+@pytest.mark.parametrize('fen',FENS)
+@pytest.mark.parametrize('seed',range(3))
+def testIncrementalScoresMatchRecomputation(backend,fen,seed):
+    rng = random.Random("%s %d" % (fen,seed))
+    gs = backend.GameState()
+    gs.loadFen(fen)
+    scores = [(gs.mgScore,gs.egScore,gs.phase)]
+    for _ in range(300): # a random walk -- forward mostly, back now and then.
+        moves = gs.getValidMoves()
+        if moves and (len(gs.moveLog) == 0 or rng.random() < 0.8):
+            gs.makeMove(pickMove(rng,moves))
+            scores.append((gs.mgScore,gs.egScore,gs.phase))
+        else:
+            gs.undoMove()
+            scores.pop()
+            assert (gs.mgScore,gs.egScore,gs.phase) == scores[-1]
+        assert (gs.mgScore,gs.egScore,gs.phase) == evaluation.computeScores(gs.board)
+        assert evaluation.evaluate(gs) == evaluation.scoreBoard(gs)
+
+def testScoresFromBothSides():
+    gs = chessEngine.GameState()
+    assert evaluation.computeScores(gs.board)[:2] == (0,0) # the start position is symmetric.
+    gs.loadFen("4k3/8/8/8/8/8/8/3QK3 w - - 0 1")
+    white = evaluation.evaluate(gs)
+    gs.loadFen("3qk3/8/8/8/8/8/8/4K3 b - - 0 1") # the same position, colors swapped.
+    assert white > 800 and abs(evaluation.evaluate(gs) - white) <= 1 # the blend rounds a negative score down.
+    gs.loadFen("4k3/8/8/8/8/8/8/3QK3 b - - 0 1")
+    assert evaluation.evaluate(gs) == -white
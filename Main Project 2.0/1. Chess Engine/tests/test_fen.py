@@ -0,0 +1,86 @@
+import pytest
+
+import bitboardEngine
+import chessEngine
+
+BACKENDS = [chessEngine,bitboardEngine]
+
+
+@pytest.mark.parametrize('backend',BACKENDS)
+@pytest.mark.parametrize('fen,expected,castles',[
+    ("4k3/8/8/8/8/8/8/4K3 w KQkq - 0 1","4k3/8/8/8/8/8/8/4K3 w - - 0 1",set()), # no rooks.
+    ("r3k2r/8/8/8/8/8/8/R4K1R w KQkq - 0 1","r3k2r/8/8/8/8/8/8/R4K1R w kq - 0 1",set()), # king off e1.
+    ("r3k3/7r/8/8/8/8/8/R3K1R1 w KQkq - 0 1","r3k3/7r/8/8/8/8/8/R3K1R1 w Qq - 0 1",{'e1c1'}), # rooks off h1, h8.
+    ("r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1","r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1",{'e8g8','e8c8'}),
+])
+def testCastleRightsNeedTheKingAndRook(backend,fen,expected,castles):
+    gs = backend.GameState()
+    gs.loadFen(fen)
+    assert gs.getFen() == expected
+    for move in gs.getValidMoves():
+        gs.makeMove(move) # a rookless castle used to fail here on the bitboard backend.
+        gs.undoMove()
+    assert {move.getChessNotation() for move in gs.getValidMoves() if move.isCastleMove} == castles
+    assert gs.getFen() == expected
+
+@pytest.mark.parametrize('backend',BACKENDS)
+@pytest.mark.parametrize('fen',[
+    "4k3/8/8/8/8/8/8/4K2P w - - 0 1", # a white pawn on the first rank.
+    "P3k3/8/8/8/8/8/8/4K3 b - - 0 1", # a pawn that should have promoted.
+    "4k2p/8/8/8/8/8/8/4K3 w - - 0 1",
+    "4k3/8/8/8/8/8/8/4Kp2 w - - 0 1",
+    "4k3/8/8/8/8/8/8/8 w - - 0 1", # no white king.
+    "4k3/8/8/8/8/8/8/4K3 w KX - 0 1",
+    "4k3/8/8/8/8/8/8/4K3 b - e3 0 1", # no pawn in front of the en passant square.
+])
+def testBadFensAreRejected(backend,fen):
+    gs = backend.GameState()
+    start = gs.getFen()
+    with pytest.raises(ValueError):
+        gs.loadFen(fen)
+    assert gs.getFen() == start
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testSnapshotsAreCheckedLikeFens(backend):
+    gs = backend.GameState()
+    start = gs.snapshot()
+    board, whitetoMove, castleRights, enpassantPossible = chessEngine.parseFen("4k3/8/8/8/8/8/8/4K3 w - - 0 1")
+    castleRights.setBits(15)
+    gs.restore(chessEngine.encodeSnapshot(board,whitetoMove,castleRights,enpassantPossible))
+    assert gs.getFen() == "4k3/8/8/8/8/8/8/4K3 w - - 0 1"
+    board[7][0] = 'wp'
+    with pytest.raises(ValueError):
+        gs.restore(chessEngine.encodeSnapshot(board,whitetoMove,castleRights,enpassantPossible))
+    board[7][0] = "--"
+    with pytest.raises(ValueError): # an en passant square without the pawn that advanced.
+        gs.restore(chessEngine.encodeSnapshot(board,whitetoMove,castleRights,(2,3)))
+    gs.restore(start)
+    assert gs.getFen() == chessEngine.STARTING_FEN
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testMoveCountersSurviveLoadAndMoves(backend):
+    gs = backend.GameState()
+    gs.loadFen("4k3/8/8/8/8/8/4P3/R3K3 b Q - 7 10")
+    assert gs.getFen() == "4k3/8/8/8/8/8/4P3/R3K3 b Q - 7 10"
+    gs.makeMove(chessEngine.Move.fromSan("Kd7",gs))
+    assert gs.getFen() == "8/3k4/8/8/8/8/4P3/R3K3 w Q - 8 11"
+    gs.makeMove(chessEngine.Move.fromSan("Ra2",gs))
+    assert gs.getFen() == "8/3k4/8/8/8/8/R3P3/4K3 b - - 9 11"
+    gs.makeMove(chessEngine.Move.fromSan("Kd6",gs))
+    gs.makeMove(chessEngine.Move.fromSan("e4",gs)) # a pawn move starts the clock again.
+    assert gs.getFen() == "8/8/3k4/8/4P3/8/R7/4K3 b - - 0 12"
+    for _ in range(4):
+        gs.undoMove()
+    assert gs.getFen() == "4k3/8/8/8/8/8/4P3/R3K3 b Q - 7 10"
+    gs.loadFen("4k3/8/8/8/8/8/8/4K3 w - -") # counters left out.
+    assert gs.getFen() == "4k3/8/8/8/8/8/8/4K3 w - - 0 1"
+    gs.restore(gs.snapshot()) # a snapshot doesn't keep them.
+    assert gs.getFen().endswith(" 0 1")
+
+@pytest.mark.parametrize('backend',BACKENDS)
+@pytest.mark.parametrize('counters',["x 1","0 y","-1 1","0 0"])
+def testBadMoveCountersAreRejected(backend,counters):
+    gs = backend.GameState()
+    with pytest.raises(ValueError,match="move counters"):
+        gs.loadFen("4k3/8/8/8/8/8/8/4K3 w - - " + counters)
+    assert gs.getFen() == chessEngine.STARTING_FEN
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import gameServer
+
+BAD_FENS = [
+    "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e9 0 1", # no such square.
+    "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e 0 1",
+    "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e6 0 1", # the wrong rank for black to move.
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR b KQkq e3 0 1", # no pawn in front of it.
+    "8/8/8/8/8/8/8/4K3 w - - 0 1", # no black king.
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq",
+    5,
+]
+
+
+def exchange(server,requests):
+    # the responses to the request lines, sent over a real connection one after the other.
+    async def run():
+        listener = await asyncio.start_server(server.handleConnection,'127.0.0.1',0)
+        reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+        responses = []
+        for request in requests:
+            writer.write((request if isinstance(request,str) else json.dumps(request)).encode() + b"\n")
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+        writer.close()
+        await writer.wait_closed()
+        await asyncio.sleep(0.01) # the server sees the end of the stream and closes its side.
+        listener.close()
+        await listener.wait_closed()
+        return responses
+    return asyncio.run(run())
+
+def testPlayAGame():
+    responses = exchange(gameServer.GameServer(),[
+        {"op":"new","id":1},{"op":"move","game":1,"move":"f2f3"},{"op":"move","game":1,"move":"e7e5"},
+        {"op":"move","game":1,"move":"g2g4"},{"op":"moves","game":1},{"op":"move","game":1,"move":"d8h4"},
+        {"op":"fen","game":1},{"op":"undo","game":1},{"op":"move","game":1,"move":"e2e4"},{"op":"stats"}])
+    assert responses[0] == {"ok":True,"game":1,"id":1}
+    assert [r["status"] for r in responses[1:4]] == ["ongoing"]*3
+    assert "d8h4" in responses[4]["moves"] and len(responses[4]["moves"]) == 30
+    assert responses[5] == {"ok":True,"status":"checkmate"}
+    assert responses[6]["fen"] == "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3"
+    assert responses[7] == {"ok":True}
+    assert responses[8] == {"ok":False,"error":"illegal move e2e4"}
+    assert responses[9] == {"ok":True,"games":1,"resident":1,"evicted":0}
+
+def testBadRequestsGetAnErrorAndKeepTheConnection():
+    requests = [{"op":"new","fen":fen} for fen in BAD_FENS] + ["not json",{"game":1},{"op":"moves","game":[1]},
+                                                                {"op":"new"}]
+    responses = exchange(gameServer.GameServer('bitboard'),requests)
+    for response in responses[:-1]:
+        assert response["ok"] is False and response["error"].startswith("bad request")
+    assert responses[-1] == {"ok":True,"game":1}
+
+def testEvictedGameIsReplayed():
+    server = gameServer.GameServer()
+    fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+    responses = exchange(server,[{"op":"new","fen":fen},{"op":"move","game":1,"move":"d7d5"}])
+    assert responses[1]["ok"]
+    server.evict(float('inf'))
+    assert server.resident == 0 and server.games[1].gs is None
+    responses = exchange(server,[{"op":"fen","game":1},{"op":"stats"}])
+    assert responses[0]["fen"] == "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2"
+    assert responses[1]["resident"] == 1
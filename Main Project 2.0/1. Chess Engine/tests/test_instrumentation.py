@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+import bitboardEngine
+import chessAI
+import chessEngine
+import instrumentation
+
+
+def patchedObjects():
+    # everything a Profile swaps out, as it is right now.
+    objects = {(cls.__name__,cls.__module__,name):cls.__dict__[name] for cls, names in instrumentation.TARGETS.items()
+               for name in names}
+    objects.update({('moveFunctions',piece):function
+                    for piece, function in chessEngine.GameState.moveFunctions.items()})
+    objects['Move.__init__'] = chessEngine.Move.__dict__['__init__']
+    objects['Move.fromLog'] = chessEngine.Move.__dict__['fromLog'].__func__
+    return objects
+
+def assertRestored(originals):
+    current = patchedObjects()
+    assert current.keys() == originals.keys()
+    assert [key for key in originals if current[key] is not originals[key]] == []
+
+def testEverythingIsPutBack():
+    originals = patchedObjects()
+    with instrumentation.Profile() as profile:
+        assert patchedObjects()['Move.__init__'] is not originals['Move.__init__']
+        for backend in (chessEngine,bitboardEngine):
+            chessAI.Searcher(1).search(backend.GameState(),maxDepth=2)
+    assertRestored(originals)
+    assert instrumentation.Profile.active is None
+    functions = profile.toDict()['functions']
+    for name in ('makeMove','undoMove','getValidMoves','generateMoves','getPieceMoves','getPawnMoves'):
+        assert functions[name]['calls'] > 0, name
+    assert profile.moveAllocations > 0 and profile.seconds > 0
+
+def testPutBackAfterAnError():
+    originals = patchedObjects()
+    with pytest.raises(ZeroDivisionError):
+        with instrumentation.Profile():
+            chessEngine.GameState().getValidMoves()
+            1/0
+    assertRestored(originals)
+    with instrumentation.Profile(): # can be entered again.
+        pass
+    assertRestored(originals)
+
+def testOnlyOneProfileAtATime():
+    originals = patchedObjects()
+    with instrumentation.Profile() as profile:
+        with pytest.raises(RuntimeError):
+            with instrumentation.Profile():
+                pass
+        assert instrumentation.Profile.active is profile
+        chessEngine.GameState().getValidMoves()
+    assertRestored(originals)
+    assert profile.calls['getValidMoves'] == 1
+
+def testExports(tmp_path):
+    gs = chessEngine.GameState()
+    with instrumentation.Profile() as profile:
+        for move in gs.getValidMoves():
+            gs.makeMove(move)
+            gs.getValidMoves()
+            gs.undoMove()
+    assert profile.calls['makeMove'] == profile.calls['undoMove'] == 20
+    assert profile.calls['getValidMoves'] == 21
+    profile.writeJson(str(tmp_path / "profile.json"))
+    data = json.loads((tmp_path / "profile.json").read_text())
+    assert data['functions']['makeMove']['calls'] == 20
+    profile.writeCollapsed(str(tmp_path / "profile.folded"))
+    lines = (tmp_path / "profile.folded").read_text().splitlines()
+    assert any(line.startswith("getValidMoves;generateMoves") for line in lines)
+    assert all(int(line.rsplit(' ',1)[1]) >= 0 for line in lines)
+    assert "makeMove" in profile.report()
@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+import bitboardEngine
+import chessEngine
+from chessEngine import CAPTURES, KILLERS, QUIETS, TT_MOVE
+
+BACKENDS = [chessEngine,bitboardEngine]
+FENS = [chessEngine.STARTING_FEN,
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"]
+CHECKS = ["4k3/8/8/8/8/5n2/8/r3K3 w - - 0 1", # double check -- only the king moves.
+          "4k3/4r3/8/8/8/8/4B3/4K2q w - - 0 1", # the bishop that could block is pinned.
+          "8/8/8/2k5/3Pp3/8/8/4K3 b - d3 0 1", # taking the checking pawn en passant.
+          "1r2k3/P7/8/8/8/8/8/1q2K3 w - - 0 1", # promoting doesn't help.
+          "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3"] # mate.
+
+
+def walkPositions(count=30):
+    # FENs met on random walks from FENS, checks included -- the same positions for every test.
+    rng = random.Random(1)
+    positions = []
+    gs = chessEngine.GameState()
+    for fen in FENS:
+        gs.loadFen(fen)
+        for _ in range(count):
+            moves = gs.getValidMoves()
+            if not moves:
+                break
+            positions.append(gs.getFen())
+            gs.makeMove(rng.choice(moves))
+    return positions + CHECKS
+
+POSITIONS = walkPositions()
+
+def isCaptureStage(move):
+    return move.pieceCaptured != "--" or move.isEnpassantMove or move.isPawnPromotion
+
+def loaded(backend,fen):
+    gs = backend.GameState()
+    gs.loadFen(fen)
+    return gs
+
+def testWalksGoThroughChecks():
+    assert sum(loaded(chessEngine,fen).checkForPinsAndChecks()[0] for fen in POSITIONS) >= 5
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testStagesHandOutEveryValidMoveOnce(backend):
+    for fen in POSITIONS:
+        gs = loaded(backend,fen)
+        validCodes = sorted(gs.getValidMoveCodes())
+        inCheck = gs.inCheck
+        moves = list(gs.iterMoves())
+        assert gs.inCheck == inCheck
+        assert sorted(move.moveID for move in moves) == validCodes, fen
+        stages = [isCaptureStage(move) for move in moves]
+        assert stages == sorted(stages,reverse=True), fen # the captures come first.
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testTableMoveAndKillersGoFirst(backend):
+    rng = random.Random(2)
+    for fen in POSITIONS:
+        gs = loaded(backend,fen)
+        valid = gs.getValidMoves()
+        if not valid:
+            continue
+        quiets = [move.moveID for move in valid if not isCaptureStage(move)]
+        ttMove = rng.choice(valid).moveID
+        killers = [code for code in rng.sample(quiets,min(2,len(quiets))) if code != ttMove]
+        stranger = 0o7777 ^ killers[0] if killers else 1 # a move code of some other position.
+        codes = [move.moveID for move in gs.iterMoves(ttMove,killers + [stranger])]
+        assert sorted(codes) == sorted(move.moveID for move in valid), fen
+        assert codes[0] == ttMove
+        captureCount = sum(isCaptureStage(move) for move in valid if move.moveID != ttMove)
+        assert codes[1 + captureCount:1 + captureCount + len(killers)] == killers, fen
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testLastStage(backend):
+    for fen in POSITIONS:
+        gs = loaded(backend,fen)
+        valid = gs.getValidMoves()
+        validCodes = sorted(move.moveID for move in valid)
+        captures = sorted(move.moveID for move in valid if isCaptureStage(move))
+        if gs.inCheck: # every evasion, whatever the last stage.
+            for lastStage in (TT_MOVE,CAPTURES,KILLERS):
+                assert sorted(move.moveID for move in gs.iterMoves(lastStage=lastStage)) == validCodes, fen
+        else:
+            assert list(gs.iterMoves(lastStage=TT_MOVE)) == []
+            assert sorted(move.moveID for move in gs.iterMoves(lastStage=CAPTURES)) == captures, fen
+            quiets = [move.moveID for move in valid if not isCaptureStage(move)]
+            if quiets: # a quiet table move only comes out once quiet moves are asked for.
+                assert sorted(move.moveID for move in gs.iterMoves(quiets[0],lastStage=CAPTURES)) == captures
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testSearchingBetweenStagesChangesNothing(backend):
+    # the search makes and undoes moves while a node's generator is half way through -- as it would here.
+    for fen in POSITIONS:
+        gs = loaded(backend,fen)
+        expected = [move.moveID for move in gs.iterMoves(killers=(0,))]
+        codes = []
+        for move in gs.iterMoves(killers=(0,)):
+            codes.append(move.moveID)
+            gs.makeMove(move)
+            for reply in gs.iterMoves(lastStage=CAPTURES):
+                gs.makeMove(reply)
+                gs.getValidMoves()
+                gs.undoMove()
+            gs.undoMove()
+        assert codes == expected, fen
+        assert gs.getFen() == fen
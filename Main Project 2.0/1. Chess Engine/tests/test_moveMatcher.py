@@ -0,0 +1,84 @@
+import pytest
+
+import chessEngine
+import moveMatcher
+
+MIN_CONFIDENCE = 0.35 # what chessMain asks of a spoken move.
+
+
+def matcherFor(fen=chessEngine.STARTING_FEN):
+    gs = chessEngine.GameState()
+    gs.loadFen(fen)
+    matcher = moveMatcher.MoveMatcher()
+    matcher.update(gs.getValidMoves())
+    return matcher
+
+def spoken(matcher,*hypotheses):
+    move, confidence = matcher.match([(text,0.9) for text in hypotheses])
+    return (move.getChessNotation() if move is not None else None), confidence
+
+@pytest.mark.parametrize('text,expected',[
+    ("e2 to e4","e2e4"),
+    ("e4","e2e4"),
+    ("knight f3","g1f3"),
+    ("night f3","g1f3"),
+    ("see four","c2c4"),
+    ("move the pawn to d4","d2d4"),
+    ("g1 f3","g1f3"),
+])
+def testStartPosition(text,expected):
+    move, confidence = spoken(matcherFor(),text)
+    assert move == expected and confidence >= MIN_CONFIDENCE
+
+def testToHeardAsTwo():
+    # "e to e4" -- the "to" after a file letter is read as a misheard "two" as well.
+    assert spoken(matcherFor(),"e to e4")[0] == "e2e4"
+
+def testCaptures():
+    matcher = matcherFor("rnbqkbnr/ppp1pppp/8/3p4/4P3/2N5/PPPP1PPP/R1BQKBNR w KQkq - 0 2")
+    assert spoken(matcher,"e takes d5")[0] == "e4d5"
+    assert spoken(matcher,"knight takes d5")[0] == "c3d5"
+
+def testCastling():
+    matcher = matcherFor("r3k2r/pppppppp/8/8/8/8/PPPPPPPP/R3K2R w KQkq - 0 1")
+    assert spoken(matcher,"castle kingside")[0] == "e1g1"
+    assert spoken(matcher,"castles long")[0] == "e1c1"
+    assert spoken(matcher,"king side castle")[0] == "e1g1"
+    assert spoken(matcher,"o-o-o")[0] == "e1c1"
+
+def testPromotion():
+    matcher = matcherFor("4k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+    assert spoken(matcher,"a7 a8 queen")[0] == "a7a8q"
+    move, _ = matcher.match([("a7 a8 knight",0.9)])
+    assert move.isPawnPromotion and move.promotionChoice == 'N'
+    move, _ = matcher.match([("a8",0.9)])
+    assert move.promotionChoice == 'Q' # a bare square promotes to a queen.
+
+def testAmbiguousMoveHasLowConfidence():
+    # both knights reach d2, only one of them a3.
+    matcher = matcherFor("4k3/8/8/8/8/8/8/1N2KN2 w - - 0 1")
+    clear = spoken(matcher,"knight a3")[1]
+    assert spoken(matcher,"knight d2")[1] < clear*0.6
+
+def testNoValidMoveFits():
+    matcher = matcherFor()
+    assert spoken(matcher,"e2 to e5")[1] < MIN_CONFIDENCE # only the start square fits.
+    assert spoken(matcher,"hello there") == (None,0.0)
+
+def testBestHypothesisWins():
+    matcher = matcherFor()
+    assert spoken(matcher,"ninety nine","knight f3")[0] == "g1f3"
+
+def testUpdateSwitchesPosition():
+    gs = chessEngine.GameState()
+    matcher = moveMatcher.MoveMatcher()
+    matcher.update(gs.getValidMoves())
+    assert spoken(matcher,"e4")[0] == "e2e4"
+    gs.makeMove(chessEngine.Move.fromSan("e4",gs))
+    matcher.update(gs.getValidMoves())
+    assert spoken(matcher,"e5")[0] == "e7e5"
+
+def testTokenize():
+    tokens, quality = moveMatcher.tokenize("the knight takes f3")
+    assert tokens == [('piece','N'),('capture',True),('file','f'),('rank','3')] and quality == 1.0
+    assert moveMatcher.tokenize("knigth f3")[1] == moveMatcher.SUBSTITUTION_PENALTY
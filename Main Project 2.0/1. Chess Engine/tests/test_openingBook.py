@@ -0,0 +1,89 @@
+import pytest
+
+import bitboardEngine
+import chessEngine
+import openingBook
+
+BACKENDS = (chessEngine,bitboardEngine)
+# the keys of the Polyglot book format specification.
+REFERENCE_KEYS = [
+    ([],0x463b96181691fc9c),
+    (["e4"],0x823c9b50fd114196),
+    (["e4","d5"],0x0756b94461c50fb0),
+    (["e4","d5","e5"],0x662fafb965db29d4),
+    (["e4","d5","e5","f5"],0x22a48b5a8e47ff78),
+    (["e4","d5","e5","f5","Ke2"],0x652a607ca3f242c1),
+    (["e4","d5","e5","f5","Ke2","Kf7"],0x00fdd303c946bdd9),
+    (["a4","b5","h4","b4","c4"],0x3c8123ea7b067637),
+    (["a4","b5","h4","b4","c4","bxc3","Ra3"],0x5c3f9b829b279560),
+]
+GAMES = '''[Event "One"]
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 3. O-O 1-0
+
+[Event "Two"]
+[Result "1/2-1/2"]
+
+1. e4 c5 2. Nf3 1/2-1/2
+
+[Event "Three"]
+[Result "0-1"]
+
+1. d4 d5 0-1
+'''
+
+
+def play(backend,sans):
+    gs = backend.GameState()
+    for san in sans:
+        gs.makeMove(chessEngine.Move.fromSan(san,gs))
+    return gs
+
+@pytest.mark.parametrize('backend',BACKENDS)
+@pytest.mark.parametrize('sans,key',REFERENCE_KEYS)
+def testReferenceKeys(backend,sans,key):
+    assert openingBook.positionKey(play(backend,sans)) == key
+
+def testFenGivesTheSameKey():
+    gs = play(chessEngine,["e4","d5","e5","f5"]) # e5xf6 is possible, so the en passant file counts.
+    fenGs = chessEngine.GameState()
+    fenGs.loadFen(gs.getFen())
+    assert openingBook.positionKey(fenGs) == 0x22a48b5a8e47ff78
+
+@pytest.mark.parametrize('fen',["r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1","r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1",
+                                "8/1P4k1/8/8/8/8/8/4K3 w - - 0 1"])
+def testMoveEncodingRoundTrip(fen):
+    gs = bitboardEngine.GameState()
+    gs.loadFen(fen)
+    for move in gs.getValidMoves():
+        assert openingBook.decodeMove(openingBook.encodeMove(move),gs.board) == move.moveID
+
+def testCastlingIsKingTakesRook():
+    gs = chessEngine.GameState()
+    gs.loadFen("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+    moves = {move.getChessNotation():move for move in gs.getValidMoves()}
+    assert openingBook.encodeMove(moves['e1g1']) == 0x0107 # e1 -> h1.
+    assert openingBook.encodeMove(moves['e1c1']) == 0x0100 # e1 -> a1.
+
+def testBuildAndReadBook(tmp_path):
+    pgnPath = tmp_path / "games.pgn"
+    pgnPath.write_text(GAMES)
+    bookPath = str(tmp_path / "book.bin")
+    # a move gets 2 for a win and 1 for a draw -- the moves of the lost games (1... e5, 1. d4) are left out.
+    assert openingBook.buildBook([str(pgnPath)],bookPath,maxPlies=3) == (3,5)
+    with openingBook.OpeningBook(bookPath) as book:
+        assert book.count == 5
+        gs = chessEngine.GameState()
+        assert {move.getSan(gs):weight for move, weight in book.getMoves(gs)} == {"e4":3}
+        gs = play(bitboardEngine,["e4"])
+        assert {move.getSan(gs):weight for move, weight in book.getMoves(gs)} == {"c5":1}
+        gs = play(chessEngine,["e4","e5"])
+        assert book.pickMove(gs).getSan(gs) == "Nf3"
+        assert book.getMoves(play(chessEngine,["a4"])) == []
+
+def testNotABook(tmp_path):
+    path = tmp_path / "broken.bin"
+    path.write_bytes(b"\0"*17)
+    with pytest.raises(ValueError):
+        openingBook.OpeningBook(str(path))
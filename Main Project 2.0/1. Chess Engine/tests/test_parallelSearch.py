@@ -0,0 +1,26 @@
+import pytest
+
+import chessEngine
+import parallelSearch
+
+
+@pytest.fixture(scope='module')
+def searcher():
+    searcher = parallelSearch.ParallelSearcher(workers=3,ttSizeMB=1)
+    yield searcher
+    searcher.close()
+
+@pytest.mark.parametrize('nodeLimit',[2,900,6000])
+def testNodeLimitIsSharedOut(searcher,nodeLimit):
+    gs = chessEngine.GameState()
+    searcher.tt.clear()
+    result = searcher.search(gs,nodeLimit=nodeLimit)
+    assert result.nodes <= nodeLimit and result.bestMove is not None
+    assert gs.getFen() == chessEngine.STARTING_FEN
+
+def testFindsTheMate(searcher):
+    gs = chessEngine.GameState()
+    gs.loadFen("k7/8/2K5/8/8/8/8/7R w - - 0 1")
+    result = searcher.search(gs,maxDepth=5)
+    # the pv may stop short at a table hit another process stored -- the first move is the one that counts.
+    assert result.mateIn() == 2 and result.bestMove.getChessNotation() in ("c6b6","c6c7") # Kb6 Kb8 Rh8#, Kc7 Ka7 Ra1#.
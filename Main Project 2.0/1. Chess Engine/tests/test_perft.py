@@ -0,0 +1,26 @@
+import pytest
+
+import perft
+
+MAX_NODES = 10000 # depth 2-3 of most suite positions -- perft.py --suite runs the deep counts.
+
+
+def shallowSuite():
+    cases = []
+    for fen, counts in perft.loadSuite():
+        depths = [depth for depth, nodes in counts.items() if depth <= 3 and nodes <= MAX_NODES]
+        if depths:
+            cases.append((fen,max(depths),counts[max(depths)]))
+    return cases
+
+@pytest.mark.parametrize('backend',sorted(perft.BACKENDS))
+@pytest.mark.parametrize('fen,depth,nodes',shallowSuite())
+def testPerft(backend,fen,depth,nodes):
+    gs = perft.newGameState(fen,backend)
+    assert perft.perft(gs,depth) == nodes
+    assert gs.getFen() == perft.newGameState(fen,backend).getFen() # every move undone.
+
+def testDivideAddsUpToPerft():
+    fen = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+    counts = [perft.divide(perft.newGameState(fen,backend),2) for backend in sorted(perft.BACKENDS)]
+    assert counts[0] == counts[1] and len(counts[0]) == 48 and sum(counts[0].values()) == 2039
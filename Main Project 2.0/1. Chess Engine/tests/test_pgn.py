@@ -0,0 +1,81 @@
+import pytest
+
+import pgn
+
+OPERA_GAME = '''[Event "Paris"]
+[Site "Paris FRA"]
+[White "Paul Morphy"]
+[Black "Duke Karl / Count Isouard"]
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 d6 3. d4 Bg4 {This is a weak move already.--Fischer} 4. dxe5 Bxf3 5. Qxf3 dxe5 6. Bc4 Nf6 7. Qb3 Qe7
+8. Nc3 c6 9. Bg5 {Black is in what's like a zugzwang position here.} b5 $6 10. Nxb5! cxb5 11. Bxb5+ Nbd7 (11... Kd8
+12. O-O-O (12. Qa4) 12... Nbd7) 12. O-O-O Rd8 13. Rxd7 Rxd7 14. Rd1 Qe6 15. Bxd7+ Nxd7 16. Qb8+ Nxb8 17. Rd8# 1-0
+'''
+FEN_GAME = '''[Event "Endgame"]
+[FEN "4k3/8/8/8/8/8/4P3/4K3 w - - 3 20"]
+[Result "*"]
+
+1. e4 Kd7 2. e5 ; a line comment
+Kc6 *
+'''
+BAD_GAMES = '''[Event "Bad FEN"]
+[FEN "4k3/8/8/8/8/8/8/8 w - - 0 1"]
+
+1. Kd2 *
+
+[Event "Illegal"]
+
+1. e4 e5 2. Ke3 *
+'''
+
+
+def writeGames(path,text,bom=False):
+    path.write_bytes((b"\xef\xbb\xbf" if bom else b"") + text.encode())
+    return str(path)
+
+def testParseGame():
+    game = pgn.parseGame(OPERA_GAME,12)
+    assert game.tags['White'] == "Paul Morphy" and game.result == "1-0" and game.offset == 12
+    assert len(game.moves) == 33 # comments, the nested variations and NAGs are gone.
+    assert game.moves[:3] == ["e4","e5","Nf3"] and game.moves[18] == "Nxb5!" and game.moves[-1] == "Rd8#"
+
+def testTagEscapes():
+    game = pgn.parseGame('[Event "a \\"quoted\\" name \\\\ here"]\n\n1. e4 *\n')
+    assert game.tags['Event'] == 'a "quoted" name \\ here'
+
+@pytest.mark.parametrize('bom',[False,True])
+def testIterGames(tmp_path,bom):
+    path = writeGames(tmp_path / "games.pgn",OPERA_GAME + "\n" + FEN_GAME,bom)
+    games = list(pgn.iterGames(path))
+    assert [game.tags['Event'] for game in games] == ["Paris","Endgame"]
+    assert games[1].moves == ["e4","Kd7","e5","Kc6"] and games[1].result == "*"
+
+def testRangesSeeEachGameOnce(tmp_path):
+    path = writeGames(tmp_path / "games.pgn",(OPERA_GAME + "\n" + FEN_GAME + "\n")*20)
+    size = (tmp_path / "games.pgn").stat().st_size
+    offsets = []
+    for start in range(0,size,97): # ranges that start and end inside games.
+        offsets += [game.offset for game in pgn.iterGames(path,start,min(size,start + 97))]
+    assert offsets == [game.offset for game in pgn.iterGames(path)] and len(offsets) == 40
+
+def testReplayGame():
+    gs, error = pgn.replayGame(pgn.parseGame(OPERA_GAME),'bitboard')
+    assert error is None and gs.getFen() == "1n1Rkb1r/p4ppp/4q3/4p1B1/4P3/8/PPP2PPP/2K5 b k - 1 17"
+    gs, error = pgn.replayGame(pgn.parseGame(FEN_GAME),'list')
+    assert error is None and gs.getFen() == "8/8/2k5/4P3/8/8/8/4K3 w - - 1 22"
+
+def testReplayErrors(tmp_path):
+    games = list(pgn.iterGames(writeGames(tmp_path / "bad.pgn",BAD_GAMES)))
+    assert pgn.replayGame(games[0])[1].startswith("bad FEN tag")
+    gs, error = pgn.replayGame(games[1])
+    assert error == "ply 3: illegal move Ke3" and len(gs.moveLog) == 2
+
+def testReplayFileWritesTheIndex(tmp_path,capsys):
+    path = writeGames(tmp_path / "games.pgn",OPERA_GAME + "\n" + FEN_GAME + "\n" + BAD_GAMES)
+    index = tmp_path / "index.tsv"
+    assert pgn.replayFile(path,1,'bitboard',str(index)) == 2
+    lines = [line.split('\t') for line in index.read_text().splitlines()]
+    assert [line[1] for line in lines] == ["33","4","0","2"]
+    assert lines[0][2] == "1-0" and lines[0][3] == "1n1Rkb1r/p4ppp/4q3/4p1B1/4P3/8/PPP2PPP/2K5 b k - 1 17"
+    assert "4 games, 39 moves, 2 bad" in capsys.readouterr().out
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+import bitboardEngine
+import chessEngine
+
+BACKENDS = [chessEngine,bitboardEngine]
+OPERA_GAME = ("e4 e5 Nf3 d6 d4 Bg4 dxe5 Bxf3 Qxf3 dxe5 Bc4 Nf6 Qb3 Qe7 Nc3 c6 Bg5 b5 Nxb5 cxb5 Bxb5+ Nbd7 O-O-O Rd8 "
+              "Rxd7 Rxd7 Rd1 Qe6 Bxd7+ Nxd7 Qb8+ Nxb8 Rd8#").split()
+
+
+def moveFor(gs,notation):
+    return {move.getChessNotation():move for move in gs.getValidMoves()}[notation]
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testGameReplaysAndWritesBackTheSameSan(backend):
+    gs = backend.GameState()
+    for san in OPERA_GAME:
+        move = chessEngine.Move.fromSan(san,gs)
+        assert move.getSan(gs) == san
+        gs.makeMove(move)
+    assert gs.getFen() == "1n1Rkb1r/p4ppp/4q3/4p1B1/4P3/8/PPP2PPP/2K5 b k - 1 17"
+
+# position, move, SAN -- as python-chess writes them.
+@pytest.mark.parametrize('fen,notation,san',[
+    ("4k3/8/8/8/8/8/8/1N2KN2 w - - 0 1","b1d2","Nbd2"),
+    ("4k3/8/8/R7/8/8/8/R3K3 w - - 0 1","a1a3","R1a3"),
+    ("4k3/8/8/8/8/Q7/8/Q1Q1K3 w - - 0 1","a1b2","Qa1b2"),
+    ("1n2k3/P7/8/8/8/8/8/4K3 w - - 0 1","a7b8n","axb8=N"),
+    ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1","e5d6","exd6"),
+    ("4k3/8/8/8/8/8/8/R3K2R w KQ - 0 1","e1c1","O-O-O"),
+    ("6k1/5ppp/8/8/8/8/8/R3K3 w Q - 0 1","a1a8","Ra8#"),
+])
+@pytest.mark.parametrize('backend',BACKENDS)
+def testSan(backend,fen,notation,san):
+    gs = backend.GameState()
+    gs.loadFen(fen)
+    move = moveFor(gs,notation)
+    before = gs.getFen()
+    assert move.getSan(gs) == san
+    assert gs.getFen() == before # getSan plays the move to find checks -- and takes it back.
+    assert chessEngine.Move.fromSan(san,gs) == move
+
+def testFromSanAcceptsLooseSpellings():
+    gs = chessEngine.GameState()
+    gs.loadFen("r3k3/1P6/8/8/8/8/8/4K2R w Kq - 0 1")
+    assert chessEngine.Move.fromSan("0-0",gs).isCastleMove
+    assert chessEngine.Move.fromSan("bxa8Q+!",gs).promotionChoice == 'Q'
+    assert chessEngine.Move.fromSan("b8",gs).promotionChoice == 'Q' # a promotion without a piece is a queen.
+
+@pytest.mark.parametrize('san,error',[("Nad2","illegal"),("Nd2","ambiguous"),("Zz9","not a SAN move"),("e5","illegal")])
+def testFromSanErrors(san,error):
+    gs = chessEngine.GameState()
+    gs.loadFen("4k3/8/8/8/8/8/4P3/1N2KN2 w - - 0 1") # both knights reach d2, none stands on the a file.
+    with pytest.raises(ValueError,match=error):
+        chessEngine.Move.fromSan(san,gs)
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testRandomGamesRoundTrip(backend):
+    for seed in range(4):
+        rng = random.Random(seed)
+        gs = backend.GameState()
+        for _ in range(80):
+            moves = gs.getValidMoves()
+            if not moves:
+                break
+            sans = [move.getSan(gs,moves) for move in moves]
+            assert len(set(sans)) == len(moves) # every move has its own SAN.
+            for move, san in zip(moves,sans):
+                assert chessEngine.Move.fromSan(san,gs,moves) is move
+            gs.makeMove(rng.choice(moves))
@@ -0,0 +1,60 @@
+import pytest
+
+import bitboardEngine
+import chessEngine
+import selfPlay
+
+
+def testSprtLLROnKnownCounts():
+    # 60 wins, 100 draws, 40 losses: score 0.55, variance 0.1225 -- (s1 - s0)*(2*0.55 - s0 - s1)/(2*0.1225/200).
+    assert selfPlay.sprtLLR(60,100,40,0,10) == pytest.approx(1.00549,abs=1e-5)
+    assert selfPlay.sprtLLR(40,100,60,0,10) == pytest.approx(-1.34344,abs=1e-5)
+    assert selfPlay.sprtLLR(0,0,0,0,10) == 0.0
+
+def testSprtLLRForSweeps():
+    # no losses or no wins still give a finite ratio of the right sign.
+    assert 0 < selfPlay.sprtLLR(10,0,0,0,10) < 10
+    assert -10 < selfPlay.sprtLLR(0,0,10,0,10) < 0
+    assert selfPlay.sprtLLR(50,0,0,0,10) > selfPlay.sprtLLR(10,0,0,0,10)
+
+def testEloEstimate():
+    elo, margin = selfPlay.eloEstimate(60,100,40)
+    assert elo == pytest.approx(34.86,abs=0.01) # a 0.55 score.
+    assert selfPlay.eloEstimate(40,100,60)[0] == pytest.approx(-elo)
+    assert margin > 0
+
+@pytest.mark.parametrize('backend',[chessEngine,bitboardEngine])
+def testFiftyMovesCountTheOpeningsClock(backend):
+    gs = backend.GameState()
+    gs.loadFen("4k3/8/8/8/8/8/8/R3K3 w - - 98 80")
+    gs.makeMove(chessEngine.Move.fromSan("Ra2",gs))
+    assert selfPlay.gameOver(gs) is None
+    gs.makeMove(chessEngine.Move.fromSan("Ke7",gs))
+    assert selfPlay.gameOver(gs) == ("1/2-1/2","fifty moves")
+    gs.makeMove(chessEngine.Move.fromSan("Ra7+",gs))
+    assert selfPlay.gameOver(gs) == ("1/2-1/2","fifty moves")
+    gs.loadFen("4k3/8/8/8/8/8/8/R3K3 w - - 0 80")
+    gs.makeMove(chessEngine.Move.fromSan("Ra2",gs))
+    gs.makeMove(chessEngine.Move.fromSan("Ke7",gs))
+    assert selfPlay.gameOver(gs) is None
+
+@pytest.mark.parametrize('backend',[chessEngine,bitboardEngine])
+def testGameOverByTheRules(backend):
+    gs = backend.GameState()
+    for san in ("f3","e5","g4","Qh4#"):
+        gs.makeMove(chessEngine.Move.fromSan(san,gs))
+    assert selfPlay.gameOver(gs) == ("0-1","checkmate")
+    gs.loadFen("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")
+    assert selfPlay.gameOver(gs) == ("1/2-1/2","stalemate")
+    gs.loadFen("7k/8/6K1/8/8/8/8/2B5 w - - 0 1")
+    assert selfPlay.gameOver(gs) == ("1/2-1/2","insufficient material")
+
+def testReadOpenings(tmp_path):
+    path = tmp_path / "openings.epd"
+    path.write_text("# comment\n" + chessEngine.STARTING_FEN.rsplit(' ',2)[0] + " ; start\n\n"
+                    "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 3 1\n")
+    assert selfPlay.readOpenings(str(path)) == [chessEngine.STARTING_FEN,
+                                                "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 3 1"]
+    path.write_text(chessEngine.STARTING_FEN + "\n8/8/8/8/8/8/8/4K3 w - - 0 1\n")
+    with pytest.raises(ValueError,match="line 2"):
+        selfPlay.readOpenings(str(path))
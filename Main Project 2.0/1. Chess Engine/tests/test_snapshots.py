@@ -0,0 +1,82 @@
+import pickle
+import random
+
+import pytest
+
+import bitboardEngine
+import chessEngine
+
+BACKENDS = [chessEngine,bitboardEngine]
+
+
+def randomGame(backend,plies,seed):
+    # a game of random valid moves, and the snapshot and FEN before each move.
+    rng = random.Random(seed)
+    gs = backend.GameState()
+    history = []
+    for _ in range(plies):
+        moves = gs.getValidMoves()
+        if not moves:
+            break
+        history.append((gs.snapshot(),gs.getFen()))
+        gs.makeMove(rng.choice(sorted(moves,key=lambda move: move.moveID))) # the same game on either backend.
+    return gs, history
+
+def positionPart(fen):
+    return fen.rsplit(' ',2)[0] # without the move counters -- a snapshot doesn't keep them.
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testRestoreGivesTheSamePosition(backend):
+    for seed in range(5):
+        gs, history = randomGame(backend,80,seed)
+        other = backend.GameState()
+        for data, fen in history:
+            assert len(data) == chessEngine.SNAPSHOT_SIZE
+            other.restore(data)
+            assert positionPart(other.getFen()) == positionPart(fen)
+            assert len(other.moveLog) == 0
+            loaded = backend.GameState()
+            loaded.loadFen(fen)
+            assert other.zobristKey == loaded.zobristKey
+            assert other.getValidMoveCodes() == loaded.getValidMoveCodes()
+
+def testBackendsMakeTheSameSnapshots():
+    for seed in range(5):
+        _, listHistory = randomGame(chessEngine,60,seed)
+        _, bitboardHistory = randomGame(bitboardEngine,60,seed)
+        assert [data for data, _ in listHistory] == [data for data, _ in bitboardHistory]
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testUndoingTheMoveLogGoesBackThroughEveryPosition(backend):
+    gs, history = randomGame(backend,100,7)
+    assert gs.moveLog.itemsize == 2 and gs.undoLog.itemsize == 2 # 4 bytes a move.
+    for data, fen in reversed(history):
+        gs.undoMove()
+        assert gs.snapshot() == data
+        assert gs.getFen() == fen
+    assert len(gs.moveLog) == len(gs.undoLog) == len(gs.zobristKeyLog) == 0
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testPickledGameKeepsItsLog(backend):
+    gs, history = randomGame(backend,30,3)
+    copy = pickle.loads(pickle.dumps(gs))
+    assert copy.getFen() == gs.getFen() and list(copy.moveLog) == list(gs.moveLog)
+    copy.undoMove()
+    assert copy.snapshot() == history[-1][0]
+
+def testEnpassantAndCastlingSurvive():
+    fen = "r3k2r/8/8/8/3pP3/8/8/R3K2R b Kq e3 0 1"
+    data = chessEngine.encodeSnapshot(*chessEngine.parseFen(fen))
+    board, whitetoMove, castleRights, enpassantPossible = chessEngine.decodeSnapshot(data)
+    assert not whitetoMove and enpassantPossible == (5,4)
+    assert (castleRights.wks,castleRights.wqs,castleRights.bks,castleRights.bqs) == (True,False,False,True)
+    assert chessEngine.formatFen(board,whitetoMove,castleRights,enpassantPossible) == fen
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testBadSnapshotsAreRejected(backend):
+    gs = backend.GameState()
+    start = gs.snapshot()
+    for data in (start[:63],bytes([15]) + start[1:],bytes(64)):
+        with pytest.raises(ValueError):
+            gs.restore(data)
+    assert gs.snapshot() == start
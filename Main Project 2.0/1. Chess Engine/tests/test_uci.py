@@ -0,0 +1,87 @@
+import io
+
+import pytest
+
+import uci
+
+
+@pytest.fixture
+def engine():
+    engine = uci.UCIEngine('bitboard',1,out=io.StringIO())
+    yield engine
+    engine.handle("quit")
+
+def output(engine):
+    # the lines sent since the last call.
+    lines = engine.out.getvalue().splitlines()
+    engine.out.seek(0)
+    engine.out.truncate()
+    return lines
+
+def testHandshake(engine):
+    assert engine.handle("uci")
+    lines = output(engine)
+    assert lines[0] == "id name " + uci.ENGINE_NAME and lines[-1] == "uciok"
+    assert "option name Hash type spin default 1 min 1 max 1024" in lines
+    engine.handle("isready")
+    assert output(engine) == ["readyok"]
+    engine.handle("ucinewgame")
+    engine.handle("frobnicate")
+    assert output(engine) == ["info string unknown command frobnicate"]
+
+def testPositionWithMoves(engine):
+    engine.handle("position startpos moves e2e4 e7e5 g1f3")
+    assert engine.gs.getFen() == "rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2"
+    engine.handle("position fen 4k3/8/8/8/8/8/4P3/4K3 w - - 0 1 moves e2e4")
+    assert engine.gs.getFen() == "4k3/8/8/8/4P3/8/8/4K3 b - - 0 1"
+    engine.handle("position startpos moves e2e4 e2e4")
+    assert output(engine) == ["info string illegal move e2e4"]
+    assert len(engine.gs.moveLog) == 1 # the moves before the illegal one are kept.
+    engine.handle("position fen 4k3/8/8/8/8/8/8/8 w - - 0 1")
+    assert output(engine)[0].startswith("info string bad fen")
+    assert len(engine.gs.moveLog) == 1
+
+def testGoDepth(engine):
+    engine.handle("position startpos moves e2e4 e7e5")
+    engine.handle("go depth 3")
+    engine.waitForSearch(stop=False)
+    lines = output(engine)
+    assert [line.split()[2] for line in lines[:-1]] == ["1","2","3"] # every depth is searched to the end.
+    assert lines[-1] == "bestmove " + lines[-2].split(" pv ")[1].split()[0]
+    engine.handle("position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+    engine.handle("go depth 3")
+    engine.waitForSearch(stop=False)
+    lines = output(engine)
+    assert "score mate 1" in lines[-2] and lines[-1] == "bestmove a1a8"
+
+def testStopEndsAnInfiniteSearch(engine):
+    engine.handle("go infinite")
+    assert engine.searchThread.is_alive()
+    engine.handle("stop")
+    assert engine.searchThread is None
+    assert output(engine)[-1].startswith("bestmove ")
+
+def testEndOfInputFinishesTheSearch(monkeypatch):
+    out = io.StringIO()
+    monkeypatch.setattr('sys.stdin',io.StringIO("position startpos moves e2e4 e7e5\ngo depth 4\n"))
+    monkeypatch.setattr('sys.stdout',out)
+    monkeypatch.setattr(uci.openingBook,'createDefaultBook',lambda: None)
+    assert uci.main([]) == 0
+    lines = out.getvalue().splitlines()
+    assert lines[-2].startswith("info depth 4 ") and lines[-1].startswith("bestmove ")
+
+@pytest.mark.parametrize('line,reply',[
+    ("setoption name Hash value abc","info string bad value abc for Hash"),
+    ("go depth x nodes 500","info string bad value x for depth"), # searched to the node limit.
+])
+def testBadValuesAreIgnored(engine,line,reply):
+    searcher = engine.searcher
+    assert engine.handle(line)
+    engine.waitForSearch(stop=False)
+    lines = output(engine)
+    assert lines[0] == reply
+    assert engine.searcher is searcher and engine.hashMB == 1
+    engine.handle("position startpos moves e2e4")
+    engine.handle("go depth 1 nodes 1x")
+    engine.waitForSearch(stop=False)
+    assert output(engine)[0] == "info string bad value 1x for nodes"
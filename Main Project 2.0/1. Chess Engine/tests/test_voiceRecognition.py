@@ -0,0 +1,89 @@
+import math
+import random
+import wave
+from array import array
+
+import pytest
+
+p = pytest.importorskip("pygame")
+
+import voiceRecognition
+
+RATE = voiceRecognition.SAMPLE_RATE
+
+
+def pcm(segments,seed=1):
+    # 16 bit mono samples -- (seconds, amplitude) segments of a 440Hz tone over faint noise.
+    rng = random.Random(seed)
+    samples = array('h')
+    for seconds, amplitude in segments:
+        for i in range(int(seconds*RATE)):
+            samples.append(int(amplitude*math.sin(2*math.pi*440*i/RATE)) + rng.randint(-20,20))
+    return samples.tobytes()
+
+def writeWav(path,segments,sampleWidth=2):
+    with wave.open(str(path),'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(sampleWidth)
+        f.setframerate(RATE)
+        f.writeframes(pcm(segments) if sampleWidth == 2 else bytes(RATE))
+    return str(path)
+
+def feedAll(detector,audio,chunkFrames):
+    results = [detector.feed(audio[i:i + 2*chunkFrames]) for i in range(0,len(audio),2*chunkFrames)]
+    results.append(detector.flush())
+    return [result for result in results if result is not None]
+
+def testRms():
+    assert voiceRecognition.rms(b"") == 0.0
+    assert voiceRecognition.rms(array('h',[3,-4,3,-4]).tobytes()) == pytest.approx(math.sqrt(12.5))
+    assert voiceRecognition.rms(b"\x01\x00\x01") == 1.0 # an odd trailing byte is left out.
+
+def testDetectorCutsOutEachUtterance():
+    chunkFrames = int(RATE*voiceRecognition.CHUNK_SECONDS)
+    detector = voiceRecognition.VoiceActivityDetector(RATE,chunkFrames)
+    audio = pcm([(1.0,0),(0.8,3000),(1.0,0),(0.5,3000),(1.0,0)])
+    results = feedAll(detector,audio,chunkFrames)
+    assert results[0] == 'start' and results[2] == 'start' and len(results) == 4
+    for utterance, seconds in ((results[1],0.8),(results[3],0.5)):
+        # the speech, a short lead in and the silence that ended it.
+        assert seconds < len(utterance)/2/RATE < seconds + 0.8
+    assert detector.noiseFloor < 50
+
+def testNoSpeechNoUtterance():
+    chunkFrames = int(RATE*voiceRecognition.CHUNK_SECONDS)
+    detector = voiceRecognition.VoiceActivityDetector(RATE,chunkFrames)
+    assert feedAll(detector,pcm([(3.0,0)]),chunkFrames) == []
+
+def testSpeechStartedAndResultsArePosted(tmp_path):
+    path = writeWav(tmp_path / "moves.wav",[(0.6,0),(0.6,3000),(0.9,0),(0.4,3000)]) # the last one runs to the end.
+    events = []
+    recognizer = voiceRecognition.ScriptedRecognizer(["e2 to e4",[("knight to f3",0.8),("night to f3",0.4)]])
+    voice = voiceRecognition.VoiceInput(voiceRecognition.WavFileSource(path),recognizer,post=events.append)
+    voice.start()
+    for thread in voice.threads: # both end by themselves at the end of the file.
+        thread.join(10)
+    voice.stop()
+    assert [event.type for event in events] == [voiceRecognition.SPEECH_STARTED,voiceRecognition.VOICE_RESULT]*2
+    assert events[1].hypotheses == [("e2 to e4",1.0)]
+    assert events[3].hypotheses == [("knight to f3",0.8),("night to f3",0.4)]
+
+def testNothingRecognizedPostsNoResult(tmp_path):
+    path = writeWav(tmp_path / "cough.wav",[(0.6,0),(0.6,3000),(0.9,0)])
+    events = []
+    voice = voiceRecognition.VoiceInput(voiceRecognition.WavFileSource(path),voiceRecognition.ScriptedRecognizer([]),
+                                        post=events.append)
+    voice.start()
+    for thread in voice.threads:
+        thread.join(10)
+    voice.stop()
+    assert [event.type for event in events] == [voiceRecognition.SPEECH_STARTED]
+
+def testWavFileSourceNeeds16BitMono(tmp_path):
+    with pytest.raises(ValueError):
+        with voiceRecognition.WavFileSource(writeWav(tmp_path / "8bit.wav",[],sampleWidth=1)):
+            pass
+    with voiceRecognition.WavFileSource(writeWav(tmp_path / "ok.wav",[(0.1,1000)])) as source:
+        assert source.sampleRate == RATE
+        chunks = iter(source.read,b"")
+        assert sum(len(chunk) for chunk in chunks) == 2*int(0.1*RATE)
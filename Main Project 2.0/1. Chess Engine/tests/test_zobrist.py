@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+import bitboardEngine
+import chessEngine
+import zobrist
+
+BACKENDS = [chessEngine,bitboardEngine]
+# castling, en passant, promotions and checks all come up within a few moves of these.
+FENS = [chessEngine.STARTING_FEN,
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3"]
+
+
+def pickMove(rng,moves):
+    # castling, en passant and promotions are rare among random moves -- picked half the time there is one.
+    special = [move for move in moves if move.isCastleMove or move.isEnpassantMove or move.isPawnPromotion]
+    return rng.choice(special if special and rng.random() < 0.5 else moves)
+
+def recomputedKey(gs):
+    return zobrist.computeKey(gs.board,gs.whitetoMove,gs.currentCastlingRight,gs.enpassantPossible)
+
+@pytest.mark.parametrize('backend',BACKENDS)
+@pytest.mark.parametrize('fen',FENS)
+@pytest.mark.parametrize('seed',range(3))
+def testIncrementalKeyMatchesRecomputation(backend,fen,seed):
+    rng = random.Random("%s %d" % (fen,seed))
+    gs = backend.GameState()
+    gs.loadFen(fen)
+    keys = [gs.zobristKey]
+    for _ in range(300): # a random walk -- forward mostly, back now and then.
+        moves = gs.getValidMoves()
+        if moves and (len(gs.moveLog) == 0 or rng.random() < 0.8):
+            gs.makeMove(pickMove(rng,moves))
+            keys.append(gs.zobristKey)
+        else:
+            gs.undoMove()
+            keys.pop()
+            assert gs.zobristKey == keys[-1]
+        assert gs.zobristKey == recomputedKey(gs)
+        assert list(gs.zobristKeyLog) == keys[:-1]
+
+@pytest.mark.parametrize('backend',BACKENDS)
+def testTranspositionsGetTheSameKey(backend):
+    gs = backend.GameState()
+    start = gs.zobristKey
+    for san in ("Nf3","Nf6","Ng1","Ng8"):
+        gs.makeMove(chessEngine.Move.fromSan(san,gs))
+    assert gs.zobristKey == start and gs.zobristKeyLog.count(gs.zobristKey) == 1 # the log has the earlier ones.
+    keys = []
+    for sans in (("e4","e5","Nf3"),("Nf3","e5","e4")):
+        gs.loadFen(chessEngine.STARTING_FEN)
+        for san in sans:
+            gs.makeMove(chessEngine.Move.fromSan(san,gs))
+        keys.append(gs.zobristKey)
+    gs.loadFen("rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2")
+    assert keys == [gs.zobristKey]*2
+
+def testBackendsGiveTheSameKeys():
+    rng = random.Random(5)
+    games = [backend.GameState() for backend in BACKENDS]
+    for _ in range(150):
+        codes = sorted(games[0].getValidMoveCodes())
+        assert codes == sorted(games[1].getValidMoveCodes())
+        if not codes:
+            break
+        code = rng.choice(codes)
+        for gs in games:
+            gs.makeMove(chessEngine.Move.fromCode(code,gs.board))
+        assert games[0].zobristKey == games[1].zobristKey
@@ -0,0 +1,210 @@
+"""
+Headless UCI front end -- drives the GameState and chessAI.Searcher over stdin/stdout, so the engine runs under
+tournament managers and analysis tools without pygame or the speech modules.
+
+    python uci.py [--backend list|bitboard] [--hash 16]
+
+Supported: uci, isready, ucinewgame, setoption (Hash, Backend, OwnBook, BookFile), position startpos|fen ...
+[moves ...], go [depth N] [movetime MS] [nodes N] [wtime MS btime MS winc MS binc MS movestogo N] [infinite], stop,
+quit. With a book (--book, or book.bin next to this file) a go in a book position answers at once with a book move.
+"""
+import argparse
+import sys
+import threading
+
+import bitboardEngine
+import chessAI
+import chessEngine
+import openingBook
+
+BACKENDS = {'list':chessEngine,'bitboard':bitboardEngine}
+ENGINE_NAME = "Voice Chess"
+ENGINE_AUTHOR = "Voice-Chess contributors"
+
+
+class UCIEngine():
+    '''
+    One UCI session. handle(line) runs a command, searches run on a thread of their own so stop is read meanwhile.
+    '''
+    def __init__(self,backend='bitboard',hashMB=16,out=sys.stdout,book=None) -> None:
+        self.backend = backend
+        self.hashMB = hashMB
+        self.out = out
+        self.outLock = threading.Lock()
+        self.stopEvent = threading.Event()
+        self.searcher = chessAI.Searcher(hashMB,stopEvent=self.stopEvent)
+        self.searchThread = None
+        self.infinite = False # the running search only sends bestmove after stop.
+        self.gs = BACKENDS[backend].GameState()
+        self.book = book
+        self.useBook = True
+
+    def send(self,line):
+        with self.outLock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    '''
+    Runs one command line. Returns False once the session should end.
+    '''
+    def handle(self,line):
+        tokens = line.split()
+        if len(tokens) == 0:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.send("id name " + ENGINE_NAME)
+            self.send("id author " + ENGINE_AUTHOR)
+            self.send("option name Hash type spin default %d min 1 max 1024" % self.hashMB)
+            self.send("option name Backend type combo default %s var list var bitboard" % self.backend)
+            self.send("option name OwnBook type check default %s" % ("true" if self.book is not None else "false"))
+            self.send("option name BookFile type string default %s" %
+                      (self.book.path if self.book is not None else "<empty>"))
+            self.send("uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'ucinewgame':
+            self.waitForSearch()
+            self.searcher.tt.clear()
+            self.gs = BACKENDS[self.backend].GameState()
+        elif command == 'setoption':
+            self.setOption(args)
+        elif command == 'position':
+            self.waitForSearch()
+            self.setPosition(args)
+        elif command == 'go':
+            self.waitForSearch()
+            self.go(args)
+        elif command == 'stop':
+            self.waitForSearch()
+        elif command == 'quit':
+            self.waitForSearch()
+            return False
+        elif command not in ('debug','register','ponderhit'):
+            self.send("info string unknown command " + command)
+        return True
+
+    def setOption(self,args):
+        # setoption name <name> value <value> -- names may have spaces.
+        if 'name' not in args:
+            return
+        valueAt = args.index('value') if 'value' in args else len(args)
+        name = " ".join(args[args.index('name') + 1:valueAt]).lower()
+        value = " ".join(args[valueAt + 1:])
+        self.waitForSearch()
+        if name == 'hash':
+            try:
+                self.hashMB = max(1,int(value))
+            except ValueError:
+                self.send("info string bad value %s for Hash" % value)
+                return
+            self.searcher = chessAI.Searcher(self.hashMB,stopEvent=self.stopEvent)
+        elif name == 'backend' and value in BACKENDS:
+            self.backend = value
+            self.gs = BACKENDS[value].GameState()
+        elif name == 'ownbook':
+            self.useBook = value == 'true'
+        elif name == 'bookfile':
+            if self.book is not None:
+                self.book.close()
+                self.book = None
+            if value not in ('','<empty>'):
+                try:
+                    self.book = openingBook.OpeningBook(value)
+                except (OSError,ValueError) as e:
+                    self.send("info string no book: %s" % e)
+        else:
+            self.send("info string unknown option " + name)
+
+    def setPosition(self,args):
+        movesAt = args.index('moves') if 'moves' in args else len(args)
+        if args and args[0] == 'fen':
+            fen = " ".join(args[1:movesAt])
+        else:
+            fen = chessEngine.STARTING_FEN
+        gs = BACKENDS[self.backend].GameState()
+        try:
+            gs.loadFen(fen)
+        except ValueError as e:
+            self.send("info string bad fen: %s" % e)
+            return
+        for notation in args[movesAt + 1:]:
+            move = {move.getChessNotation():move for move in gs.getValidMoves()}.get(notation)
+            if move is None:
+                self.send("info string illegal move " + notation)
+                break
+            gs.makeMove(move)
+        self.gs = gs
+
+    def go(self,args):
+        limits = {}
+        for i in range(len(args) - 1):
+            if args[i] in ('depth','movetime','nodes','wtime','btime','winc','binc','movestogo'):
+                try:
+                    limits[args[i]] = int(args[i + 1])
+                except ValueError: # searched as if the limit wasn't given.
+                    self.send("info string bad value %s for %s" % (args[i + 1],args[i]))
+        infinite = 'infinite' in args
+        if self.book is not None and self.useBook and not infinite:
+            bookMove = self.book.pickMove(self.gs)
+            if bookMove is not None: # a book position -- answered without searching.
+                self.send("info string book move")
+                self.send("bestmove " + bookMove.getChessNotation())
+                return
+        maxDepth = min(limits.get('depth',chessAI.MAX_PLY - 1),chessAI.MAX_PLY - 1)
+        timeLimit = None
+        if 'movetime' in limits:
+            timeLimit = limits['movetime']/1000
+        elif not infinite and ('wtime' in limits or 'btime' in limits):
+            side = 'w' if self.gs.whitetoMove else 'b'
+            timeLimit = chessAI.allocateTime(limits.get(side + 'time',0)/1000,limits.get(side + 'inc',0)/1000,
+                                             limits.get('movestogo'))
+        self.stopEvent.clear()
+        self.infinite = infinite
+        self.searchThread = threading.Thread(target=self.think,args=(maxDepth,timeLimit,limits.get('nodes'),infinite),
+                                             daemon=True)
+        self.searchThread.start()
+
+    def think(self,maxDepth,timeLimit,nodeLimit,infinite):
+        result = self.searcher.search(self.gs,maxDepth,timeLimit,nodeLimit,onIteration=self.sendInfo)
+        if infinite:
+            self.stopEvent.wait() # in infinite mode bestmove only comes after stop, even if the search is done.
+        self.send("bestmove " + (result.bestMove.getChessNotation() if result.bestMove is not None else "0000"))
+
+    def sendInfo(self,result):
+        mate = result.mateIn()
+        score = "mate %d" % mate if mate is not None else "cp %d" % result.score
+        milliseconds = max(1,int(result.seconds*1000))
+        self.send("info depth %d score %s nodes %d nps %d time %d pv %s" %
+                  (result.depth,score,result.nodes,result.nodes*1000//milliseconds,milliseconds,
+                   " ".join(move.getChessNotation() for move in result.pv)))
+
+    '''
+    Stops a running search and waits for its bestmove -- commands that change the position or the searcher wait here.
+    With stop False a search runs to its own limits first, unless it is infinite and would never end.
+    '''
+    def waitForSearch(self,stop=True):
+        if self.searchThread is not None:
+            if stop or self.infinite:
+                self.stopEvent.set()
+            self.searchThread.join()
+            self.searchThread = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="UCI engine over stdin/stdout.")
+    parser.add_argument('--backend',choices=sorted(BACKENDS),default='bitboard')
+    parser.add_argument('--hash',type=int,default=16,help="transposition table size in MB.")
+    parser.add_argument('--book',help="Polyglot opening book, book.bin next to this file if there is one.")
+    args = parser.parse_args(argv)
+    book = openingBook.OpeningBook(args.book) if args.book else openingBook.createDefaultBook()
+    engine = UCIEngine(args.backend,args.hash,out=sys.stdout,book=book)
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    engine.waitForSearch(stop=False) # at the end of input the last go still gets its full search.
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,75 +1,264 @@
-# """
-# voice recognizing part -- here
-# """
-# import speech_recognition as sr
-# import pyttsx3 
-# import time
- 
-# r = sr.Recognizer() 
- 
-# # Function to convert text to speech
-# def SpeakText(command):
-     
-#     # engine initialization
-#     engine = pyttsx3.init()
-#     engine.say(command) 
-#     engine.runAndWait()
-     
-     
- 
-# while(1):    
-     
-#     # Exception handling to handle excetions at run time
-#     try:
-         
-#         # use the microphone as input
-#         with sr.Microphone() as source2:
-             
-#             #adjusting for ambient noises
-#             r.adjust_for_ambient_noise(source2, duration=0.2)
-             
-#             #to give user time to get ready
-#             time.sleep(3)
-
-#             #text to indicate to prompt the user to speak
-#             print("Please say your move")
-#             SpeakText("Please say your move")
-
-#             #listens for the user's input 
-#             audio2 = r.listen(source2)
-             
-#             # Using google to recognize audio
-#             notation = r.recognize_google(audio2)
-#             notation = notation.lower()
-            
- 
-#             print("Did you say ",notation)
-#             SpeakText("Did you say")
-#             SpeakText(notation)
-            
-#             #confirming the move that was played
-#             SpeakText("Please say confirm if you want to proceed with")
-#             SpeakText(notation)
-#             SpeakText("otherwise say no to correct your move")
-
-#             print(f"Please say confirm if you want to proceed with {notation} otherwise say no to correct your move")
-
-#             audio2 = r.listen(source2)
-#             confirm = r.recognize_google(audio2)
-
-#             if confirm == "confirm":
-#                 notations = notation.split(" to ")
-#             elif confirm == "exit":
-#                 exit()
-#             else:
-#                 voiceCom()
-
-#             print(notation)
-
-#     except sr.RequestError as e:
-#         print("Could not request results; {0}".format(e))
-         
-#     except sr.UnknownValueError:
-#         print("unknown error occurred")
-        
-    
\ No newline at end of file
+"""
+voice recognizing part -- here
+
+Streaming voice input that never blocks the game loop. A capture thread reads short chunks of 16 bit mono audio from
+a source (the microphone, or a WAV file in tests) onto a queue. A recognition thread runs voice activity detection
+over the chunks -- the noise floor is measured from the first half second instead of sleeping -- cuts out each
+utterance and hands it to a recognizer backend. What comes back is posted to the pygame event queue:
+    SPEECH_STARTED  -- the user started talking (speech output should stop).
+    VOICE_RESULT    -- event.hypotheses is the n-best list of (transcript, confidence), best first.
+
+    voice = VoiceInput(MicrophoneSource(),GoogleRecognizer())
+    voice.start() ... voice.stop()
+"""
+import math
+import queue
+import threading
+import time
+import wave
+from array import array
+
+import pygame as p
+
+try:
+    import speech_recognition as sr
+except ImportError: # no voice input without it -- the board still works with the mouse.
+    sr = None
+
+SPEECH_STARTED = p.event.custom_type()
+VOICE_RESULT = p.event.custom_type()
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 0.03
+
+
+class WavFileSource():
+    '''
+    Reads a 16 bit mono WAV file chunk by chunk -- stands in for the microphone in tests. With realtime the chunks
+    come at the speed they were recorded.
+    '''
+    def __init__(self,path,realtime=False) -> None:
+        self.path = path
+        self.realtime = realtime
+
+    def __enter__(self):
+        self.file = wave.open(self.path,'rb')
+        if self.file.getsampwidth() != 2 or self.file.getnchannels() != 1:
+            self.file.close()
+            raise ValueError("%s: only 16 bit mono audio is supported" % self.path)
+        self.sampleRate = self.file.getframerate()
+        self.chunkFrames = max(1,int(self.sampleRate*CHUNK_SECONDS))
+        return self
+
+    def __exit__(self,*exc):
+        self.file.close()
+
+    # next chunk of raw samples, b"" at the end of the file.
+    def read(self):
+        if self.realtime:
+            time.sleep(self.chunkFrames/self.sampleRate)
+        return self.file.readframes(self.chunkFrames)
+
+
+class MicrophoneSource():
+    '''
+    The default microphone through speech_recognition (PyAudio underneath).
+    '''
+    def __init__(self,deviceIndex=None,sampleRate=SAMPLE_RATE) -> None:
+        if sr is None:
+            raise RuntimeError("voice input needs the SpeechRecognition and PyAudio packages")
+        self.microphone = sr.Microphone(device_index=deviceIndex,sample_rate=sampleRate,
+                                        chunk_size=int(sampleRate*CHUNK_SECONDS))
+
+    def __enter__(self):
+        self.stream = self.microphone.__enter__().stream
+        self.sampleRate = self.microphone.SAMPLE_RATE
+        self.chunkFrames = self.microphone.CHUNK
+        return self
+
+    def __exit__(self,*exc):
+        self.microphone.__exit__(*exc)
+
+    def read(self):
+        return self.stream.read(self.chunkFrames)
+
+
+class GoogleRecognizer():
+    '''
+    Google's web speech api through speech_recognition -- returns every alternative it offers.
+    '''
+    def __init__(self,language="en-US") -> None:
+        if sr is None:
+            raise RuntimeError("voice input needs the SpeechRecognition package")
+        self.recognizer = sr.Recognizer()
+        self.language = language
+
+    def recognize(self,audio,sampleRate):
+        try:
+            response = self.recognizer.recognize_google(sr.AudioData(audio,sampleRate,2),language=self.language,
+                                                        show_all=True)
+        except sr.RequestError as e:
+            print("Could not request results; {0}".format(e))
+            return []
+        if not response: # nothing understood.
+            return []
+        alternatives = response.get('alternative',[])
+        # only the first alternative comes with a confidence -- the rest are ranked below it.
+        best = alternatives[0].get('confidence',0.9) if alternatives else 0
+        return [(alt['transcript'].lower(),alt.get('confidence',best*0.8**i)) for i, alt in enumerate(alternatives)]
+
+
+class ScriptedRecognizer():
+    '''
+    Hands out fixed transcripts, one n-best list per utterance -- the recognizer for tests with WavFileSource.
+    '''
+    def __init__(self,results) -> None:
+        self.results = list(results)
+
+    def recognize(self,audio,sampleRate):
+        if not self.results:
+            return []
+        result = self.results.pop(0)
+        return [(result,1.0)] if isinstance(result,str) else list(result)
+
+
+class VoiceActivityDetector():
+    '''
+    Energy based speech detection. The first calibrationSeconds of audio set the noise floor, after that a chunk
+    counts as speech when it is `ratio` times louder than the floor. An utterance starts after startSeconds of speech
+    and ends after silenceSeconds of quiet. feed() returns 'start', the finished utterance's audio, or None.
+    '''
+    def __init__(self,sampleRate,chunkFrames,ratio=3.0,calibrationSeconds=0.5,startSeconds=0.09,
+                 silenceSeconds=0.6,maxSeconds=8.0) -> None:
+        chunkSeconds = chunkFrames/sampleRate
+        self.ratio = ratio
+        self.calibrationChunks = max(1,int(calibrationSeconds/chunkSeconds))
+        self.startChunks = max(1,int(startSeconds/chunkSeconds))
+        self.silenceChunks = max(1,int(silenceSeconds/chunkSeconds))
+        self.maxChunks = int(maxSeconds/chunkSeconds)
+        self.noiseFloor = 0.0
+        self.calibrated = 0
+        self.chunks = [] # audio since speech started (plus a little lead in).
+        self.speaking = False
+        self.loudRun = 0
+        self.quietRun = 0
+
+    def feed(self,chunk):
+        energy = rms(chunk)
+        if self.calibrated < self.calibrationChunks: # the ambient noise adjustment.
+            self.calibrated += 1
+            self.noiseFloor += (energy - self.noiseFloor)/self.calibrated
+            return None
+        loud = energy > max(self.noiseFloor*self.ratio,50)
+        self.chunks.append(chunk)
+        if not self.speaking:
+            if not loud:
+                self.noiseFloor += (energy - self.noiseFloor)*0.05 # follow slow changes of the room.
+                self.loudRun = 0
+                del self.chunks[:-self.startChunks] # keep a short lead in so the first syllable isn't cut.
+                return None
+            self.loudRun += 1
+            if self.loudRun >= self.startChunks:
+                self.speaking = True
+                self.quietRun = 0
+                return 'start'
+            return None
+        self.quietRun = 0 if loud else self.quietRun + 1
+        if self.quietRun >= self.silenceChunks or len(self.chunks) >= self.maxChunks:
+            return self.flush()
+        return None
+
+    '''
+    The utterance so far, if speech had started -- at the end of the input.
+    '''
+    def flush(self):
+        audio = b"".join(self.chunks) if self.speaking else None
+        self.chunks = []
+        self.speaking = False
+        self.loudRun = 0
+        return audio
+
+def rms(chunk):
+    samples = array('h',chunk[:len(chunk) - len(chunk) % 2])
+    if len(samples) == 0:
+        return 0.0
+    return math.sqrt(sum(s*s for s in samples)/len(samples))
+
+
+class VoiceInput():
+    '''
+    The capture and recognition threads. Results go to post -- pygame.event.post unless given, so the game loop gets
+    them as SPEECH_STARTED / VOICE_RESULT events.
+    '''
+    def __init__(self,source,recognizer,post=None) -> None:
+        self.source = source
+        self.recognizer = recognizer
+        self.post = post if post is not None else p.event.post
+        self.audioQueue = queue.Queue()
+        self.running = False
+        self.threads = []
+
+    def start(self):
+        self.running = True
+        self.threads = [threading.Thread(target=self.capture,daemon=True),
+                        threading.Thread(target=self.recognize,daemon=True)]
+        for thread in self.threads:
+            thread.start()
+
+    '''
+    Stops listening. Whatever was said last is still recognized before the threads end.
+    '''
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def capture(self):
+        try:
+            with self.source as source:
+                self.audioQueue.put(source.sampleRate)
+                while self.running:
+                    chunk = source.read()
+                    if not chunk: # end of the file.
+                        break
+                    self.audioQueue.put(chunk)
+        finally:
+            self.audioQueue.put(None)
+
+    def recognize(self):
+        sampleRate = self.audioQueue.get()
+        if sampleRate is None: # the source didn't open.
+            return
+        detector = None
+        while True:
+            chunk = self.audioQueue.get()
+            if chunk is None:
+                utterance = detector.flush() if detector is not None else None
+                if utterance:
+                    self.postResult(utterance,sampleRate)
+                return
+            if detector is None:
+                detector = VoiceActivityDetector(sampleRate,len(chunk)//2)
+            result = detector.feed(chunk)
+            if result == 'start':
+                self.post(p.event.Event(SPEECH_STARTED))
+            elif result is not None:
+                self.postResult(result,sampleRate)
+
+    def postResult(self,audio,sampleRate):
+        hypotheses = self.recognizer.recognize(audio,sampleRate)
+        if hypotheses:
+            self.post(p.event.Event(VOICE_RESULT,hypotheses=hypotheses))
+
+'''
+Microphone + Google recognizer, or None if the packages or a microphone aren't there.
+'''
+def createDefaultInput():
+    if sr is None:
+        return None
+    try:
+        return VoiceInput(MicrophoneSource(),GoogleRecognizer())
+    except (OSError,AttributeError,RuntimeError) as e: # no microphone / no PyAudio.
+        print("voice input off:",e)
+        return None
@@ -0,0 +1,71 @@
+"""
+Zobrist keys -- a 64 bit identity for a position (pieces, side to move, castling rights and en passant file).
+Both GameState backends keep gs.zobristKey up to date with xors in makeMove/undoMove, so caches keyed on the
+position (transposition table, repetitions, legal move memo ...) never have to hash the board.
+"""
+import random
+
+PIECES = ('wp','wN','wB','wR','wQ','wK','bp','bN','bB','bR','bQ','bK')
+
+# fixed seed -- keys have to be the same in every process that shares a table.
+_random = random.Random(0x5EED_C4E55)
+PIECE_KEYS = {piece:tuple(_random.getrandbits(64) for _ in range(64)) for piece in PIECES} # indexed by row*8 + col.
+BLACK_TO_MOVE = _random.getrandbits(64)
+_castleRightKeys = tuple(_random.getrandbits(64) for _ in range(4)) # wks, wqs, bks, bqs
+ENPASSANT_KEYS = tuple(_random.getrandbits(64) for _ in range(8)) # one per column.
+
+def _castleKey(bits):
+    key = 0
+    for i in range(4):
+        if bits >> i & 1:
+            key ^= _castleRightKeys[i]
+    return key
+
+CASTLE_KEYS = tuple(_castleKey(bits) for bits in range(16)) # every combination of rights, so one lookup per position.
+
+def castleKey(rights):
+    return CASTLE_KEYS[rights.wks | rights.wqs << 1 | rights.bks << 2 | rights.bqs << 3]
+
+def enpassantKey(enpassantPossible):
+    return ENPASSANT_KEYS[enpassantPossible[1]] if enpassantPossible != () else 0
+
+'''
+Key of a position from scratch -- used when a position is set up, makeMove/undoMove only xor in the differences.
+'''
+def computeKey(board,whitetoMove,castleRights,enpassantPossible):
+    key = 0
+    for r in range(8):
+        for c in range(8):
+            piece = board[r][c]
+            if piece != "--":
+                key ^= PIECE_KEYS[piece][r*8 + c]
+    if not whitetoMove:
+        key ^= BLACK_TO_MOVE
+    return key ^ castleKey(castleRights) ^ enpassantKey(enpassantPossible)
+
+'''
+The piece-square part of a move -- the piece leaving its start square, arriving (or promoting) on its end square,
+the captured piece and the castling rook. Xoring it in twice undoes it.
+'''
+def moveKey(move):
+    pieceEnd = move.pieceMoved[0] + move.promotionChoice if move.isPawnPromotion else move.pieceMoved
+    key = PIECE_KEYS[move.pieceMoved][move.startRow*8 + move.startCol] ^ PIECE_KEYS[pieceEnd][move.endRow*8 + move.endCol]
+    if move.pieceCaptured != "--":
+        capturedRow = move.startRow if move.isEnpassantMove else move.endRow
+        key ^= PIECE_KEYS[move.pieceCaptured][capturedRow*8 + move.endCol]
+    if move.isCastleMove:
+        rookKeys = PIECE_KEYS[move.pieceMoved[0] + 'R']
+        row = move.endRow*8
+        if move.endCol - move.startCol == 2: # king side.
+            key ^= rookKeys[row + 7] ^ rookKeys[row + move.endCol - 1]
+        else: # queen side.
+            key ^= rookKeys[row] ^ rookKeys[row + move.endCol + 1]
+    return key
+
+'''
+Everything a move changes in the key -- pieces, side to move, castling rights (as CastleRights.bits) and en passant
+file before and after.
+'''
+def moveDelta(move,castleBefore,castleAfter,enpassantBefore,enpassantAfter):
+    return (moveKey(move) ^ BLACK_TO_MOVE ^ CASTLE_KEYS[castleBefore] ^ CASTLE_KEYS[castleAfter] ^
+            enpassantKey(enpassantBefore) ^ enpassantKey(enpassantAfter))